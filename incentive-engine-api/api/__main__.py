@@ -0,0 +1,12 @@
+# incentive-engine-api/api/__main__.py
+
+"""
+`python -m api` runs the API server; `python -m api <command>` runs any
+other `incentive-api` command.
+"""
+
+import sys
+
+from api.cli import main
+
+raise SystemExit(main(sys.argv[1:] or ["serve"]))
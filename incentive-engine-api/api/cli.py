@@ -0,0 +1,383 @@
+# incentive-engine-api/api/cli.py
+
+"""
+Operational commands for the Incentive Engine API.
+
+Usage:
+    incentive-api migrate
+    incentive-api schema-version
+    incentive-api reconcile-balances [--account-id ID]
+    incentive-api payout [--watch SECONDS]
+    incentive-api reconcile-withdrawals [--older-than SECONDS]
+    incentive-api rebuild-rollups [--account-id ID]
+    incentive-api purge-idempotency-keys [--retention-hours HOURS]
+    incentive-api move-tenant --account-id ID --to SHARD [--wait SECONDS]
+    incentive-api import --account-id ID --format csv|ndjson [--job NAME] FILE
+    incentive-api promote-metadata --account-id ID --key KEY [--wait SECONDS]
+    incentive-api demote-metadata --account-id ID --key KEY
+    incentive-api serve [--workers N] [--host HOST] [--port PORT]
+"""
+
+import argparse
+import asyncio
+import os
+from typing import List, Optional
+
+
+async def _migrate(args: argparse.Namespace) -> int:
+    from api.db.database import migrate_db
+
+    applied = await migrate_db()
+    for migration in applied:
+        print(f"applied {migration.version}: {migration.description}")
+    if not applied:
+        print("schema is up to date")
+    return 0
+
+
+async def _schema_version(args: argparse.Namespace) -> int:
+    from api.db import migrations
+    from api.db.database import engine
+
+    async with engine.connect() as conn:
+        version = await conn.run_sync(migrations.current_version)
+    print(f"schema version {version} (latest {migrations.LATEST_VERSION})")
+    return 0 if version == migrations.LATEST_VERSION else 1
+
+
+async def _shard_factories(account_id: Optional[int] = None) -> list:
+    """
+    Session factories for every shard, or just the one holding `account_id`.
+    """
+    from api.db.sharding import shard_router
+
+    if account_id is not None:
+        return [await shard_router.factory_for(account_id)]
+    return [shard_router.session_factory(name) for name in shard_router.names]
+
+
+async def _reconcile_balances(args: argparse.Namespace) -> int:
+    from api.services.account_service import rebuild_developer_balances
+
+    changed = {}
+    for factory in await _shard_factories(args.account_id):
+        async with factory() as session:
+            changed.update(await rebuild_developer_balances(session, args.account_id))
+    for account_id, (old, new) in sorted(changed.items()):
+        print(f"account {account_id}: {old:.6f} -> {new:.6f}")
+    print(f"{len(changed)} developer balance(s) corrected")
+    return 0
+
+
+async def _rebuild_rollups(args: argparse.Namespace) -> int:
+    from api.services.rollup_service import rebuild_rollups
+
+    written = 0
+    for factory in await _shard_factories(args.account_id):
+        async with factory() as session:
+            written += await rebuild_rollups(session, args.account_id)
+    print(f"{written} rollup row(s) rebuilt")
+    return 0
+
+
+async def _purge_idempotency_keys(args: argparse.Namespace) -> int:
+    from datetime import datetime, timedelta
+
+    from api.config import IDEMPOTENCY_KEY_RETENTION_HOURS
+    from api.services.reward_service import purge_idempotency_keys
+
+    hours = args.retention_hours
+    if hours is None:
+        hours = IDEMPOTENCY_KEY_RETENTION_HOURS
+    cutoff = datetime.utcnow() - timedelta(hours=hours)
+    deleted = 0
+    for factory in await _shard_factories():
+        async with factory() as session:
+            deleted += await purge_idempotency_keys(session, cutoff)
+    print(f"{deleted} idempotency key(s) older than {hours:g}h deleted")
+    return 0
+
+
+async def _payout(args: argparse.Namespace) -> int:
+    from api.services.custody import get_custody_provider
+    from api.services.payout_service import PayoutSummary, run_payouts
+
+    provider = get_custody_provider()
+    factories = await _shard_factories()
+    while True:
+        summary = PayoutSummary()
+        for factory in factories:
+            summary += await run_payouts(factory, provider)
+        if summary.claimed or not args.watch:
+            print(
+                f"{summary.claimed} reward(s) in {summary.transfers} transfer(s): "
+                f"{summary.paid} paid, {summary.failed} failed, "
+                f"{summary.unknown} awaiting reconciliation, "
+                f"{summary.held} held for insufficient developer balance"
+            )
+        if not args.watch:
+            return 0 if not summary.failed else 1
+        await asyncio.sleep(args.watch)
+
+
+async def _reconcile_withdrawals(args: argparse.Namespace) -> int:
+    from api.config import WITHDRAWAL_RECONCILE_AFTER
+    from api.services.account_service import reconcile_withdrawals
+
+    older_than = WITHDRAWAL_RECONCILE_AFTER if args.older_than is None else args.older_than
+    counts = {"submitted": 0, "failed": 0, "pending": 0}
+    for factory in await _shard_factories():
+        async with factory() as session:
+            for state, count in (await reconcile_withdrawals(session, older_than)).items():
+                counts[state] += count
+    print(
+        f"{counts['submitted']} withdrawal(s) submitted, {counts['failed']} failed and "
+        f"refunded, {counts['pending']} still unknown"
+    )
+    return 0 if not counts["pending"] else 1
+
+
+async def _move_tenant(args: argparse.Namespace) -> int:
+    from api.db.sharding import shard_router
+    from api.services.shard_service import move_tenant
+
+    try:
+        counts = await move_tenant(shard_router, args.account_id, args.to, wait=args.wait)
+    except (ValueError, RuntimeError) as e:
+        print(e)
+        return 1
+    if not counts:
+        print(f"account {args.account_id} already lives on shard {args.to!r}")
+    for table, count in counts.items():
+        print(f"{table}: {count} row(s) moved")
+    return 0
+
+
+async def _read_chunks(path: str, size: int = 64 * 1024):
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(size)
+            if not chunk:
+                return
+            yield chunk
+
+
+async def _import(args: argparse.Namespace) -> int:
+    from fastapi import HTTPException
+
+    from api.db.database import SessionLocal
+    from api.services.import_service import import_rewards
+
+    job = args.job or os.path.basename(args.file)
+    async with SessionLocal() as session:
+        try:
+            result = await import_rewards(
+                session, args.account_id, job, _read_chunks(args.file), args.format
+            )
+        except HTTPException as e:
+            print(f"import {job!r} stopped: {e.detail}")
+            return 1
+    print(
+        f"import {result.job!r} {result.status}: {result.rows_committed} row(s) committed, "
+        f"{result.rows_skipped} skipped from an earlier run"
+    )
+    return 0
+
+
+async def _promote_metadata(args: argparse.Namespace) -> int:
+    from api.services.metadata_service import promote_key
+
+    [factory] = await _shard_factories(args.account_id)
+    async with factory() as session:
+        try:
+            written = await promote_key(session, args.account_id, args.key, wait=args.wait)
+        except ValueError as e:
+            print(e)
+            return 1
+    print(f"promoted {args.key!r}: {written} existing event(s) indexed")
+    return 0
+
+
+async def _demote_metadata(args: argparse.Namespace) -> int:
+    from api.services.metadata_service import demote_key
+
+    [factory] = await _shard_factories(args.account_id)
+    async with factory() as session:
+        removed = await demote_key(session, args.account_id, args.key)
+    print(f"demoted {args.key!r}: {removed} attribute row(s) removed")
+    return 0
+
+
+def _serve(args: argparse.Namespace) -> int:
+    import shutil
+    import tempfile
+
+    from api.config import (
+        API_WORKERS,
+        DAILY_REQUEST_QUOTA,
+        HOST,
+        INVALIDATION_SOCKET_DIR,
+        PORT,
+        RATE_LIMIT_BACKEND,
+        RATE_LIMIT_OVERRIDES,
+        RATE_LIMIT_PER_SECOND,
+        REWARD_INGEST_MODE,
+    )
+
+    workers = args.workers or API_WORKERS
+    if workers > 1 and REWARD_INGEST_MODE == "async":
+        # Queued rewards and their statuses live in the accepting worker
+        print("REWARD_INGEST_MODE=async keeps its queue in one process; use --workers 1")
+        return 1
+    rate_limited = bool(RATE_LIMIT_PER_SECOND or DAILY_REQUEST_QUOTA or RATE_LIMIT_OVERRIDES)
+    if workers > 1 and rate_limited:
+        if RATE_LIMIT_BACKEND == "local":
+            print("RATE_LIMIT_BACKEND=local counts per process; use database or --workers 1")
+            return 1
+        if not RATE_LIMIT_BACKEND:
+            # Per-process buckets would let each worker admit the full limit
+            print("rate limits are shared between workers through the database backend")
+            os.environ["RATE_LIMIT_BACKEND"] = "database"
+
+    import uvicorn
+
+    bus_dir = None
+    if workers > 1 and not INVALIDATION_SOCKET_DIR:
+        # Workers are spawned with this environment and read it at import
+        bus_dir = tempfile.mkdtemp(prefix="incentive-api-bus-")
+        os.environ["INVALIDATION_SOCKET_DIR"] = bus_dir
+    try:
+        uvicorn.run(
+            "api.main:app", host=args.host or HOST, port=args.port or PORT, workers=workers
+        )
+    finally:
+        if bus_dir is not None:
+            shutil.rmtree(bus_dir, ignore_errors=True)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="incentive-api", description="Incentive Engine API maintenance commands"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate = commands.add_parser("migrate", help="Apply pending schema migrations")
+    migrate.set_defaults(handler=_migrate)
+
+    version = commands.add_parser(
+        "schema-version",
+        help="Show the applied schema version (exit 1 if migrations are pending)",
+    )
+    version.set_defaults(handler=_schema_version)
+
+    reconcile = commands.add_parser(
+        "reconcile-balances",
+        help="Rebuild developer running balances from user_balances",
+    )
+    reconcile.add_argument(
+        "--account-id", type=int, default=None, help="Only rebuild this developer"
+    )
+    reconcile.set_defaults(handler=_reconcile_balances)
+
+    rollups = commands.add_parser(
+        "rebuild-rollups",
+        help="Recompute hourly and daily reward rollups from events and rewards",
+    )
+    rollups.add_argument(
+        "--account-id", type=int, default=None, help="Only rebuild this developer"
+    )
+    rollups.set_defaults(handler=_rebuild_rollups)
+
+    purge = commands.add_parser(
+        "purge-idempotency-keys",
+        help="Delete stored idempotency keys past their retention period",
+    )
+    purge.add_argument(
+        "--retention-hours", type=float, default=None, metavar="HOURS",
+        help="Keep keys this recent (default IDEMPOTENCY_KEY_RETENTION_HOURS)",
+    )
+    purge.set_defaults(handler=_purge_idempotency_keys)
+
+    payout = commands.add_parser(
+        "payout", help="Settle pending rewards through the custody provider"
+    )
+    payout.add_argument(
+        "--watch", type=float, default=None, metavar="SECONDS",
+        help="Keep running, polling for new pending rewards at this interval",
+    )
+    payout.set_defaults(handler=_payout)
+
+    withdrawals = commands.add_parser(
+        "reconcile-withdrawals",
+        help="Resolve withdrawals whose transfer outcome was never recorded",
+    )
+    withdrawals.add_argument(
+        "--older-than", type=float, default=None, metavar="SECONDS",
+        help="Only withdrawals pending this long (default WITHDRAWAL_RECONCILE_AFTER)",
+    )
+    withdrawals.set_defaults(handler=_reconcile_withdrawals)
+
+    move = commands.add_parser(
+        "move-tenant", help="Move a developer's events, rewards and balances to another shard"
+    )
+    move.add_argument("--account-id", type=int, required=True, help="Developer account")
+    move.add_argument("--to", required=True, help="Target shard (a SHARD_URLS name or 'default')")
+    move.add_argument(
+        "--wait", type=float, default=None, metavar="SECONDS",
+        help="How long to let workers drop cached assignments (default: SHARD_CACHE_TTL + 1)",
+    )
+    move.set_defaults(handler=_move_tenant)
+
+    import_ = commands.add_parser(
+        "import", help="Bulk import historical rewards from a CSV or NDJSON file"
+    )
+    import_.add_argument("--account-id", type=int, required=True, help="Developer account")
+    import_.add_argument("--format", choices=("csv", "ndjson"), required=True)
+    import_.add_argument(
+        "--job", default=None,
+        help="Job name used to resume an interrupted import (default: file name)",
+    )
+    import_.add_argument("file", help="File to import")
+    import_.set_defaults(handler=_import)
+
+    promote = commands.add_parser(
+        "promote-metadata",
+        help="Index an event metadata key for filtering and backfill existing events",
+    )
+    promote.add_argument("--account-id", type=int, required=True, help="Developer account")
+    promote.add_argument("--key", required=True, help="Metadata key, e.g. campaign")
+    promote.add_argument(
+        "--wait", type=float, default=None, metavar="SECONDS",
+        help="How long to let workers drop cached key sets (default: PROMOTED_KEYS_CACHE_TTL + 1)",
+    )
+    promote.set_defaults(handler=_promote_metadata)
+
+    demote = commands.add_parser(
+        "demote-metadata", help="Stop indexing an event metadata key"
+    )
+    demote.add_argument("--account-id", type=int, required=True, help="Developer account")
+    demote.add_argument("--key", required=True, help="Metadata key")
+    demote.set_defaults(handler=_demote_metadata)
+
+    serve = commands.add_parser(
+        "serve", help="Run the API with uvicorn, keeping worker caches coherent"
+    )
+    serve.add_argument("--workers", type=int, help="Worker processes (default: API_WORKERS)")
+    serve.add_argument("--host", help="Address to bind (default: API_HOST)")
+    serve.add_argument("--port", type=int, help="Port to bind (default: API_PORT)")
+    serve.set_defaults(handler=_serve)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if not asyncio.iscoroutinefunction(args.handler):
+        # `serve` runs uvicorn, which manages its own event loop
+        return args.handler(args)
+    return asyncio.run(args.handler(args))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,6 +1,8 @@
 # incentive-engine-api/api/config.py
 
+import json
 import os
+import tempfile
 
 # API key that clients must include in the X-API-KEY header
 API_KEY = os.getenv("INCENTIVE_API_KEY")
@@ -19,3 +21,175 @@ CIRCLE_WALLET_ID = os.getenv("CIRCLE_WALLET_ID", "")
 # (Optional) Override host/port if you deploy behind a proxy
 HOST = os.getenv("API_HOST", "0.0.0.0")
 PORT = int(os.getenv("API_PORT", 8000))
+
+# Worker processes started by `incentive-api serve`. Workers keep their
+# caches coherent by sending invalidations over Unix datagram sockets in
+# INVALIDATION_SOCKET_DIR; `serve` picks a private directory when several
+# workers run and none is set. Empty disables cross-worker invalidation.
+API_WORKERS = int(os.getenv("API_WORKERS", 1))
+INVALIDATION_SOCKET_DIR = os.getenv("INVALIDATION_SOCKET_DIR", "")
+
+# Upper bound on the number of items accepted by POST /reward/batch
+REWARD_BATCH_MAX_ITEMS = int(os.getenv("REWARD_BATCH_MAX_ITEMS", 1000))
+
+# In-process API key -> developer account cache (size, TTL for known keys,
+# and a shorter TTL for keys that did not match any account)
+API_KEY_CACHE_SIZE = int(os.getenv("API_KEY_CACHE_SIZE", 10000))
+API_KEY_CACHE_TTL = float(os.getenv("API_KEY_CACHE_TTL", 300))
+API_KEY_CACHE_NEGATIVE_TTL = float(os.getenv("API_KEY_CACHE_NEGATIVE_TTL", 30))
+
+# Recently seen Idempotency-Key values answered from memory (count, seconds)
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", 50000))
+IDEMPOTENCY_CACHE_TTL = float(os.getenv("IDEMPOTENCY_CACHE_TTL", 3600))
+# Hours a stored idempotency key is kept before `purge-idempotency-keys`
+# deletes it; retries arriving later are recorded as new rewards
+IDEMPOTENCY_KEY_RETENTION_HOURS = float(os.getenv("IDEMPOTENCY_KEY_RETENTION_HOURS", 72))
+
+# End-user balances served from memory (count, seconds). Rewards recorded by
+# this process update entries in place; the TTL bounds how long a write made
+# elsewhere (another worker, an import) can go unseen.
+USER_BALANCE_CACHE_SIZE = int(os.getenv("USER_BALANCE_CACHE_SIZE", 100000))
+USER_BALANCE_CACHE_TTL = float(os.getenv("USER_BALANCE_CACHE_TTL", 30))
+# Most user ids accepted by one batch balance lookup
+USER_BALANCE_BATCH_MAX = int(os.getenv("USER_BALANCE_BATCH_MAX", 500))
+
+# Event metadata keys a developer may promote for filtering, and how long
+# (seconds) a worker caches a developer's promoted keys
+PROMOTED_KEYS_MAX = int(os.getenv("PROMOTED_KEYS_MAX", 10))
+PROMOTED_KEYS_CACHE_TTL = float(os.getenv("PROMOTED_KEYS_CACHE_TTL", 60))
+
+# Per-developer limits on the /reward endpoints: a token bucket refilled at
+# RATE_LIMIT_PER_SECOND requests/second holding up to RATE_LIMIT_BURST, and
+# a cap on requests per UTC day. 0 disables either limit.
+RATE_LIMIT_PER_SECOND = float(os.getenv("RATE_LIMIT_PER_SECOND", 0))
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", 0))
+DAILY_REQUEST_QUOTA = int(os.getenv("DAILY_REQUEST_QUOTA", 0))
+# Per-account overrides as JSON, e.g.
+# {"42": {"per_second": 5, "burst": 10, "daily_quota": 100000}}
+RATE_LIMIT_OVERRIDES = json.loads(os.getenv("RATE_LIMIT_OVERRIDES") or "{}")
+# Counter backend shared by all workers ("" keeps limits per process) and
+# how often (seconds) each worker reconciles its usage with it
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "")
+RATE_LIMIT_SYNC_INTERVAL = float(os.getenv("RATE_LIMIT_SYNC_INTERVAL", 1.0))
+
+# Reward ingestion mode: "sync" commits each /reward request before
+# responding; "async" queues it, answers 202 with a tracking id, and lets
+# worker tasks commit queued rewards in groups.
+REWARD_INGEST_MODE = os.getenv("REWARD_INGEST_MODE", "sync")
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", 10000))
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", 4))
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", 500))
+# Retries for a developer's group before committing its requests one by one
+INGEST_GROUP_RETRIES = int(os.getenv("INGEST_GROUP_RETRIES", 2))
+INGEST_STATUS_CACHE_SIZE = int(os.getenv("INGEST_STATUS_CACHE_SIZE", 100000))
+INGEST_STATUS_TTL = float(os.getenv("INGEST_STATUS_TTL", 3600))
+
+# Apply pending schema migrations at startup instead of refusing to start
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "false").lower() in ("1", "true", "yes")
+
+# Startup skips the schema version check (and AUTO_MIGRATE) for
+# SCHEMA_CHECK_CACHE_TTL seconds after a worker on this host last found
+# every database current, recording that in a stamp file under
+# SCHEMA_CHECK_CACHE_DIR. 0 checks on every start.
+SCHEMA_CHECK_CACHE_TTL = float(os.getenv("SCHEMA_CHECK_CACHE_TTL", 300))
+SCHEMA_CHECK_CACHE_DIR = os.getenv(
+    "SCHEMA_CHECK_CACHE_DIR", os.path.join(tempfile.gettempdir(), "incentive-api")
+)
+
+# Database engine profile: "dev" (SQL echo, small pool), "prod" (no echo,
+# pre-ping and recycled connections) or "bench" (no echo, large pool, no
+# pre-ping). Each DB_* variable below overrides the profile's value.
+DB_PROFILE = os.getenv("DB_PROFILE", "prod")
+ENGINE_PROFILES = {
+    "dev": {
+        "echo": True, "pool_size": 5, "max_overflow": 5, "pool_timeout": 30,
+        "pool_pre_ping": False, "pool_recycle": -1, "statement_cache_size": 100,
+        "sqlite_pool_size": 5, "sqlite_busy_timeout_ms": 5000,
+        "sqlite_cache_size_kb": 2000,
+    },
+    "prod": {
+        "echo": False, "pool_size": 20, "max_overflow": 10, "pool_timeout": 30,
+        "pool_pre_ping": True, "pool_recycle": 1800, "statement_cache_size": 500,
+        "sqlite_pool_size": 1, "sqlite_busy_timeout_ms": 5000,
+        "sqlite_cache_size_kb": 64000,
+    },
+    "bench": {
+        "echo": False, "pool_size": 50, "max_overflow": 0, "pool_timeout": 60,
+        "pool_pre_ping": False, "pool_recycle": -1, "statement_cache_size": 1000,
+        "sqlite_pool_size": 1, "sqlite_busy_timeout_ms": 30000,
+        "sqlite_cache_size_kb": 64000,
+    },
+}
+if DB_PROFILE not in ENGINE_PROFILES:
+    raise RuntimeError(f"DB_PROFILE must be one of {sorted(ENGINE_PROFILES)}")
+_engine_profile = ENGINE_PROFILES[DB_PROFILE]
+
+
+def _profile_setting(name: str, cast):
+    value = os.getenv(f"DB_{name.upper()}")
+    if value is None:
+        return _engine_profile[name]
+    if cast is bool:
+        return value.lower() in ("1", "true", "yes")
+    return cast(value)
+
+
+DB_ECHO = _profile_setting("echo", bool)
+DB_POOL_SIZE = _profile_setting("pool_size", int)
+DB_MAX_OVERFLOW = _profile_setting("max_overflow", int)
+DB_POOL_TIMEOUT = _profile_setting("pool_timeout", float)
+DB_POOL_PRE_PING = _profile_setting("pool_pre_ping", bool)
+DB_POOL_RECYCLE = _profile_setting("pool_recycle", int)
+DB_STATEMENT_CACHE_SIZE = _profile_setting("statement_cache_size", int)
+# SQLite only. SQLite has a single writer, so extra pooled connections mostly
+# queue on its lock (with long busy-wait tails); the pool is sized separately
+# and never overflows. Also the lock wait before "database is locked" and the
+# page cache size.
+DB_SQLITE_POOL_SIZE = _profile_setting("sqlite_pool_size", int)
+DB_SQLITE_BUSY_TIMEOUT_MS = _profile_setting("sqlite_busy_timeout_ms", int)
+DB_SQLITE_CACHE_SIZE_KB = _profile_setting("sqlite_cache_size_kb", int)
+
+# Extra databases ("shards") holding some tenants' events, rewards and
+# balances, as JSON {"name": "database url"}. DATABASE_URL is the "default"
+# shard and also holds the tenant directory (developer accounts and which
+# shard each one lives on). Tenants are placed with `incentive-api move-tenant`.
+SHARD_URLS = json.loads(os.getenv("SHARD_URLS") or "{}")
+# Seconds a worker may keep using a cached tenant -> shard assignment
+SHARD_CACHE_TTL = float(os.getenv("SHARD_CACHE_TTL", 5))
+
+# Read replicas of DATABASE_URL, comma separated. Balance and deposit-address
+# reads are spread over them; a replica that fails to connect is skipped for
+# REPLICA_RETRY_INTERVAL seconds and reads fall back to the primary.
+REPLICA_URLS = [url.strip() for url in os.getenv("REPLICA_URLS", "").split(",") if url.strip()]
+REPLICA_RETRY_INTERVAL = float(os.getenv("REPLICA_RETRY_INTERVAL", 30))
+
+# Reward payouts: which custody provider settles transfers, how many pending
+# rewards one pass claims, how many transfers go in one provider call, and
+# how many provider calls may be in flight at once
+CUSTODY_PROVIDER = os.getenv("CUSTODY_PROVIDER", "fake")
+PAYOUT_CLAIM_SIZE = int(os.getenv("PAYOUT_CLAIM_SIZE", 5000))
+PAYOUT_TRANSFER_BATCH_SIZE = int(os.getenv("PAYOUT_TRANSFER_BATCH_SIZE", 500))
+PAYOUT_CONCURRENCY = int(os.getenv("PAYOUT_CONCURRENCY", 4))
+# Seconds a reward may stay "processing" before another pass reclaims it and
+# resubmits its transfer under the same reference
+PAYOUT_CLAIM_TIMEOUT = float(os.getenv("PAYOUT_CLAIM_TIMEOUT", 600))
+# Seconds a withdrawal may stay "pending" before `reconcile-withdrawals`
+# resubmits it under the same reference to learn its outcome
+WITHDRAWAL_RECONCILE_AFTER = float(os.getenv("WITHDRAWAL_RECONCILE_AFTER", 300))
+
+# Event/reward listings: default and maximum page size, and rows fetched per
+# round trip (and written per chunk) when streaming an NDJSON export
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", 100))
+HISTORY_PAGE_MAX = int(os.getenv("HISTORY_PAGE_MAX", 1000))
+EXPORT_FETCH_SIZE = int(os.getenv("EXPORT_FETCH_SIZE", 1000))
+# Connections per database reserved for exports. An export holds its
+# connection for the whole download, so exports get their own small pool
+# and queue there instead of starving requests (the prod SQLite pool has a
+# single connection)
+EXPORT_POOL_SIZE = int(os.getenv("EXPORT_POOL_SIZE", 2))
+
+# Bulk history imports: rows written per transaction (and held in memory)
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", 5000))
+# Seconds a running import job may go without committing a chunk before
+# another run of the same job may take it over (its worker likely died)
+IMPORT_JOB_LEASE = float(os.getenv("IMPORT_JOB_LEASE", 600))
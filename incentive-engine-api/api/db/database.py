@@ -1,16 +1,122 @@
 # incentive-engine-api/api/db/database.py
 
+import hashlib
+import os
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
-from api.config import DATABASE_URL
-from api.db.models import Base
-
-# Create the async engine
-engine = create_async_engine(
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from api.config import (
     DATABASE_URL,
-    echo=True,       # Log SQL for debugging; set to False in production
-    future=True
+    AUTO_MIGRATE,
+    SCHEMA_CHECK_CACHE_TTL,
+    SCHEMA_CHECK_CACHE_DIR,
+    DB_PROFILE,
+    DB_ECHO,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE,
+    DB_STATEMENT_CACHE_SIZE,
+    DB_SQLITE_POOL_SIZE,
+    DB_SQLITE_BUSY_TIMEOUT_MS,
+    DB_SQLITE_CACHE_SIZE_KB,
 )
+from api.db import migrations
+from api.utils import metrics
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that records how long checkouts wait for a connection, so
+    pool sizes can be chosen from observed contention.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.checkout_timeouts = 0
+        self.checkout_wait_total = 0.0
+        self.checkout_wait_max = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.checkout_timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            self.checkouts += 1
+            self.checkout_wait_total += waited
+            self.checkout_wait_max = max(self.checkout_wait_max, waited)
+
+
+def engine_options(url: str, pool_size: Optional[int] = None) -> Dict[str, Any]:
+    """
+    create_async_engine keyword arguments for `url` under the active DB_PROFILE.
+    `pool_size` replaces the profile's pool with a fixed one, no overflow.
+    """
+    backend = make_url(url).get_backend_name()
+    options: Dict[str, Any] = {
+        "echo": DB_ECHO,
+        "query_cache_size": DB_STATEMENT_CACHE_SIZE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+    if backend == "sqlite":
+        options["connect_args"] = {"cached_statements": DB_STATEMENT_CACHE_SIZE}
+        if make_url(url).database in (None, "", ":memory:"):
+            # In-memory databases live on a single shared connection
+            return options
+    elif make_url(url).get_driver_name() == "asyncpg":
+        options["connect_args"] = {"prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE}
+    if pool_size is None:
+        pool_size = DB_SQLITE_POOL_SIZE if backend == "sqlite" else DB_POOL_SIZE
+        max_overflow = 0 if backend == "sqlite" else DB_MAX_OVERFLOW
+    else:
+        max_overflow = 0
+    options.update(
+        poolclass=InstrumentedQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+    return options
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={int(DB_SQLITE_BUSY_TIMEOUT_MS)}")
+    # Negative cache_size is in KiB rather than pages
+    cursor.execute(f"PRAGMA cache_size=-{int(DB_SQLITE_CACHE_SIZE_KB)}")
+    cursor.close()
+
+
+def create_engine_for(url: str, pool_size: Optional[int] = None):
+    """
+    Build an async engine for `url` configured by the active DB_PROFILE.
+    SQLite connections get WAL journaling and the profile's pragmas; every
+    statement is counted and timed for /metrics.
+    """
+    db_engine = create_async_engine(url, **engine_options(url, pool_size))
+    event.listen(db_engine.sync_engine, "before_cursor_execute", metrics.before_cursor_execute)
+    event.listen(db_engine.sync_engine, "after_cursor_execute", metrics.after_cursor_execute)
+    if db_engine.dialect.name == "sqlite":
+        event.listen(db_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    return db_engine
+
+
+# Create the async engine
+engine = create_engine_for(DATABASE_URL)
 
 # Session factory for AsyncSession
 SessionLocal = sessionmaker(
@@ -19,10 +125,113 @@ SessionLocal = sessionmaker(
     expire_on_commit=False
 )
 
+
+def pool_stats(db_engine=None) -> Dict[str, Any]:
+    """
+    Snapshot of the engine's connection pool: connections in use, idle and
+    in overflow, plus checkout counts and wait times (seconds).
+    """
+    pool = (db_engine or engine).sync_engine.pool
+    stats: Dict[str, Any] = {"profile": DB_PROFILE, "pool": type(pool).__name__}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=max(pool.overflow(), 0),
+        )
+    if isinstance(pool, InstrumentedQueuePool):
+        stats.update(
+            checkouts=pool.checkouts,
+            checkout_timeouts=pool.checkout_timeouts,
+            checkout_wait_total=pool.checkout_wait_total,
+            checkout_wait_avg=pool.checkout_wait_total / pool.checkouts if pool.checkouts else 0.0,
+            checkout_wait_max=pool.checkout_wait_max,
+        )
+    return stats
+
+
+def _all_engines() -> list:
+    # Imported here: the shard router builds its engines with create_engine_for
+    from api.db.sharding import shard_router
+    return [engine, *shard_router.engines().values()]
+
+
+async def migrate_db() -> list:
+    """
+    Apply pending schema migrations to the main database and every shard.
+    Returns the migrations applied to the main database.
+    """
+    applied = []
+    for index, db_engine in enumerate(_all_engines()):
+        async with db_engine.begin() as conn:
+            result = await conn.run_sync(migrations.upgrade)
+        if index == 0:
+            applied = result
+    return applied
+
+
+def _schema_stamp(urls) -> Optional[str]:
+    """
+    Path of the file recording that the databases at `urls` were found at
+    LATEST_VERSION, or None when the check must not be cached: caching is
+    off, or a database is in-memory or a SQLite file that doesn't exist.
+    A SQLite file's inode is part of the key, so a recreated file is
+    checked again.
+    """
+    if SCHEMA_CHECK_CACHE_TTL <= 0:
+        return None
+    parts = [str(migrations.LATEST_VERSION)]
+    for url in map(make_url, urls):
+        if url.get_backend_name() == "sqlite":
+            if url.database in (None, "", ":memory:"):
+                return None
+            try:
+                parts.append(str(os.stat(url.database).st_ino))
+            except OSError:
+                return None
+        parts.append(url.render_as_string(hide_password=True))
+    digest = hashlib.sha256("\n".join(parts).encode()).hexdigest()[:16]
+    return os.path.join(SCHEMA_CHECK_CACHE_DIR, f"schema-{digest}")
+
+
+def _stamp_is_fresh(path: str) -> bool:
+    try:
+        return time.time() - os.stat(path).st_mtime < SCHEMA_CHECK_CACHE_TTL
+    except OSError:
+        return False
+
+
+def _write_stamp(path: str) -> None:
+    # Best effort: without the stamp the next start just checks again
+    try:
+        os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+        with open(path, "a"):
+            pass
+        os.utime(path)
+    except OSError:
+        pass
+
+
 async def init_db():
     """
-    Initialize the database by creating all tables.
-    Should be called on application startup.
+    Verify the database schema version on application startup.
+    Migrations are applied here only when AUTO_MIGRATE is enabled;
+    otherwise an outdated schema (on any shard) stops startup with
+    SchemaVersionError.
+
+    A successful check is cached in a stamp file for
+    SCHEMA_CHECK_CACHE_TTL seconds; starts within that window (other
+    workers, restarts) skip it and open no connections.
     """
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    from api.db.sharding import shard_router
+    stamp = _schema_stamp([DATABASE_URL, *shard_router.urls.values()])
+    if stamp is not None and _stamp_is_fresh(stamp):
+        return
+    if AUTO_MIGRATE:
+        await migrate_db()
+    for db_engine in _all_engines():
+        async with db_engine.connect() as conn:
+            await conn.run_sync(migrations.check_version)
+    if stamp is not None:
+        _write_stamp(stamp)
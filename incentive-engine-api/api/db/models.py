@@ -1,10 +1,13 @@
 # incentive-engine-api/api/db/models.py
 
 from sqlalchemy import (
-    Column, Integer, String, DateTime, Float, ForeignKey, JSON
+    Column, Integer, String, DateTime, Float, ForeignKey, Index
 )
 from sqlalchemy.orm import relationship, declarative_base
 from datetime import datetime
+import uuid
+
+from api.db.types import CompressedJSON
 
 Base = declarative_base()
 
@@ -29,6 +32,17 @@ class Event(Base):
     Records each incoming reward request before payout.
     """
     __tablename__ = "events"
+    __table_args__ = (
+        # Per-developer event history in time order
+        Index("ix_events_developer_timestamp", "developer_account_id", "timestamp"),
+        # Event listings filtered by end user
+        Index(
+            "ix_events_developer_user_timestamp",
+            "developer_account_id",
+            "user_id",
+            "timestamp",
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     developer_account_id = Column(
@@ -36,7 +50,10 @@ class Event(Base):
     )
     event_name = Column(String, nullable=False)
     user_id = Column(String, nullable=False)
-    metadata = Column(JSON, nullable=True)
+    # Stored compressed in `metadata_blob`; databases upgraded from before
+    # migration 9 keep an emptied legacy `metadata` JSON column. Declarative
+    # classes reserve the `metadata` attribute name for Base.metadata
+    meta = Column("metadata_blob", CompressedJSON, key="meta", nullable=True)
     timestamp = Column(DateTime, default=datetime.utcnow)
 
     # Relationships
@@ -49,6 +66,15 @@ class Reward(Base):
     Tracks individual reward transactions tied to an Event.
     """
     __tablename__ = "rewards"
+    __table_args__ = (
+        # Per-developer rewards by settlement state (e.g. pending payouts)
+        Index("ix_rewards_developer_status", "developer_account_id", "status"),
+        Index("ix_rewards_event_id", "event_id"),
+        # Payout worker scans pending rewards oldest-first
+        Index("ix_rewards_status_id", "status", "id"),
+        # Reward listings in (timestamp, id) keyset order
+        Index("ix_rewards_developer_timestamp", "developer_account_id", "timestamp", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     event_id = Column(Integer, ForeignKey("events.id"), nullable=False)
@@ -56,9 +82,13 @@ class Reward(Base):
         Integer, ForeignKey("developer_accounts.id"), nullable=False
     )
     amount = Column(Float, nullable=False)
-    status = Column(String, default="pending")  # e.g., pending, paid, failed
+    status = Column(String, default="pending")  # pending, processing, paid, failed
     tx_hash = Column(String, nullable=True)
     timestamp = Column(DateTime, default=datetime.utcnow)
+    # Set when a payout worker claims the reward; stale claims are reclaimed
+    claimed_at = Column(DateTime, nullable=True)
+    # Transfer.reference the reward is settled under, fixed before submission
+    payout_reference = Column(String, nullable=True)
 
     # Relationships
     event = relationship("Event", back_populates="rewards")
@@ -70,6 +100,15 @@ class UserBalance(Base):
     Caches the current USDC balance for each user per developer.
     """
     __tablename__ = "user_balances"
+    __table_args__ = (
+        # One balance row per end user per developer; also the upsert target
+        Index(
+            "ux_user_balances_developer_user",
+            "developer_account_id",
+            "user_id",
+            unique=True,
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     developer_account_id = Column(
@@ -80,3 +119,241 @@ class UserBalance(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     developer_account = relationship("DeveloperAccount")
+
+
+class UserWallet(Base):
+    """
+    On-chain address each end user's rewards are paid out to, per developer.
+    """
+    __tablename__ = "user_wallets"
+    __table_args__ = (
+        Index(
+            "ux_user_wallets_developer_user",
+            "developer_account_id",
+            "user_id",
+            unique=True,
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    developer_account_id = Column(
+        Integer, ForeignKey("developer_accounts.id"), nullable=False
+    )
+    user_id = Column(String, nullable=False)
+    address = Column(String, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class DeveloperBalance(Base):
+    """
+    Running total of each developer's funds, updated in the same transaction
+    as every reward and withdrawal so balance reads are a primary-key lookup.
+    Can be rebuilt from user_balances with `incentive-api reconcile-balances`.
+    """
+    __tablename__ = "developer_balances"
+
+    developer_account_id = Column(
+        Integer, ForeignKey("developer_accounts.id"), primary_key=True
+    )
+    balance = Column(Float, nullable=False, default=0.0)
+    withdrawn = Column(Float, nullable=False, default=0.0)  # lifetime total
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    developer_account = relationship("DeveloperAccount")
+
+
+class RewardRollup(Base):
+    """
+    Reward count and total per developer, event name and hour or day,
+    incremented in the same transaction as the rewards it counts. Can be
+    rebuilt from rewards with `incentive-api rebuild-rollups`.
+    """
+    __tablename__ = "reward_rollups"
+    __table_args__ = (
+        # Stats range scans; also the upsert target
+        Index(
+            "ux_reward_rollups_key",
+            "developer_account_id",
+            "granularity",
+            "bucket_start",
+            "event_name",
+            unique=True,
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    developer_account_id = Column(
+        Integer, ForeignKey("developer_accounts.id"), nullable=False
+    )
+    granularity = Column(String, nullable=False)  # hour, day
+    bucket_start = Column(DateTime, nullable=False)
+    event_name = Column(String, nullable=False)
+    reward_count = Column(Integer, nullable=False, default=0)
+    amount_total = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class IdempotencyKey(Base):
+    """
+    Remembers the response to a keyed reward request so client retries
+    are answered with the original result instead of crediting twice.
+    """
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        Index(
+            "ux_idempotency_keys_developer_key",
+            "developer_account_id",
+            "key",
+            unique=True,
+        ),
+        # Retention purge deletes the oldest keys first
+        Index("ix_idempotency_keys_created_at", "created_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    developer_account_id = Column(
+        Integer, ForeignKey("developer_accounts.id"), nullable=False
+    )
+    key = Column(String, nullable=False)
+    reward_id = Column(Integer, ForeignKey("rewards.id"), nullable=False)
+    balance = Column(Float, nullable=False)  # user balance reported at the time
+    status = Column(String, nullable=False)
+    # SHA-256 of the request that used the key; reuse with another request is refused
+    request_hash = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class Withdrawal(Base):
+    """
+    Ledger of developer withdrawals. Each row is inserted in the transaction
+    that debits its amount from developer_balances; a failed transfer is
+    refunded and the row marked failed. Rows whose transfer outcome is
+    unknown stay pending until reconciled.
+    """
+    __tablename__ = "withdrawals"
+    __table_args__ = (
+        Index("ix_withdrawals_developer_created", "developer_account_id", "created_at"),
+        # Reconciliation looks for long-pending rows
+        Index("ix_withdrawals_status_updated", "status", "updated_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    developer_account_id = Column(
+        Integer, ForeignKey("developer_accounts.id"), nullable=False
+    )
+    user_address = Column(String, nullable=False)
+    amount = Column(Float, nullable=False)
+    status = Column(String, nullable=False, default="pending")  # pending, submitted, failed
+    tx_hash = Column(String, nullable=True)
+    error = Column(String, nullable=True)
+    # Transfer.reference the withdrawal is sent under. Random rather than
+    # derived from the id, which is only unique within one shard
+    reference = Column(String, nullable=True, default=lambda: f"withdrawal-{uuid.uuid4().hex}")
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    developer_account = relationship("DeveloperAccount")
+
+
+class TenantShard(Base):
+    """
+    Tenant directory entry: the shard holding a developer's events, rewards
+    and balances. Developers without a row live on the default shard.
+    """
+    __tablename__ = "tenant_shards"
+
+    developer_account_id = Column(
+        Integer, ForeignKey("developer_accounts.id"), primary_key=True
+    )
+    shard = Column(String, nullable=False)
+    state = Column(String, nullable=False, default="active")  # active, moving
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class RateLimitCounter(Base):
+    """
+    Shared rate-limit counter, incremented by every API worker (the
+    `database` RATE_LIMIT_BACKEND). An expired counter restarts from zero.
+    """
+    __tablename__ = "rate_limit_counters"
+    __table_args__ = (
+        # Expired counters are purged oldest first
+        Index("ix_rate_limit_counters_expires_at", "expires_at"),
+    )
+
+    key = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    expires_at = Column(DateTime, nullable=False)
+
+
+class ImportJob(Base):
+    """
+    Progress of a bulk history import. `rows_committed` is advanced in the
+    same transaction as each imported chunk, so a rerun of the same job
+    resumes right after the last committed chunk.
+    """
+    __tablename__ = "import_jobs"
+    __table_args__ = (
+        Index("ux_import_jobs_developer_name", "developer_account_id", "name", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    developer_account_id = Column(
+        Integer, ForeignKey("developer_accounts.id"), nullable=False
+    )
+    name = Column(String, nullable=False)
+    format = Column(String, nullable=False)  # csv or ndjson
+    rows_committed = Column(Integer, nullable=False, default=0)
+    status = Column(String, nullable=False, default="running")  # running, completed, failed
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class PromotedMetadataKey(Base):
+    """
+    An event metadata key a developer filters or aggregates on. Values of
+    promoted keys are copied into `event_attributes` as events are written.
+    """
+    __tablename__ = "promoted_metadata_keys"
+    __table_args__ = (
+        Index("ux_promoted_metadata_keys_developer_key", "developer_account_id", "key", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    developer_account_id = Column(
+        Integer, ForeignKey("developer_accounts.id"), nullable=False
+    )
+    key = Column(String, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class EventAttribute(Base):
+    """
+    The value of one promoted metadata key on one event. `timestamp` copies
+    the event's, so filtered listings page through this table's index in
+    (timestamp, event id) order.
+    """
+    __tablename__ = "event_attributes"
+    __table_args__ = (
+        # Filtered listings and per-value aggregates
+        Index(
+            "ix_event_attributes_lookup",
+            "developer_account_id",
+            "key",
+            "value",
+            "timestamp",
+            "event_id",
+        ),
+        # Backfills, shard moves and deletes by event
+        Index("ix_event_attributes_event_id", "event_id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    event_id = Column(Integer, ForeignKey("events.id"), nullable=False)
+    developer_account_id = Column(
+        Integer, ForeignKey("developer_accounts.id"), nullable=False
+    )
+    key = Column(String, nullable=False)
+    value = Column(String, nullable=False)
+    timestamp = Column(DateTime, nullable=False)
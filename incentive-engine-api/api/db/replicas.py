@@ -0,0 +1,127 @@
+# incentive-engine-api/api/db/replicas.py
+
+"""
+Read-only sessions spread over the primary database's replicas.
+
+Reads that can tolerate replication lag take a session from `read_session`.
+It rotates over REPLICA_URLS and skips replicas that recently failed to
+connect. When no replica is reachable, the read falls back to the primary.
+Callers needing read-your-writes consistency pass `fresh=True` and always
+read the primary. Replica engines are created on first use.
+"""
+
+import asyncio
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from api.config import REPLICA_RETRY_INTERVAL, REPLICA_URLS
+from api.db.database import SessionLocal, create_engine_for
+
+# Errors meaning the database could not be reached, as opposed to a bad query
+CONNECT_ERRORS = (exc.DBAPIError, OSError, asyncio.TimeoutError)
+
+
+class ReplicaSet:
+    """
+    Round-robin over replica session factories, with the primary as fallback.
+    """
+
+    def __init__(
+        self,
+        urls: List[str],
+        primary_factory: Callable[[], AsyncSession],
+        retry_interval: float = REPLICA_RETRY_INTERVAL,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.primary_factory = primary_factory
+        self.retry_interval = retry_interval
+        self._clock = clock
+        self.urls = list(urls)
+        self._engines: Dict[int, object] = {}
+        self._factories: Dict[int, Callable[[], AsyncSession]] = {}
+        self._next = itertools.count()
+        # Replica index -> clock time before which it is not tried again
+        self._down_until: Dict[int, float] = {}
+        # Reads served by each replica, and reads that fell back to the primary
+        self.reads = [0] * len(self.urls)
+        self.fallbacks = 0
+
+    def _factory(self, index: int) -> Callable[[], AsyncSession]:
+        factory = self._factories.get(index)
+        if factory is None:
+            self._engines[index] = create_engine_for(self.urls[index])
+            factory = self._factories[index] = sessionmaker(
+                bind=self._engines[index], class_=AsyncSession, expire_on_commit=False
+            )
+        return factory
+
+    def engines(self) -> list:
+        """
+        Every replica's engine, creating any not used yet.
+        """
+        for index in range(len(self.urls)):
+            self._factory(index)
+        return [self._engines[index] for index in range(len(self.urls))]
+
+    def _candidates(self) -> List[int]:
+        """
+        Replica indexes to try, in order: the healthy ones starting from the
+        next in rotation.
+        """
+        count = len(self.urls)
+        if not count:
+            return []
+        start = next(self._next) % count
+        now = self._clock()
+        order = [(start + offset) % count for offset in range(count)]
+        return [i for i in order if self._down_until.get(i, 0) <= now]
+
+    async def _open(self, index: int) -> Optional[AsyncSession]:
+        """
+        Open a session on replica `index` and make sure it can connect.
+        Returns None (and benches the replica) if it can't.
+        """
+        session = self._factory(index)()
+        try:
+            await session.connection()
+        except CONNECT_ERRORS:
+            await session.close()
+            self._down_until[index] = self._clock() + self.retry_interval
+            return None
+        self._down_until.pop(index, None)
+        return session
+
+    @asynccontextmanager
+    async def session(self, fresh: bool = False) -> AsyncIterator[AsyncSession]:
+        """
+        Yield a session for reads: on a reachable replica, or on the primary
+        when `fresh` is set or every replica is down.
+        """
+        if not fresh:
+            for index in self._candidates():
+                session = await self._open(index)
+                if session is not None:
+                    self.reads[index] += 1
+                    async with session:
+                        yield session
+                    return
+            if self.urls:
+                self.fallbacks += 1
+        async with self.primary_factory() as session:
+            yield session
+
+
+replica_set = ReplicaSet(REPLICA_URLS, SessionLocal)
+
+
+def read_session(fresh: bool = False):
+    """
+    Async context manager yielding a read-only session; see ReplicaSet.session.
+    """
+    return replica_set.session(fresh)
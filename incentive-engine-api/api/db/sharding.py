@@ -0,0 +1,192 @@
+# incentive-engine-api/api/db/sharding.py
+
+"""
+Routes each tenant (developer account) to the database shard holding its
+events, rewards and balances.
+
+The default shard is the main DATABASE_URL database, which also holds the
+tenant directory: developer accounts and the `tenant_shards` table saying
+which other shard, if any, a tenant lives on. Assignments are cached per
+process for SHARD_CACHE_TTL seconds. With no SHARD_URLS configured every
+tenant is on the default shard and routing is free. Shard engines are
+created on first use, so a worker only connects to shards it serves.
+
+Exports hold a connection for as long as the client downloads, so each
+shard also gets an export engine with EXPORT_POOL_SIZE connections of its
+own; a slow download then waits on other exports, never on requests.
+"""
+
+import math
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from sqlalchemy.engine import make_url
+
+from api.config import DATABASE_URL, EXPORT_POOL_SIZE, SHARD_CACHE_TTL, SHARD_URLS
+from api.db.database import SessionLocal, create_engine_for
+from api.db.models import TenantShard
+from api.utils.cache import TTLCache, MISSING
+
+DEFAULT_SHARD = "default"
+
+
+class ShardRouter:
+    """
+    Maps developer account ids to shards and hands out sessions for them.
+    """
+
+    def __init__(
+        self,
+        urls: Dict[str, str],
+        default_factory: Callable[[], AsyncSession],
+        cache_ttl: float = SHARD_CACHE_TTL,
+        default_url: Optional[str] = None,
+        export_pool_size: int = EXPORT_POOL_SIZE,
+    ):
+        if DEFAULT_SHARD in urls:
+            raise RuntimeError(f"SHARD_URLS may not redefine the {DEFAULT_SHARD!r} shard")
+        self.urls = dict(urls)
+        self.cache_ttl = cache_ttl
+        self.default_url = default_url
+        self.export_pool_size = export_pool_size
+        self._factories: Dict[str, Callable[[], AsyncSession]] = {DEFAULT_SHARD: default_factory}
+        self._engines = {}
+        self._export_factories: Dict[str, Callable[[], AsyncSession]] = {}
+        self._export_engines = {}
+        # developer id -> (shard, state)
+        self._assignments = TTLCache(maxsize=100000, ttl=cache_ttl)
+
+    @property
+    def names(self) -> List[str]:
+        return [DEFAULT_SHARD, *self.urls]
+
+    @property
+    def sharded(self) -> bool:
+        return bool(self.urls)
+
+    def session_factory(self, shard: str) -> Callable[[], AsyncSession]:
+        factory = self._factories.get(shard)
+        if factory is None:
+            if shard not in self.urls:
+                raise RuntimeError(f"Unknown shard {shard!r}; expected one of {self.names}")
+            self._engines[shard] = create_engine_for(self.urls[shard])
+            factory = self._factories[shard] = sessionmaker(
+                bind=self._engines[shard], class_=AsyncSession, expire_on_commit=False
+            )
+        return factory
+
+    def export_factory(self, shard: str) -> Callable[[], AsyncSession]:
+        """
+        Session factory for long-running exports on `shard`, backed by a
+        separate pool of `export_pool_size` connections. Falls back to the
+        shard's regular factory when its URL is unknown or in-memory (a
+        second engine would open a different database).
+        """
+        factory = self._export_factories.get(shard)
+        if factory is None:
+            url = self.default_url if shard == DEFAULT_SHARD else self.urls.get(shard)
+            if url is None or make_url(url).database in (None, "", ":memory:"):
+                return self.session_factory(shard)
+            self._export_engines[shard] = create_engine_for(url, pool_size=self.export_pool_size)
+            factory = self._export_factories[shard] = sessionmaker(
+                bind=self._export_engines[shard], class_=AsyncSession, expire_on_commit=False
+            )
+        return factory
+
+    def engines(self) -> Dict[str, object]:
+        """
+        Engines of the configured shards other than the default one,
+        creating any not used yet.
+        """
+        for name in self.urls:
+            self.session_factory(name)
+        return dict(self._engines)
+
+    async def assignment(
+        self, developer_id: int, session: Optional[AsyncSession] = None
+    ) -> Tuple[str, str]:
+        """
+        Return (shard, state) for the developer, reading the directory with
+        `session` (or a default-shard session) on a cache miss.
+        """
+        if not self.sharded:
+            return DEFAULT_SHARD, "active"
+        entry = self._assignments.get(developer_id)
+        if entry is MISSING:
+            stmt = select(TenantShard.shard, TenantShard.state).where(
+                TenantShard.developer_account_id == developer_id
+            )
+            if session is None:
+                async with self._factories[DEFAULT_SHARD]() as own_session:
+                    row = (await own_session.execute(stmt)).first()
+            else:
+                row = (await session.execute(stmt)).first()
+            entry = tuple(row) if row else (DEFAULT_SHARD, "active")
+            self._assignments.set(developer_id, entry)
+        return entry
+
+    async def shard_for(self, developer_id: int, session: Optional[AsyncSession] = None) -> str:
+        """
+        The developer's shard. Raises 503 while the tenant is being moved.
+        """
+        shard, state = await self.assignment(developer_id, session)
+        if state == "moving":
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Account data is being moved between shards; retry shortly",
+                headers={"Retry-After": str(max(1, math.ceil(self.cache_ttl)))},
+            )
+        return shard
+
+    async def moving_tenants(self) -> List[int]:
+        """
+        Developers currently being moved, read from the directory itself.
+        Background jobs (payouts) leave their rows alone until the move ends.
+        """
+        if not self.sharded:
+            return []
+        async with self._factories[DEFAULT_SHARD]() as session:
+            return list((await session.execute(
+                select(TenantShard.developer_account_id).where(TenantShard.state == "moving")
+            )).scalars())
+
+    def forget(self, developer_id: int) -> None:
+        """
+        Drop this process's cached assignment for the developer.
+        """
+        self._assignments.invalidate(developer_id)
+
+    async def factory_for(self, developer_id: int) -> Callable[[], AsyncSession]:
+        """
+        Session factory for the developer's shard.
+        """
+        return self.session_factory(await self.shard_for(developer_id))
+
+    async def export_factory_for(self, developer_id: int) -> Callable[[], AsyncSession]:
+        """
+        Export session factory for the developer's shard.
+        """
+        return self.export_factory(await self.shard_for(developer_id))
+
+
+shard_router = ShardRouter(SHARD_URLS, SessionLocal, default_url=DATABASE_URL)
+
+
+@asynccontextmanager
+async def tenant_session(session: AsyncSession, developer_id: int) -> AsyncIterator[AsyncSession]:
+    """
+    Yield a session on the shard holding `developer_id`'s data. `session`
+    is the caller's default-shard session: it is used for the directory
+    lookup and reused as-is for tenants on the default shard.
+    """
+    shard = await shard_router.shard_for(developer_id, session)
+    if shard == DEFAULT_SHARD:
+        yield session
+        return
+    async with shard_router.session_factory(shard)() as shard_session:
+        yield shard_session
@@ -0,0 +1,61 @@
+# incentive-engine-api/api/db/types.py
+
+"""
+Custom column types.
+"""
+
+import json
+import zlib
+from typing import Any, Optional
+
+from sqlalchemy import LargeBinary
+from sqlalchemy.types import TypeDecorator
+
+# Payloads shorter than this are stored as plain JSON: zlib's header and
+# checksum would outweigh the savings
+COMPRESS_MIN_BYTES = 128
+
+_PLAIN = b"j"
+_ZLIB = b"z"
+
+
+def pack_json(value: Any) -> Optional[bytes]:
+    """
+    Serialize `value` to compact JSON, zlib-compressed when large enough to
+    benefit. The first byte records which encoding was used.
+    """
+    if value is None:
+        return None
+    raw = json.dumps(value, separators=(",", ":")).encode()
+    if len(raw) < COMPRESS_MIN_BYTES:
+        return _PLAIN + raw
+    return _ZLIB + zlib.compress(raw)
+
+
+def unpack_json(data: Optional[bytes]) -> Any:
+    """
+    Inverse of pack_json.
+    """
+    if data is None:
+        return None
+    data = bytes(data)
+    body = data[1:]
+    if data[:1] == _ZLIB:
+        body = zlib.decompress(body)
+    return json.loads(body)
+
+
+class CompressedJSON(TypeDecorator):
+    """
+    JSON stored as a binary blob, compressed when large (see pack_json).
+    Not queryable from SQL; promote keys that need filtering.
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return pack_json(value)
+
+    def process_result_value(self, value, dialect):
+        return unpack_json(value)
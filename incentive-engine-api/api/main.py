@@ -1,19 +1,39 @@
 # incentive-engine-api/api/main.py
 
 from fastapi import FastAPI
+from api.config import REWARD_INGEST_MODE
 from api.db.database import init_db
+from api.services.ingest_service import reward_ingestor
+from api.utils.invalidation import invalidation_bus
 from api.routes.reward import router as reward_router
 from api.routes.accounts import router as accounts_router
+from api.routes.health import router as health_router
+from api.routes.metrics import router as metrics_router
 
 app = FastAPI(title="Incentive Engine API")
 
 @app.on_event("startup")
 async def on_startup():
     """
-    Initialize the database tables before handling any requests.
+    Initialize the database tables before handling any requests, and join
+    the other workers' cache invalidation channel.
     """
     await init_db()
+    await invalidation_bus.start()
+    if REWARD_INGEST_MODE == "async":
+        await reward_ingestor.start()
 
-# Mount the reward and accounts routers
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    """
+    Commit any queued rewards before the process exits.
+    """
+    await reward_ingestor.drain()
+    await invalidation_bus.stop()
+
+# Mount the reward, accounts, health and metrics routers
 app.include_router(reward_router)
 app.include_router(accounts_router)
+app.include_router(health_router)
+app.include_router(metrics_router)
@@ -1,7 +1,7 @@
 # incentive-engine-api/api/models/account.py
 
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Dict, Optional
 
 
 class AccountCreateResponse(BaseModel):
@@ -31,6 +31,38 @@ class BalanceResponse(BaseModel):
     balance: float = Field(..., description="Current USDC balance in the developer's wallet")
 
 
+class UserBalanceResponse(BaseModel):
+    """
+    Response schema for GET /accounts/{account_id}/users/{user_id}/balance.
+    """
+    user_id: str = Field(..., description="End user identifier")
+    balance: float = Field(..., description="USDC the end user has been rewarded")
+
+
+class UserBalancesResponse(BaseModel):
+    """
+    Response schema for GET /accounts/{account_id}/users/balances.
+    """
+    balances: Dict[str, float] = Field(
+        ..., description="Balance per requested end user (0 if never rewarded)"
+    )
+
+
+class UserAddressRequest(BaseModel):
+    """
+    Request schema for PUT /accounts/{account_id}/users/{user_id}/address.
+    """
+    address: str = Field(..., min_length=1, description="On-chain address rewards are paid out to")
+
+
+class UserAddressResponse(BaseModel):
+    """
+    Response schema for PUT /accounts/{account_id}/users/{user_id}/address.
+    """
+    user_id: str = Field(..., description="End user identifier")
+    address: str = Field(..., description="On-chain address rewards are paid out to")
+
+
 class WithdrawRequest(BaseModel):
     """
     Request schema for POST /accounts/{account_id}/withdraw.
@@ -0,0 +1,51 @@
+# incentive-engine-api/api/models/history.py
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class EventRecord(BaseModel):
+    """
+    One row of GET /accounts/{account_id}/events.
+    """
+    id: int = Field(..., description="Internal ID of the event")
+    event: str = Field(..., description="Name of the event")
+    user_id: str = Field(..., description="End user the event was recorded for")
+    metadata: Optional[Dict[str, Any]] = Field(None, description="Extra data sent with the event")
+    timestamp: datetime = Field(..., description="When the event was recorded (UTC)")
+
+
+class RewardRecord(BaseModel):
+    """
+    One row of GET /accounts/{account_id}/rewards.
+    """
+    id: int = Field(..., description="Internal ID of the reward")
+    event_id: int = Field(..., description="Event that triggered the reward")
+    event: str = Field(..., description="Name of the triggering event")
+    user_id: str = Field(..., description="End user credited by the reward")
+    amount: float = Field(..., description="Amount of USDC rewarded")
+    status: str = Field(..., description="Settlement status (pending, processing, paid, failed)")
+    tx_hash: Optional[str] = Field(None, description="Payout transaction hash once paid")
+    timestamp: datetime = Field(..., description="When the reward was recorded (UTC)")
+
+
+class EventPage(BaseModel):
+    """
+    A page of events in (timestamp, id) order.
+    """
+    items: List[EventRecord] = Field(..., description="Events on this page")
+    next_cursor: Optional[str] = Field(
+        None, description="Pass as `cursor` to fetch the next page; null on the last page"
+    )
+
+
+class RewardPage(BaseModel):
+    """
+    A page of rewards in (timestamp, id) order.
+    """
+    items: List[RewardRecord] = Field(..., description="Rewards on this page")
+    next_cursor: Optional[str] = Field(
+        None, description="Pass as `cursor` to fetch the next page; null on the last page"
+    )
@@ -0,0 +1,13 @@
+# incentive-engine-api/api/models/imports.py
+
+from pydantic import BaseModel, Field
+
+
+class ImportResponse(BaseModel):
+    """
+    Response of POST /accounts/{account_id}/import.
+    """
+    job: str = Field(..., description="Name of the import job")
+    rows_committed: int = Field(..., description="Rows imported by this job so far, across runs")
+    rows_skipped: int = Field(..., description="Leading rows skipped because an earlier run committed them")
+    status: str = Field(..., description="Job status after this run (completed)")
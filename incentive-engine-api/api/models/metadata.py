@@ -0,0 +1,25 @@
+# incentive-engine-api/api/models/metadata.py
+
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class MetadataValueStats(BaseModel):
+    """
+    Rewards for events carrying one value of a promoted metadata key.
+    """
+    value: str = Field(..., description="Value of the key (numbers and booleans as JSON)")
+    rewards: int = Field(..., description="Number of rewards issued")
+    amount: float = Field(..., description="Total USDC rewarded")
+
+
+class MetadataBreakdownResponse(BaseModel):
+    """
+    Response schema for GET /accounts/{account_id}/metadata/{key}.
+    """
+    key: str = Field(..., description="Promoted metadata key")
+    since: Optional[datetime] = Field(None, description="Events recorded at or after (UTC)")
+    until: Optional[datetime] = Field(None, description="Events recorded before (UTC)")
+    values: List[MetadataValueStats] = Field(..., description="One entry per value, in value order")
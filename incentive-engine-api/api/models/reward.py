@@ -1,7 +1,7 @@
 # incentive-engine-api/api/models/reward.py
 
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
 
 class RewardRequest(BaseModel):
@@ -12,6 +12,11 @@ class RewardRequest(BaseModel):
     user_id: str = Field(..., description="Unique identifier for the end user")
     amount: float = Field(..., gt=0, description="Amount of USDC to reward (must be positive)")
     metadata: Optional[Dict[str, Any]] = Field(default_factory=dict, description="Optional extra data")
+    idempotency_key: Optional[str] = Field(
+        None,
+        max_length=255,
+        description="Client-chosen key; retries with the same key return the original result",
+    )
 
 
 class RewardResponse(BaseModel):
@@ -21,3 +26,51 @@ class RewardResponse(BaseModel):
     reward_id: int = Field(..., description="Internal ID of the created reward record")
     balance: float = Field(..., description="The user's updated USDC balance")
     status: str = Field(..., description="Current status of the reward (e.g., 'pending')")
+
+
+class BatchRewardRequest(BaseModel):
+    """
+    Schema for POST /reward/batch requests.
+
+    Items are validated one by one against RewardRequest so that a single
+    malformed entry is reported in its result instead of rejecting the batch.
+    """
+    items: List[Dict[str, Any]] = Field(..., description="Reward requests to process together")
+
+
+class BatchRewardResult(BaseModel):
+    """
+    Outcome of a single item in a batch reward request.
+    """
+    index: int = Field(..., description="Position of the item in the submitted batch")
+    reward_id: Optional[int] = Field(None, description="Internal ID of the created reward record")
+    balance: Optional[float] = Field(None, description="The user's USDC balance after this item")
+    status: str = Field(..., description="Reward status (e.g., 'pending'), or 'rejected'")
+    error: Optional[str] = Field(None, description="Why the item was rejected, if it was")
+
+
+class BatchRewardResponse(BaseModel):
+    """
+    Schema for responses to POST /reward/batch.
+    """
+    accepted: int = Field(..., description="Number of items recorded")
+    rejected: int = Field(..., description="Number of items rejected")
+    results: List[BatchRewardResult] = Field(..., description="Per-item results, in request order")
+
+
+class RewardAcceptedResponse(BaseModel):
+    """
+    Schema for 202 responses to POST /reward in asynchronous ingestion mode.
+    """
+    tracking_id: str = Field(..., description="ID to poll at GET /reward/status/{tracking_id}")
+    status: str = Field(..., description="Always 'queued'")
+
+
+class RewardStatusResponse(BaseModel):
+    """
+    Schema for GET /reward/status/{tracking_id}.
+    """
+    tracking_id: str = Field(..., description="ID returned when the reward was queued")
+    status: str = Field(..., description="'queued', 'committed' or 'failed'")
+    result: Optional[RewardResponse] = Field(None, description="The recorded reward, once committed")
+    error: Optional[str] = Field(None, description="Why the reward failed, if it did")
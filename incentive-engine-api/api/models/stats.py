@@ -0,0 +1,28 @@
+# incentive-engine-api/api/models/stats.py
+
+from datetime import datetime
+from typing import List
+
+from pydantic import BaseModel, Field
+
+
+class StatsBucket(BaseModel):
+    """
+    Rewards for one event name in one hour or day.
+    """
+    bucket: datetime = Field(..., description="Start of the hour or day (UTC)")
+    event: str = Field(..., description="Name of the event")
+    rewards: int = Field(..., description="Number of rewards issued")
+    amount: float = Field(..., description="Total USDC rewarded")
+
+
+class StatsResponse(BaseModel):
+    """
+    Response schema for GET /accounts/{account_id}/stats.
+    """
+    granularity: str = Field(..., description="Bucket size (hour or day)")
+    since: datetime = Field(..., description="Start of the first bucket included (UTC)")
+    until: datetime = Field(..., description="Buckets starting at or after this are excluded (UTC)")
+    total_rewards: int = Field(..., description="Rewards across all returned buckets")
+    total_amount: float = Field(..., description="USDC across all returned buckets")
+    buckets: List[StatsBucket] = Field(..., description="Buckets in time order, then by event")
@@ -4,26 +4,53 @@
 HTTP routes for managing developer accounts and their sub-wallets.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Header
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status, Header
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from api.config import API_KEY
+from api.config import API_KEY, HISTORY_PAGE_SIZE, HISTORY_PAGE_MAX, USER_BALANCE_BATCH_MAX
 from api.db.database import SessionLocal
+from api.db.replicas import read_session
+from api.db.sharding import shard_router, tenant_session
 from api.services.account_service import (
     create_account,
     get_deposit_address,
     get_balance,
+    get_user_balances,
+    set_user_address,
     withdraw,
 )
 from api.models.account import (
     AccountCreateResponse,
     DepositAddressResponse,
     BalanceResponse,
+    UserAddressRequest,
+    UserAddressResponse,
+    UserBalanceResponse,
+    UserBalancesResponse,
     WithdrawRequest,
     WithdrawResponse,
 )
+from api.models.history import EventPage, RewardPage
+from api.models.imports import ImportResponse
+from api.models.metadata import MetadataBreakdownResponse
+from api.models.stats import StatsResponse
+from api.services.history_service import (
+    list_events,
+    list_rewards,
+    export_events,
+    export_rewards,
+)
+from api.services.import_service import import_rewards
+from api.services.metadata_service import attribute_filters, metadata_breakdown
+from api.services.rollup_service import default_window, get_stats
+from api.utils.auth import developer_auth
+from api.utils.metrics import InstrumentedRoute
 
-router = APIRouter(prefix="/accounts", tags=["accounts"])
+router = APIRouter(prefix="/accounts", route_class=InstrumentedRoute, tags=["accounts"])
 
 
 async def get_session() -> AsyncSession:
@@ -34,6 +61,22 @@ async def get_session() -> AsyncSession:
         yield session
 
 
+async def get_read_session(
+    consistency: str = Header(
+        "replica",
+        alias="X-Read-Consistency",
+        pattern="^(replica|primary)$",
+        description="`primary` reads your own latest writes instead of a possibly lagging replica",
+    ),
+) -> AsyncSession:
+    """
+    Dependency yielding a session for reads, on a read replica when one is
+    configured and reachable.
+    """
+    async with read_session(fresh=consistency == "primary") as session:
+        yield session
+
+
 async def master_auth(x_api_key: str = Header(...)):
     """
     Only the master API key may provision new developer accounts.
@@ -68,7 +111,7 @@ async def create_account_route(session: AsyncSession = Depends(get_session)):
     response_model=DepositAddressResponse,
 )
 async def deposit_address_route(
-    account_id: int, session: AsyncSession = Depends(get_session)
+    account_id: int, session: AsyncSession = Depends(get_read_session)
 ):
     """
     Return the USDC deposit address for the given developer account.
@@ -82,7 +125,7 @@ async def deposit_address_route(
     response_model=BalanceResponse,
 )
 async def balance_route(
-    account_id: int, session: AsyncSession = Depends(get_session)
+    account_id: int, session: AsyncSession = Depends(get_read_session)
 ):
     """
     Return the current USDC balance for the given developer account.
@@ -91,13 +134,22 @@ async def balance_route(
     return BalanceResponse(balance=bal)
 
 
+async def own_account(account_id: int, developer_id: int = Depends(developer_auth)) -> int:
+    """
+    Developers may only act on their own account.
+    """
+    if account_id != developer_id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Account not found")
+    return account_id
+
+
 @router.post(
     "/{account_id}/withdraw",
     response_model=WithdrawResponse,
 )
 async def withdraw_route(
-    account_id: int,
     req: WithdrawRequest,
+    account_id: int = Depends(own_account),
     session: AsyncSession = Depends(get_session),
 ):
     """
@@ -105,3 +157,202 @@ async def withdraw_route(
     """
     tx_hash = await withdraw(session, account_id, req.user_address, req.amount)
     return WithdrawResponse(tx_hash=tx_hash, status="submitted")
+
+
+async def get_tenant_session(account_id: int = Depends(own_account)) -> AsyncSession:
+    """
+    Dependency yielding a session on the shard that holds the account's data.
+    """
+    async with SessionLocal() as session:
+        async with tenant_session(session, account_id) as tenant:
+            yield tenant
+
+
+class HistoryFilters:
+    """
+    Query parameters shared by the event and reward listings and exports.
+    """
+
+    def __init__(
+        self,
+        event: Optional[str] = Query(None, description="Only this event name"),
+        user_id: Optional[str] = Query(None, description="Only this end user"),
+        since: Optional[datetime] = Query(None, description="Recorded at or after (UTC)"),
+        until: Optional[datetime] = Query(None, description="Recorded before (UTC)"),
+        metadata: List[str] = Query(
+            [], description="key:value on a promoted metadata key (repeatable)"
+        ),
+    ):
+        self.event = event
+        self.user_id = user_id
+        self.since = since
+        self.until = until
+        self.metadata = metadata
+
+    def dict(self):
+        return {
+            "event": self.event,
+            "user_id": self.user_id,
+            "since": self.since,
+            "until": self.until,
+        }
+
+    async def params(self, session: AsyncSession, account_id: int):
+        """
+        Keyword arguments for the history service, with metadata filters
+        checked against the account's promoted keys.
+        """
+        attributes = await attribute_filters(session, account_id, self.metadata)
+        return {**self.dict(), "attributes": attributes}
+
+
+def _ndjson(body) -> StreamingResponse:
+    return StreamingResponse(body, media_type="application/x-ndjson")
+
+
+@router.get("/{account_id}/events", response_model=EventPage)
+async def events_route(
+    account_id: int = Depends(own_account),
+    filters: HistoryFilters = Depends(),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=HISTORY_PAGE_MAX),
+    session: AsyncSession = Depends(get_tenant_session),
+):
+    """
+    List the account's events in (timestamp, id) order, one page at a time.
+    """
+    params = await filters.params(session, account_id)
+    return await list_events(session, account_id, limit, cursor, **params)
+
+
+@router.get("/{account_id}/events/export")
+async def events_export_route(
+    account_id: int = Depends(own_account),
+    filters: HistoryFilters = Depends(),
+):
+    """
+    Stream every matching event as newline-delimited JSON.
+    """
+    factory = await shard_router.factory_for(account_id)
+    async with factory() as session:
+        params = await filters.params(session, account_id)
+    # The download runs on the export pool, leaving the request pool free
+    export_factory = await shard_router.export_factory_for(account_id)
+    return _ndjson(export_events(export_factory, account_id, **params))
+
+
+@router.get("/{account_id}/rewards", response_model=RewardPage)
+async def rewards_route(
+    account_id: int = Depends(own_account),
+    filters: HistoryFilters = Depends(),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=HISTORY_PAGE_MAX),
+    session: AsyncSession = Depends(get_tenant_session),
+):
+    """
+    List the account's rewards in (timestamp, id) order, one page at a time.
+    """
+    params = await filters.params(session, account_id)
+    return await list_rewards(session, account_id, limit, cursor, **params)
+
+
+@router.get("/{account_id}/rewards/export")
+async def rewards_export_route(
+    account_id: int = Depends(own_account),
+    filters: HistoryFilters = Depends(),
+):
+    """
+    Stream every matching reward as newline-delimited JSON.
+    """
+    factory = await shard_router.factory_for(account_id)
+    async with factory() as session:
+        params = await filters.params(session, account_id)
+    export_factory = await shard_router.export_factory_for(account_id)
+    return _ndjson(export_rewards(export_factory, account_id, **params))
+
+
+@router.post("/{account_id}/import", response_model=ImportResponse)
+async def import_route(
+    request: Request,
+    account_id: int = Depends(own_account),
+    format: str = Query(..., pattern="^(csv|ndjson)$", description="Upload format"),
+    job: str = Query(..., min_length=1, description="Import job name; rerun it to resume"),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Bulk import historical rewards from a CSV or NDJSON request body.
+    The body is parsed as it arrives and committed in chunks.
+    """
+    result = await import_rewards(session, account_id, job, request.stream(), format)
+    return ImportResponse(**result._asdict())
+
+
+@router.get("/{account_id}/users/balances", response_model=UserBalancesResponse)
+async def user_balances_route(
+    account_id: int = Depends(own_account),
+    user_id: List[str] = Query(
+        ..., max_length=USER_BALANCE_BATCH_MAX, description="End users to look up (repeatable)"
+    ),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Return the reward balances of several end users at once.
+    """
+    return UserBalancesResponse(balances=await get_user_balances(session, account_id, user_id))
+
+
+@router.get("/{account_id}/users/{user_id}/balance", response_model=UserBalanceResponse)
+async def user_balance_route(
+    user_id: str,
+    account_id: int = Depends(own_account),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Return one end user's reward balance.
+    """
+    balances = await get_user_balances(session, account_id, [user_id])
+    return UserBalanceResponse(user_id=user_id, balance=balances[user_id])
+
+
+@router.put("/{account_id}/users/{user_id}/address", response_model=UserAddressResponse)
+async def user_address_route(
+    user_id: str,
+    req: UserAddressRequest,
+    account_id: int = Depends(own_account),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Set the address an end user's rewards are paid out to.
+    """
+    await set_user_address(session, account_id, user_id, req.address)
+    return UserAddressResponse(user_id=user_id, address=req.address)
+
+
+@router.get("/{account_id}/stats", response_model=StatsResponse)
+async def stats_route(
+    account_id: int = Depends(own_account),
+    granularity: str = Query("day", pattern="^(hour|day)$", description="Bucket size"),
+    event: Optional[str] = Query(None, description="Only this event name"),
+    since: Optional[datetime] = Query(None, description="Start (UTC); defaults to 48 hours or 30 days ago"),
+    until: Optional[datetime] = Query(None, description="End, exclusive (UTC); defaults to now"),
+    session: AsyncSession = Depends(get_tenant_session),
+):
+    """
+    Rewards per event name per hour or day, answered from the rollups.
+    """
+    default_since, until = default_window(granularity, until)
+    return await get_stats(session, account_id, granularity, since or default_since, until, event)
+
+
+@router.get("/{account_id}/metadata/{key}", response_model=MetadataBreakdownResponse)
+async def metadata_breakdown_route(
+    key: str,
+    account_id: int = Depends(own_account),
+    since: Optional[datetime] = Query(None, description="Events recorded at or after (UTC)"),
+    until: Optional[datetime] = Query(None, description="Events recorded before (UTC)"),
+    session: AsyncSession = Depends(get_tenant_session),
+):
+    """
+    Rewards per value of a promoted metadata key.
+    """
+    return await metadata_breakdown(session, account_id, key, since, until)
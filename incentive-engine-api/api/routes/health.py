@@ -0,0 +1,20 @@
+# incentive-engine-api/api/routes/health.py
+
+"""
+Liveness and connection-pool diagnostics.
+"""
+
+from fastapi import APIRouter
+
+from api.db.database import pool_stats
+
+router = APIRouter(prefix="/health", tags=["health"])
+
+
+@router.get("/")
+async def health_route():
+    """
+    Report that the service is up, with the database pool's current usage
+    and checkout wait times for pool sizing.
+    """
+    return {"status": "ok", "database": pool_stats()}
@@ -0,0 +1,102 @@
+# incentive-engine-api/api/routes/metrics.py
+
+"""
+Prometheus scrape endpoint.
+"""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from api.db.database import pool_stats
+from api.db.replicas import replica_set
+from api.services.ingest_service import reward_ingestor
+from api.services.reward_service import idempotency_cache, user_balance_cache
+from api.utils.auth import developer_key_cache
+from api.utils.invalidation import invalidation_bus
+from api.utils import metrics
+from api.utils import rate_limit
+
+router = APIRouter(tags=["metrics"])
+
+CACHES = {
+    "api_key": developer_key_cache,
+    "idempotency": idempotency_cache,
+    "user_balance": user_balance_cache,
+}
+
+
+def _scrape_samples():
+    """
+    Values read at scrape time rather than recorded per request.
+    """
+    pool = pool_stats()
+    for key, name, kind, help_text in (
+        ("checked_out", "incentive_db_pool_checked_out", "gauge",
+         "Pooled connections currently in use."),
+        ("checked_in", "incentive_db_pool_checked_in", "gauge", "Idle pooled connections."),
+        ("overflow", "incentive_db_pool_overflow", "gauge",
+         "Connections open beyond the pool size."),
+        ("checkouts", "incentive_db_pool_checkouts_total", "counter", "Connection checkouts."),
+        ("checkout_timeouts", "incentive_db_pool_checkout_timeouts_total", "counter",
+         "Checkouts that timed out waiting for a connection."),
+        ("checkout_wait_total", "incentive_db_pool_checkout_wait_seconds_total", "counter",
+         "Seconds spent waiting for pooled connections."),
+    ):
+        if key in pool:
+            yield (name, kind, help_text, "", pool[key])
+
+    stats = {name: cache.stats() for name, cache in CACHES.items()}
+    for key, kind, help_text in (
+        ("hits", "counter", "Cache lookups answered from memory."),
+        ("misses", "counter", "Cache lookups that fell through."),
+        ("evictions", "counter", "Entries evicted to stay within the size bound."),
+        ("size", "gauge", "Entries currently cached."),
+    ):
+        name = f"incentive_cache_{key}" + ("_total" if kind == "counter" else "")
+        for cache_name, values in stats.items():
+            yield (name, kind, help_text, f'cache="{cache_name}"', values[key])
+
+    for reason, count in rate_limit.rate_limiter.rejected.items():
+        yield (
+            "incentive_rate_limited_total", "counter",
+            "Reward requests refused by the rate limiter or daily quota.",
+            f'reason="{reason}"', count,
+        )
+
+    for index, count in enumerate(replica_set.reads):
+        yield (
+            "incentive_replica_reads_total", "counter",
+            "Read-only sessions served by each replica.", f'replica="{index}"', count,
+        )
+    yield (
+        "incentive_replica_fallbacks_total", "counter",
+        "Replica reads that fell back to the primary because no replica was reachable.",
+        "", replica_set.fallbacks,
+    )
+
+    for direction, count in (
+        ("sent", invalidation_bus.sent),
+        ("received", invalidation_bus.received),
+        ("dropped", invalidation_bus.dropped),
+    ):
+        yield (
+            "incentive_cache_invalidations_total", "counter",
+            "Cache invalidation messages exchanged with other workers.",
+            f'direction="{direction}"', count,
+        )
+
+    yield (
+        "incentive_ingest_queue_depth", "gauge",
+        "Rewards queued for asynchronous ingestion.", "", reward_ingestor.depth(),
+    )
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics_route():
+    """
+    Request, database, pool and cache metrics in the Prometheus text format.
+    """
+    return PlainTextResponse(
+        metrics.render(_scrape_samples()),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
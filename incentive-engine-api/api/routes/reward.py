@@ -1,14 +1,39 @@
 # incentive-engine-api/api/routes/reward.py
 
+from typing import Optional
+
 from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from api.config import API_KEY
+from api.config import REWARD_BATCH_MAX_ITEMS, REWARD_INGEST_MODE
 from api.db.database import SessionLocal
-from api.models.reward import RewardRequest, RewardResponse
-from api.services.reward_service import process_reward
+from api.models.reward import (
+    RewardRequest,
+    RewardResponse,
+    BatchRewardRequest,
+    BatchRewardResponse,
+    RewardAcceptedResponse,
+    RewardStatusResponse,
+)
+from api.services.ingest_service import (
+    reward_ingestor,
+    IngestClosed,
+    IngestQueueFull,
+)
+from api.services.reward_service import (
+    process_reward,
+    process_reward_batch,
+    idempotency_cache,
+    replay,
+    request_fingerprint,
+)
+from api.utils.auth import developer_auth
+from api.utils.rate_limit import charge, rate_limit
+from api.utils.metrics import InstrumentedRoute
+from api.utils.cache import MISSING
 
-router = APIRouter(prefix="/reward", tags=["reward"])
+router = APIRouter(prefix="/reward", route_class=InstrumentedRoute, tags=["reward"])
 
 
 async def get_session() -> AsyncSession:
@@ -21,24 +46,66 @@ async def get_session() -> AsyncSession:
 
 async def api_key_auth(x_api_key: str = Header(...)):
     """
-    Validates the X-API-KEY header against the master key.
+    Validates the X-API-KEY header against the developer accounts, using the
+    shared API key cache so repeat callers don't hit the database.
+    """
+    await developer_auth(x_api_key)
+    return x_api_key
+
+
+def _enqueue_reward(developer_id: int, req: RewardRequest):
+    """
+    Asynchronous ingestion: queue the request and answer 202 with a tracking id.
+    Known idempotency keys are answered immediately with the stored result.
     """
-    if x_api_key != API_KEY:
+    if req.idempotency_key:
+        stored = idempotency_cache.get((developer_id, req.idempotency_key))
+        if stored is not MISSING:
+            return replay(
+                stored, request_fingerprint(req.event, req.user_id, req.amount, req.metadata)
+            )
+    try:
+        tracking_id = reward_ingestor.submit(developer_id, req)
+    except (IngestQueueFull, IngestClosed):
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Unauthorized: invalid API key",
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Reward queue is full; retry shortly",
+            headers={"Retry-After": "1"},
         )
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content={"tracking_id": tracking_id, "status": "queued"},
+    )
 
 
-@router.post("/", response_model=RewardResponse)
+@router.post(
+    "/",
+    response_model=RewardResponse,
+    responses={202: {"model": RewardAcceptedResponse}},
+    dependencies=[Depends(rate_limit)],
+)
 async def reward_route(
     req: RewardRequest,
     x_api_key: str = Depends(api_key_auth),
     session: AsyncSession = Depends(get_session),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
 ):
     """
     Handle a reward request: validate auth, call service, return result.
+    The idempotency key may be sent as a header or in the body.
     """
+    if (
+        idempotency_key and req.idempotency_key
+        and idempotency_key != req.idempotency_key
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key header and body field disagree",
+        )
+    idempotency_key = idempotency_key or req.idempotency_key
+    if REWARD_INGEST_MODE == "async":
+        req.idempotency_key = idempotency_key
+        return _enqueue_reward(await developer_auth(x_api_key), req)
     try:
         return await process_reward(
             session=session,
@@ -47,6 +114,7 @@ async def reward_route(
             user_id=req.user_id,
             amount=req.amount,
             metadata=req.metadata,
+            idempotency_key=idempotency_key,
         )
     except HTTPException:
         # propagate HTTPExceptions raised in service (e.g. 401)
@@ -57,3 +125,68 @@ async def reward_route(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error"
         )
+
+
+@router.post("/batch", response_model=BatchRewardResponse)
+async def reward_batch_route(
+    req: BatchRewardRequest,
+    x_api_key: str = Depends(api_key_auth),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Handle a batch of reward requests in one transaction and report
+    per-item results.
+    """
+    if not req.items:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Batch must contain at least one item",
+        )
+    if len(req.items) > REWARD_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch exceeds {REWARD_BATCH_MAX_ITEMS} items",
+        )
+    # Each item counts against the rate limit like a single reward request
+    await charge(x_api_key, len(req.items))
+    try:
+        results = await process_reward_batch(
+            session=session,
+            api_key=x_api_key,
+            items=req.items,
+        )
+    except HTTPException:
+        raise
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error"
+        )
+    accepted = sum(1 for r in results if r.error is None)
+    return BatchRewardResponse(
+        accepted=accepted,
+        rejected=len(results) - accepted,
+        results=results,
+    )
+
+
+@router.get("/status/{tracking_id}", response_model=RewardStatusResponse)
+async def reward_status_route(
+    tracking_id: str,
+    x_api_key: str = Depends(api_key_auth),
+):
+    """
+    Report the outcome of a reward queued in asynchronous ingestion mode.
+    """
+    entry = reward_ingestor.status(tracking_id)
+    if entry is None or entry["developer_id"] != await developer_auth(x_api_key):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Unknown or expired tracking id",
+        )
+    return RewardStatusResponse(
+        tracking_id=tracking_id,
+        status=entry["status"],
+        result=entry.get("result"),
+        error=entry.get("error"),
+    )
@@ -1,13 +1,36 @@
 # incentive-engine-api/api/services/account_service.py
 
+import logging
+import math
 import secrets
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
 from fastapi import HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import select, func
+from sqlalchemy import select, func, update
+
+from api.db.dialect import upsert
+from api.db.sharding import tenant_session
+from api.db.models import (
+    DeveloperAccount,
+    DeveloperBalance,
+    Reward,
+    UserBalance,
+    UserWallet,
+    Withdrawal,
+)
+from api.config import CIRCLE_API_KEY, CIRCLE_WALLET_ID, WITHDRAWAL_RECONCILE_AFTER
+from api.services.reward_service import user_balance_cache
+from api.services.custody import Transfer, TransferResult, get_custody_provider
+from api.utils.auth import invalidate_api_key
+from api.utils.cache import MISSING
 
-from api.db.models import DeveloperAccount, UserBalance
-from api.config import CIRCLE_API_KEY, CIRCLE_WALLET_ID
+logger = logging.getLogger(__name__)
+
+# Provider used to send withdrawals (CUSTODY_PROVIDER)
+custody_provider = get_custody_provider()
 
 
 async def provision_subwallet() -> (str, str):
@@ -38,6 +61,8 @@ async def create_account(session: AsyncSession) -> DeveloperAccount:
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to create developer account"
         )
+    # Drop any cached (negative) lookup of the freshly issued key
+    invalidate_api_key(new_api_key)
     # Optionally store deposit_address somewhere or return it via the route
     dev.deposit_address = deposit_address  # attach for route consumption
     return dev
@@ -56,16 +81,71 @@ async def get_deposit_address(session: AsyncSession, account_id: int) -> str:
 
 async def get_balance(session: AsyncSession, account_id: int) -> float:
     """
-    Sum all user balances under this developer to return the total funds available.
+    Return the developer's available funds from the running-total ledger row.
     """
-    stmt = select(func.sum(UserBalance.balance)).where(
-        UserBalance.developer_account_id == account_id
+    stmt = select(DeveloperBalance.balance).where(
+        DeveloperBalance.developer_account_id == account_id
     )
-    result = await session.execute(stmt)
-    total = result.scalar() or 0.0
+    async with tenant_session(session, account_id) as session:
+        total = (await session.execute(stmt)).scalar() or 0.0
     return total
 
 
+async def get_user_balances(
+    session: AsyncSession, account_id: int, user_ids: List[str]
+) -> Dict[str, float]:
+    """
+    Return user_id -> balance for the developer's end users, read through
+    `user_balance_cache`. Users who were never rewarded have a balance of 0.
+    Cache misses are loaded with one query.
+    """
+    balances: Dict[str, float] = {}
+    missing = []
+    for user_id in dict.fromkeys(user_ids):
+        cached = user_balance_cache.get((account_id, user_id))
+        if cached is MISSING:
+            missing.append(user_id)
+        else:
+            balances[user_id] = cached
+    if missing:
+        async with tenant_session(session, account_id) as session:
+            rows = dict((await session.execute(
+                select(UserBalance.user_id, UserBalance.balance).where(
+                    UserBalance.developer_account_id == account_id,
+                    UserBalance.user_id.in_(missing),
+                )
+            )).all())
+        for user_id in missing:
+            balance = rows.get(user_id) or 0.0
+            # Don't clobber a fresher value cached by a credit that committed
+            # while this query was running
+            if not user_balance_cache.add((account_id, user_id), balance):
+                balance = user_balance_cache.get((account_id, user_id), balance)
+            balances[user_id] = balance
+    return balances
+
+
+async def set_user_address(
+    session: AsyncSession, account_id: int, user_id: str, address: str
+) -> None:
+    """
+    Record (or replace) the address an end user's rewards are paid out to.
+    Pending rewards of users without an address are not paid out.
+    """
+    async with tenant_session(session, account_id) as session:
+        stmt = upsert(session, UserWallet).values(
+            developer_account_id=account_id,
+            user_id=user_id,
+            address=address,
+            updated_at=datetime.utcnow(),
+        )
+        await session.execute(stmt.on_conflict_do_update(
+            index_elements=[UserWallet.developer_account_id, UserWallet.user_id],
+            set_={"address": stmt.excluded.address, "updated_at": stmt.excluded.updated_at},
+        ))
+        await session.commit()
+
+
 async def withdraw(
     session: AsyncSession,
     account_id: int,
@@ -73,23 +153,222 @@ async def withdraw(
     amount: float
 ) -> str:
     """
-    Debit the developer’s balance and initiate a USDC transfer to `user_address`.
-    Returns the transaction hash. Stubbed for now.
+    Debit the developer's balance and send `amount` USDC to `user_address`
+    through the custody provider. Returns the transaction hash.
+
+    The debit is a single conditional UPDATE (balance >= amount), so parallel
+    withdrawals for one developer serialize on that row only and can never
+    overdraw it. The ledger row is inserted in the same transaction; if the
+    provider rejects the transfer the amount is refunded and the row marked
+    failed. If the provider's answer is lost the row stays pending, for
+    `reconcile_withdrawals` to resolve under the same transfer reference.
     """
-    # Check account exists
-    dev = await session.get(DeveloperAccount, account_id)
-    if not dev:
+    wallet_id = await session.scalar(
+        select(DeveloperAccount.wallet_id).where(DeveloperAccount.id == account_id)
+    )
+    if wallet_id is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Account not found")
 
-    # Check sufficient funds
-    available = await get_balance(session, account_id)
-    if amount > available:
+    async with tenant_session(session, account_id) as session:
+        return await _debit_and_transfer(session, account_id, wallet_id, user_address, amount)
+
+
+async def _debit_and_transfer(
+    session: AsyncSession,
+    account_id: int,
+    wallet_id: str,
+    user_address: str,
+    amount: float
+) -> str:
+    """
+    The ledger part of `withdraw`, on the session for the developer's shard.
+    """
+    debited = await session.execute(
+        update(DeveloperBalance)
+        .where(
+            DeveloperBalance.developer_account_id == account_id,
+            DeveloperBalance.balance >= amount,
+        )
+        .values(
+            balance=DeveloperBalance.balance - amount,
+            withdrawn=DeveloperBalance.withdrawn + amount,
+            updated_at=datetime.utcnow(),
+        )
+        .returning(DeveloperBalance.balance)
+    )
+    if debited.first() is None:
+        await session.rollback()
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Insufficient funds")
 
-    # TODO: call custody provider to move USDC from dev.wallet_id to user_address
-    tx_hash = "0x" + secrets.token_hex(32)
+    ledger = Withdrawal(
+        developer_account_id=account_id, user_address=user_address, amount=amount
+    )
+    session.add(ledger)
+    await session.commit()
+
+    try:
+        [result] = await custody_provider.submit_transfers([_transfer(ledger, wallet_id)])
+    except Exception:
+        logger.exception("Custody provider failed withdrawal %d", ledger.id)
+        # The transfer may have gone through: keep the debit and the
+        # pending row until reconciliation learns the outcome
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=f"Withdrawal {ledger.id} is pending: the custody provider did not "
+                   "confirm the transfer. It will be reconciled; do not retry it.",
+        )
+
+    await _settle_withdrawal(session, ledger, result)
+    await session.commit()
+    if result.tx_hash:
+        return result.tx_hash
+    raise HTTPException(
+        status_code=status.HTTP_502_BAD_GATEWAY,
+        detail="Withdrawal transfer failed; funds were returned to the balance",
+    )
+
+
+def _transfer(ledger: Withdrawal, wallet_id: str) -> Transfer:
+    return Transfer(
+        source_wallet_id=wallet_id,
+        destination=ledger.user_address,
+        amount=ledger.amount,
+        reference=ledger.reference,
+    )
+
+
+async def _settle_withdrawal(session: AsyncSession, ledger: Withdrawal, result: TransferResult) -> None:
+    """
+    Record the provider's answer on a pending ledger row; a rejected
+    transfer is refunded. The caller commits.
+    """
+    if result.tx_hash:
+        ledger.status = "submitted"
+        ledger.tx_hash = result.tx_hash
+        return
+    # Refund the debit; the ledger keeps the failed attempt
+    await session.execute(
+        update(DeveloperBalance)
+        .where(DeveloperBalance.developer_account_id == ledger.developer_account_id)
+        .values(
+            balance=DeveloperBalance.balance + ledger.amount,
+            withdrawn=DeveloperBalance.withdrawn - ledger.amount,
+            updated_at=datetime.utcnow(),
+        )
+    )
+    ledger.status = "failed"
+    ledger.error = result.error
+
+
+async def reconcile_withdrawals(
+    session: AsyncSession, older_than: float = WITHDRAWAL_RECONCILE_AFTER
+) -> Dict[str, int]:
+    """
+    Resolve withdrawals left pending for more than `older_than` seconds (a
+    lost provider answer, or a crash between the debit and the transfer)
+    on `session`'s database. Each is resubmitted under its original
+    reference, which the provider deduplicates, and settled like a fresh
+    answer; ones whose outcome is still unknown stay pending.
+    Returns the number of withdrawals per resulting status.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=older_than)
+    # Bumping updated_at claims the rows, so concurrent runs skip them
+    claimed = (await session.execute(
+        update(Withdrawal)
+        .where(Withdrawal.status == "pending", Withdrawal.updated_at < cutoff)
+        .values(updated_at=datetime.utcnow())
+        .returning(Withdrawal.id)
+    )).scalars().all()
+    await session.commit()
+    counts = {"submitted": 0, "failed": 0, "pending": 0}
+    if not claimed:
+        return counts
+
+    rows = (await session.execute(
+        select(Withdrawal, DeveloperAccount.wallet_id)
+        .join(DeveloperAccount, DeveloperAccount.id == Withdrawal.developer_account_id)
+        .where(Withdrawal.id.in_(claimed))
+        .order_by(Withdrawal.id)
+    )).all()
+    size = custody_provider.max_batch_size
+    for start in range(0, len(rows), size):
+        batch = rows[start:start + size]
+        try:
+            results = await custody_provider.submit_transfers(
+                [_transfer(ledger, wallet_id) for ledger, wallet_id in batch]
+            )
+        except Exception:
+            logger.exception("Custody provider failed to reconcile %d withdrawals", len(batch))
+            results = None
+        if results is None or len(results) != len(batch):
+            counts["pending"] += len(batch)
+            continue
+        for (ledger, _), result in zip(batch, results):
+            await _settle_withdrawal(session, ledger, result)
+            counts[ledger.status] += 1
+        await session.commit()
+    return counts
+
+
+async def rebuild_developer_balances(
+    session: AsyncSession,
+    account_id: Optional[int] = None
+) -> Dict[int, Tuple[float, float]]:
+    """
+    Recompute each developer's running total as SUM(user_balances) minus
+    lifetime withdrawals and the payouts in flight (rewards "processing",
+    whose amount is reserved), fixing any drift in developer_balances.
+    Limits the rebuild to `account_id` when given; otherwise covers every
+    developer whose data lives on `session`'s database.
+    Returns {account_id: (old_balance, new_balance)} for rows that changed.
+    """
+    if account_id is not None:
+        async with tenant_session(session, account_id) as session:
+            return await _rebuild_developer_balances(session, account_id)
+    return await _rebuild_developer_balances(session, None)
+
+
+async def _rebuild_developer_balances(
+    session: AsyncSession,
+    account_id: Optional[int]
+) -> Dict[int, Tuple[float, float]]:
+    sums_stmt = select(
+        UserBalance.developer_account_id, func.sum(UserBalance.balance)
+    ).group_by(UserBalance.developer_account_id)
+    in_flight_stmt = select(
+        Reward.developer_account_id, func.sum(Reward.amount)
+    ).where(Reward.status == "processing").group_by(Reward.developer_account_id)
+    ledger_stmt = select(DeveloperBalance).with_for_update()
+    if account_id is not None:
+        sums_stmt = sums_stmt.where(UserBalance.developer_account_id == account_id)
+        in_flight_stmt = in_flight_stmt.where(Reward.developer_account_id == account_id)
+        ledger_stmt = ledger_stmt.where(
+            DeveloperBalance.developer_account_id == account_id
+        )
+
+    # Lock the running totals before summing. Rewards and withdrawals update
+    # the developer's row in their own transaction, so once the lock is held
+    # every committed credit is in the sums and later ones wait for us.
+    ledger = {
+        row.developer_account_id: row
+        for row in (await session.execute(ledger_stmt)).scalars()
+    }
+    sums = dict((await session.execute(sums_stmt)).all())
+    in_flight = dict((await session.execute(in_flight_stmt)).all())
 
-    # Deduct from each UserBalance record or create a Withdrawal record if you have one
-    # For simplicity, we could track a net balance elsewhere
+    changed = {}
+    for dev_id in set(sums) | set(ledger):
+        row = ledger.get(dev_id)
+        withdrawn = row.withdrawn if row else 0.0
+        expected = (sums.get(dev_id) or 0.0) - withdrawn - (in_flight.get(dev_id) or 0.0)
+        if row is None:
+            session.add(DeveloperBalance(
+                developer_account_id=dev_id, balance=expected, withdrawn=0.0
+            ))
+            changed[dev_id] = (0.0, expected)
+        elif not math.isclose(row.balance, expected, abs_tol=1e-9):
+            changed[dev_id] = (row.balance, expected)
+            row.balance = expected
 
-    return tx_hash
+    await session.commit()
+    return changed
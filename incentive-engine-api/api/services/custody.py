@@ -0,0 +1,94 @@
+# incentive-engine-api/api/services/custody.py
+
+"""
+Custody-provider interface used to move USDC out of developer sub-wallets.
+"""
+
+import secrets
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from api.config import CUSTODY_PROVIDER
+
+
+class Transfer(NamedTuple):
+    """
+    One USDC transfer from a developer sub-wallet to an end user.
+    `reference` is stable for the transfer so providers can deduplicate retries.
+    """
+    source_wallet_id: str
+    destination: str
+    amount: float
+    reference: str
+
+
+class TransferResult(NamedTuple):
+    """
+    Outcome of one Transfer: a transaction hash, or an error message.
+    """
+    tx_hash: Optional[str] = None
+    error: Optional[str] = None
+
+
+class CustodyProvider(ABC):
+    """
+    Submits transfers to a custodian in batches. Implementations return one
+    TransferResult per Transfer, in order; an exception means the outcome of
+    the whole batch is unknown. Transfers are deduplicated by `reference`:
+    resubmitting a reference the custodian already accepted returns the
+    original result instead of moving funds again.
+    """
+
+    # Largest number of transfers the provider accepts in one call
+    max_batch_size: int = 500
+
+    @abstractmethod
+    async def submit_transfers(self, transfers: List[Transfer]) -> List[TransferResult]:
+        ...
+
+
+class FakeCustodyProvider(CustodyProvider):
+    """
+    Local stand-in that "settles" every transfer with a random transaction
+    hash, like the stubbed `provision_subwallet`. Destinations listed in
+    `fail_destinations` are rejected, for exercising failure paths; with
+    `record=True` every submitted batch is kept in `calls`. Results are
+    remembered per reference, as a custodian's idempotency keys are.
+    """
+
+    def __init__(self, max_batch_size: int = 500, fail_destinations=(), record: bool = False):
+        self.max_batch_size = max_batch_size
+        self.fail_destinations = set(fail_destinations)
+        self.record = record
+        self.calls: List[List[Transfer]] = []
+        self.results: Dict[str, TransferResult] = {}
+
+    async def submit_transfers(self, transfers: List[Transfer]) -> List[TransferResult]:
+        if self.record:
+            self.calls.append(list(transfers))
+        for t in transfers:
+            if t.reference not in self.results:
+                self.results[t.reference] = (
+                    TransferResult(error="Destination rejected")
+                    if t.destination in self.fail_destinations
+                    else TransferResult(tx_hash="0x" + secrets.token_hex(32))
+                )
+        return [self.results[t.reference] for t in transfers]
+
+
+# Providers selectable with the CUSTODY_PROVIDER setting
+PROVIDERS: Dict[str, Callable[[], CustodyProvider]] = {
+    "fake": FakeCustodyProvider,
+}
+
+
+def get_custody_provider(name: str = CUSTODY_PROVIDER) -> CustodyProvider:
+    """
+    Instantiate the configured custody provider.
+    """
+    try:
+        return PROVIDERS[name]()
+    except KeyError:
+        raise RuntimeError(
+            f"Unknown CUSTODY_PROVIDER {name!r}; expected one of {sorted(PROVIDERS)}"
+        )
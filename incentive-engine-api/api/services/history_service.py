@@ -0,0 +1,231 @@
+# incentive-engine-api/api/services/history_service.py
+
+"""
+Read access to a developer's events and rewards.
+
+Listings are ordered by (timestamp, id) and paginated with keyset cursors,
+so every page is an index range scan no matter how deep it is. Exports
+stream the same queries as NDJSON through a server-side cursor. Filters on
+promoted metadata keys join `event_attributes`; event listings then page
+through that table's index, whose rows carry the event's timestamp.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from api.config import EXPORT_FETCH_SIZE
+from api.db.models import Event, EventAttribute, Reward
+from api.models.history import EventPage, EventRecord, RewardPage, RewardRecord
+
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    """
+    Opaque cursor pointing just after the row at (timestamp, row_id).
+    """
+    raw = json.dumps([timestamp.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Inverse of encode_cursor; raises 400 for a malformed cursor.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, row_id = json.loads(raw)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def _join_attributes(stmt, developer_id: int, event_id, attributes: Optional[Dict[str, str]]):
+    """
+    Restrict `stmt` to events with the given promoted values. Returns the
+    statement and the attribute aliases joined, in order.
+    """
+    joined = []
+    for key, value in (attributes or {}).items():
+        attribute = aliased(EventAttribute)
+        stmt = stmt.join(attribute, attribute.event_id == event_id).where(
+            attribute.developer_account_id == developer_id,
+            attribute.key == key,
+            attribute.value == value,
+        )
+        joined.append(attribute)
+    return stmt, joined
+
+
+def _event_query(
+    developer_id: int,
+    event: Optional[str],
+    user_id: Optional[str],
+    since: Optional[datetime],
+    until: Optional[datetime],
+    attributes: Optional[Dict[str, str]] = None,
+):
+    stmt = select(
+        Event.id, Event.event_name, Event.user_id, Event.meta, Event.timestamp
+    ).where(Event.developer_account_id == developer_id)
+    stmt, joined = _join_attributes(stmt, developer_id, Event.id, attributes)
+    # With a metadata filter, walk the first attribute's index instead
+    timestamp, row_id = (
+        (joined[0].timestamp, joined[0].event_id) if joined else (Event.timestamp, Event.id)
+    )
+    if event is not None:
+        stmt = stmt.where(Event.event_name == event)
+    if user_id is not None:
+        stmt = stmt.where(Event.user_id == user_id)
+    if since is not None:
+        stmt = stmt.where(timestamp >= since)
+    if until is not None:
+        stmt = stmt.where(timestamp < until)
+    return stmt.order_by(timestamp, row_id), (timestamp, row_id)
+
+
+def _reward_query(
+    developer_id: int,
+    event: Optional[str],
+    user_id: Optional[str],
+    since: Optional[datetime],
+    until: Optional[datetime],
+    attributes: Optional[Dict[str, str]] = None,
+):
+    stmt = (
+        select(
+            Reward.id, Reward.event_id, Event.event_name, Event.user_id,
+            Reward.amount, Reward.status, Reward.tx_hash, Reward.timestamp,
+        )
+        .join(Event, Event.id == Reward.event_id)
+        .where(Reward.developer_account_id == developer_id)
+    )
+    stmt, _ = _join_attributes(stmt, developer_id, Reward.event_id, attributes)
+    if event is not None:
+        stmt = stmt.where(Event.event_name == event)
+    if user_id is not None:
+        stmt = stmt.where(Event.user_id == user_id)
+    if since is not None:
+        stmt = stmt.where(Reward.timestamp >= since)
+    if until is not None:
+        stmt = stmt.where(Reward.timestamp < until)
+    return stmt.order_by(Reward.timestamp, Reward.id), (Reward.timestamp, Reward.id)
+
+
+def _event_record(row) -> EventRecord:
+    return EventRecord(
+        id=row.id, event=row.event_name, user_id=row.user_id,
+        metadata=row.meta, timestamp=row.timestamp,
+    )
+
+
+def _reward_record(row) -> RewardRecord:
+    return RewardRecord(
+        id=row.id, event_id=row.event_id, event=row.event_name, user_id=row.user_id,
+        amount=row.amount, status=row.status, tx_hash=row.tx_hash, timestamp=row.timestamp,
+    )
+
+
+async def _page(session: AsyncSession, stmt, key, cursor: Optional[str], limit: int):
+    if cursor is not None:
+        stmt = stmt.where(tuple_(*key) > decode_cursor(cursor))
+    # One extra row tells us whether another page exists
+    rows = (await session.execute(stmt.limit(limit + 1))).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].timestamp, rows[-1].id)
+    return rows, next_cursor
+
+
+async def list_events(
+    session: AsyncSession,
+    developer_id: int,
+    limit: int,
+    cursor: Optional[str] = None,
+    event: Optional[str] = None,
+    user_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    attributes: Optional[Dict[str, str]] = None,
+) -> EventPage:
+    """
+    Return one page of the developer's events after `cursor`. `attributes`
+    maps promoted metadata keys to the values events must carry.
+    """
+    stmt, key = _event_query(developer_id, event, user_id, since, until, attributes)
+    rows, next_cursor = await _page(session, stmt, key, cursor, limit)
+    return EventPage(items=[_event_record(r) for r in rows], next_cursor=next_cursor)
+
+
+async def list_rewards(
+    session: AsyncSession,
+    developer_id: int,
+    limit: int,
+    cursor: Optional[str] = None,
+    event: Optional[str] = None,
+    user_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    attributes: Optional[Dict[str, str]] = None,
+) -> RewardPage:
+    """
+    Return one page of the developer's rewards after `cursor`.
+    """
+    stmt, key = _reward_query(developer_id, event, user_id, since, until, attributes)
+    rows, next_cursor = await _page(session, stmt, key, cursor, limit)
+    return RewardPage(items=[_reward_record(r) for r in rows], next_cursor=next_cursor)
+
+
+async def _stream(
+    session_factory: Callable, stmt, to_record, fetch_size: int
+) -> AsyncIterator[bytes]:
+    async with session_factory() as session:
+        result = await session.stream(
+            stmt.execution_options(yield_per=fetch_size)
+        )
+        async for rows in result.partitions():
+            lines: List[str] = [to_record(row).json() for row in rows]
+            lines.append("")
+            yield "\n".join(lines).encode()
+
+
+def export_events(
+    session_factory: Callable,
+    developer_id: int,
+    event: Optional[str] = None,
+    user_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    attributes: Optional[Dict[str, str]] = None,
+    fetch_size: int = EXPORT_FETCH_SIZE,
+) -> AsyncIterator[bytes]:
+    """
+    Stream every matching event as NDJSON chunks of `fetch_size` rows.
+    Rows come from a server-side cursor, so memory use does not grow with
+    the size of the export.
+    """
+    stmt, _ = _event_query(developer_id, event, user_id, since, until, attributes)
+    return _stream(session_factory, stmt, _event_record, fetch_size)
+
+
+def export_rewards(
+    session_factory: Callable,
+    developer_id: int,
+    event: Optional[str] = None,
+    user_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    attributes: Optional[Dict[str, str]] = None,
+    fetch_size: int = EXPORT_FETCH_SIZE,
+) -> AsyncIterator[bytes]:
+    """
+    Stream every matching reward as NDJSON chunks of `fetch_size` rows.
+    """
+    stmt, _ = _reward_query(developer_id, event, user_id, since, until, attributes)
+    return _stream(session_factory, stmt, _reward_record, fetch_size)
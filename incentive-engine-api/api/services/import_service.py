@@ -0,0 +1,409 @@
+# incentive-engine-api/api/services/import_service.py
+
+"""
+Bulk import of historical rewards from CSV or NDJSON.
+
+Input is parsed incrementally from an async stream of bytes and written in
+chunks of IMPORT_CHUNK_SIZE rows, one transaction per chunk: events and
+rewards are bulk inserted (COPY on PostgreSQL, executemany elsewhere) and
+user/developer balances are credited with one grouped upsert each, for
+the rows still pending only. Only one
+chunk is held in memory at a time.
+
+Each import is a named job; the job's `rows_committed` counter is updated
+in the chunk's transaction, so re-running an interrupted job with the same
+input skips exactly the rows already committed. A run claims its job
+atomically, so two runs of one job cannot write the same rows; a job whose
+run stopped committing for IMPORT_JOB_LEASE seconds may be taken over.
+"""
+
+import csv
+import json
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import insert, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.config import IMPORT_CHUNK_SIZE, IMPORT_JOB_LEASE
+from api.db.dialect import upsert
+from api.db.sharding import tenant_session
+from api.db.models import Event, ImportJob, Reward
+from api.db.types import pack_json
+from api.services.reward_service import (
+    _credit_developer_balance,
+    _credit_user_balances,
+    cache_user_balances,
+)
+from api.services.metadata_service import record_attributes
+from api.services.rollup_service import apply_rollups
+
+FORMATS = ("csv", "ndjson")
+REQUIRED_FIELDS = ("event", "user_id", "amount")
+REWARD_STATUSES = ("pending", "paid", "failed")
+
+
+class ImportRow(NamedTuple):
+    event: str
+    user_id: str
+    amount: float
+    metadata: Optional[Dict[str, Any]]
+    timestamp: datetime
+    status: str
+    tx_hash: Optional[str]
+
+
+class ImportResult(NamedTuple):
+    job: str
+    rows_committed: int
+    rows_skipped: int
+    status: str
+
+
+class ImportRowError(ValueError):
+    """
+    Raised for a row that can't be imported; `line` is 1-based.
+    """
+
+    def __init__(self, line: int, message: str):
+        super().__init__(f"line {line}: {message}")
+        self.line = line
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    Split an async stream of UTF-8 bytes into lines (without terminators).
+    """
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.rstrip(b"\r").decode("utf-8")
+    if buffer:
+        yield buffer.rstrip(b"\r").decode("utf-8")
+
+
+async def _csv_records(lines: AsyncIterator[str]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Parse CSV with a header row. Quoted fields may span lines: a record is
+    complete once it contains an even number of quote characters.
+    """
+    header = None
+    pending: List[str] = []
+    quotes = 0
+    async for line in lines:
+        pending.append(line)
+        quotes += line.count('"')
+        if quotes % 2:
+            continue
+        [fields] = list(csv.reader(["\n".join(pending)]))
+        pending, quotes = [], 0
+        if header is None:
+            header = [name.strip() for name in fields]
+            continue
+        if fields:
+            yield dict(zip(header, fields))
+    if pending:
+        raise ValueError("unterminated quoted field at end of input")
+
+
+async def _ndjson_records(lines: AsyncIterator[str]) -> AsyncIterator[Dict[str, Any]]:
+    async for line in lines:
+        if line.strip():
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError("each line must be a JSON object")
+            yield record
+
+
+def _row(record: Dict[str, Any], imported_at: datetime) -> ImportRow:
+    missing = [f for f in REQUIRED_FIELDS if record.get(f) in (None, "")]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    amount = float(record["amount"])
+    if amount <= 0:
+        raise ValueError("amount must be positive")
+    metadata = record.get("metadata") or None
+    if isinstance(metadata, str):
+        metadata = json.loads(metadata)
+    timestamp = record.get("timestamp") or None
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    # Historical rewards were settled by the previous system unless stated
+    reward_status = record.get("status") or "paid"
+    if reward_status not in REWARD_STATUSES:
+        raise ValueError(f"status must be one of {', '.join(REWARD_STATUSES)}")
+    return ImportRow(
+        event=str(record["event"]),
+        user_id=str(record["user_id"]),
+        amount=amount,
+        metadata=metadata,
+        timestamp=timestamp or imported_at,
+        status=reward_status,
+        tx_hash=record.get("tx_hash") or None,
+    )
+
+
+async def parse_rows(chunks: AsyncIterator[bytes], fmt: str) -> AsyncIterator[ImportRow]:
+    """
+    Yield validated rows from a CSV or NDJSON byte stream.
+    Raises ImportRowError identifying the first bad record.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {FORMATS}")
+    records = _csv_records if fmt == "csv" else _ndjson_records
+    imported_at = datetime.utcnow()
+    # Line numbers count records (plus the CSV header), which is what
+    # spreadsheet users see
+    line = 1 if fmt == "csv" else 0
+    iterator = records(iter_lines(chunks)).__aiter__()
+    while True:
+        line += 1
+        try:
+            record = await iterator.__anext__()
+        except StopAsyncIteration:
+            return
+        except ValueError as e:
+            raise ImportRowError(line, str(e))
+        try:
+            yield _row(record, imported_at)
+        except (ValueError, TypeError) as e:
+            raise ImportRowError(line, str(e))
+
+
+def _uses_copy(session: AsyncSession) -> bool:
+    bind = session.bind
+    return bind.dialect.name == "postgresql" and bind.dialect.driver == "asyncpg"
+
+
+async def _copy_chunk(
+    session: AsyncSession, developer_id: int, rows: List[ImportRow]
+) -> List[int]:
+    """
+    PostgreSQL: reserve event ids from the sequence, then COPY both tables.
+    Returns the event ids.
+    """
+    event_ids = (await session.execute(
+        text("SELECT nextval(pg_get_serial_sequence('events', 'id')) FROM generate_series(1, :n)"),
+        {"n": len(rows)},
+    )).scalars().all()
+    conn = await session.connection()
+    raw = (await conn.get_raw_connection()).driver_connection
+    await raw.copy_records_to_table(
+        "events",
+        columns=["id", "developer_account_id", "event_name", "user_id", "metadata_blob", "timestamp"],
+        records=[
+            (event_id, developer_id, r.event, r.user_id, pack_json(r.metadata), r.timestamp)
+            for event_id, r in zip(event_ids, rows)
+        ],
+    )
+    await raw.copy_records_to_table(
+        "rewards",
+        columns=["event_id", "developer_account_id", "amount", "status", "tx_hash", "timestamp"],
+        records=[
+            (event_id, developer_id, r.amount, r.status, r.tx_hash, r.timestamp)
+            for event_id, r in zip(event_ids, rows)
+        ],
+    )
+    return event_ids
+
+
+async def _insert_chunk(
+    session: AsyncSession, developer_id: int, rows: List[ImportRow]
+) -> List[int]:
+    """
+    Other databases: batched multi-row INSERTs via executemany.
+    Returns the event ids.
+    """
+    event_ids = (await session.execute(
+        insert(Event).returning(Event.id, sort_by_parameter_order=True),
+        [
+            {
+                "developer_account_id": developer_id,
+                "event_name": r.event,
+                "user_id": r.user_id,
+                "meta": r.metadata,
+                "timestamp": r.timestamp,
+            }
+            for r in rows
+        ],
+    )).scalars().all()
+    await session.execute(insert(Reward), [
+        {
+            "event_id": event_id,
+            "developer_account_id": developer_id,
+            "amount": r.amount,
+            "status": r.status,
+            "tx_hash": r.tx_hash,
+            "timestamp": r.timestamp,
+        }
+        for event_id, r in zip(event_ids, rows)
+    ])
+    return event_ids
+
+
+async def _commit_chunk(
+    session: AsyncSession, developer_id: int, job_id: int, rows: List[ImportRow]
+) -> None:
+    if _uses_copy(session):
+        event_ids = await _copy_chunk(session, developer_id, rows)
+    else:
+        event_ids = await _insert_chunk(session, developer_id, rows)
+    await record_attributes(session, developer_id, [
+        (event_id, r.timestamp, r.metadata) for event_id, r in zip(event_ids, rows)
+    ])
+
+    # Only pending rewards are still owed: settled history was paid out (or
+    # written off) by the previous system, and crediting it would let the
+    # developer withdraw it again
+    amounts: Dict[str, float] = {}
+    for r in rows:
+        if r.status == "pending":
+            amounts[r.user_id] = amounts.get(r.user_id, 0.0) + r.amount
+    balances = {}
+    if amounts:
+        balances = await _credit_user_balances(session, developer_id, amounts)
+        await _credit_developer_balance(session, developer_id, sum(amounts.values()))
+    await apply_rollups(session, developer_id, [(r.event, r.timestamp, r.amount) for r in rows])
+
+    await session.execute(
+        update(ImportJob)
+        .where(ImportJob.id == job_id)
+        .values(
+            rows_committed=ImportJob.rows_committed + len(rows),
+            updated_at=datetime.utcnow(),
+        )
+    )
+    await session.commit()
+    cache_user_balances(developer_id, balances)
+
+
+async def _start_job(
+    session: AsyncSession, developer_id: int, name: str, fmt: str, lease: float = IMPORT_JOB_LEASE
+) -> Tuple[int, int]:
+    """
+    Create or claim the named job; returns (job id, rows already committed).
+    A job another run holds (running, with a chunk committed within `lease`
+    seconds) is refused with 409.
+    """
+    now = datetime.utcnow()
+    stmt = upsert(session, ImportJob).values(
+        developer_account_id=developer_id,
+        name=name,
+        format=fmt,
+        rows_committed=0,
+        status="running",
+        created_at=now,
+        updated_at=now,
+    ).on_conflict_do_nothing(
+        index_elements=[ImportJob.developer_account_id, ImportJob.name]
+    ).returning(ImportJob.id)
+    job_id = (await session.execute(stmt)).scalar_one_or_none()
+    if job_id is not None:
+        await session.commit()
+        return job_id, 0
+
+    job_id, job_format = (await session.execute(
+        select(ImportJob.id, ImportJob.format).where(
+            ImportJob.developer_account_id == developer_id, ImportJob.name == name
+        )
+    )).one()
+    if job_format != fmt:
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Import job {name!r} was started with format {job_format}",
+        )
+    # Only one run can flip the row, so only one run gets the job
+    rows_committed = (await session.execute(
+        update(ImportJob)
+        .where(
+            ImportJob.id == job_id,
+            (ImportJob.status != "running")
+            | (ImportJob.updated_at < now - timedelta(seconds=lease)),
+        )
+        .values(status="running", error=None, updated_at=now)
+        .returning(ImportJob.rows_committed)
+    )).scalar_one_or_none()
+    await session.commit()
+    if rows_committed is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Import job {name!r} is already running",
+        )
+    return job_id, rows_committed
+
+
+async def _set_status(
+    session: AsyncSession, job_id: int, job_status: str, error: Optional[str] = None
+) -> int:
+    """
+    Update the job's status and return its committed row count.
+    """
+    rows_committed = (await session.execute(
+        update(ImportJob)
+        .where(ImportJob.id == job_id)
+        .values(status=job_status, error=error, updated_at=datetime.utcnow())
+        .returning(ImportJob.rows_committed)
+    )).scalar_one()
+    await session.commit()
+    return rows_committed
+
+
+async def import_rewards(
+    session: AsyncSession,
+    developer_id: int,
+    name: str,
+    chunks: AsyncIterator[bytes],
+    fmt: str,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+) -> ImportResult:
+    """
+    Import historical rewards for `developer_id` from a CSV or NDJSON byte
+    stream as job `name`, resuming after the rows a previous run committed.
+
+    A bad row stops the import with HTTP 400 after the preceding chunks are
+    committed; fix the input and rerun the job to continue from there.
+    """
+    async with tenant_session(session, developer_id) as session:
+        return await _import(session, developer_id, name, chunks, fmt, chunk_size)
+
+
+async def _import(
+    session: AsyncSession,
+    developer_id: int,
+    name: str,
+    chunks: AsyncIterator[bytes],
+    fmt: str,
+    chunk_size: int,
+) -> ImportResult:
+    job_id, skip = await _start_job(session, developer_id, name, fmt)
+    seen = 0
+    chunk: List[ImportRow] = []
+    try:
+        async for row in parse_rows(chunks, fmt):
+            seen += 1
+            if seen <= skip:
+                continue
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                await _commit_chunk(session, developer_id, job_id, chunk)
+                chunk = []
+        if chunk:
+            await _commit_chunk(session, developer_id, job_id, chunk)
+    except ImportRowError as e:
+        if chunk:
+            await _commit_chunk(session, developer_id, job_id, chunk)
+        await _set_status(session, job_id, "failed", str(e))
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    rows_committed = await _set_status(session, job_id, "completed")
+    return ImportResult(
+        job=name,
+        rows_committed=rows_committed,
+        rows_skipped=min(skip, seen),
+        status="completed",
+    )
+
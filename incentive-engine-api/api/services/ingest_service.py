@@ -0,0 +1,222 @@
+# incentive-engine-api/api/services/ingest_service.py
+
+"""
+Asynchronous reward ingestion: requests are queued in-process and a pool of
+worker tasks commits them in groups, one transaction per developer per group.
+
+The queue and the tracking-id statuses live in the process that accepted
+the request, so async mode needs a single API worker: with several, a
+status poll routed to another worker answers 404. `incentive-api serve`
+refuses to start more than one worker in this mode.
+"""
+
+import asyncio
+import logging
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from api.config import (
+    INGEST_QUEUE_SIZE,
+    INGEST_WORKERS,
+    INGEST_BATCH_SIZE,
+    INGEST_GROUP_RETRIES,
+    INGEST_STATUS_CACHE_SIZE,
+    INGEST_STATUS_TTL,
+)
+from api.models.reward import RewardRequest
+from api.services.reward_service import record_rewards
+from api.utils.cache import TTLCache, MISSING
+
+logger = logging.getLogger(__name__)
+
+
+class IngestQueueFull(Exception):
+    """
+    Raised by RewardIngestor.submit when the queue is at capacity.
+    """
+
+
+class IngestClosed(Exception):
+    """
+    Raised by RewardIngestor.submit while the ingestor is stopped or draining.
+    """
+
+
+class RewardIngestor:
+    """
+    Bounded in-process queue of reward requests drained by worker tasks.
+
+    Each worker takes up to `batch_size` queued requests, groups them by
+    developer and records each group with `record_rewards` in one
+    transaction. A group that fails is retried up to `group_retries` times,
+    then committed item by item so one bad request fails alone. Outcomes
+    are kept in a bounded status cache keyed by the tracking id returned
+    from `submit`.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable,
+        max_queue_size: int = INGEST_QUEUE_SIZE,
+        workers: int = INGEST_WORKERS,
+        batch_size: int = INGEST_BATCH_SIZE,
+        group_retries: int = INGEST_GROUP_RETRIES,
+        status_cache_size: int = INGEST_STATUS_CACHE_SIZE,
+        status_ttl: float = INGEST_STATUS_TTL,
+    ):
+        self.session_factory = session_factory
+        self.max_queue_size = max_queue_size
+        self.workers = workers
+        self.batch_size = batch_size
+        self.group_retries = group_retries
+        self.statuses = TTLCache(maxsize=status_cache_size, ttl=status_ttl)
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._accepting = False
+
+    @property
+    def running(self) -> bool:
+        return self._accepting
+
+    def depth(self) -> int:
+        """
+        Number of requests waiting to be picked up by a worker.
+        """
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self) -> None:
+        """
+        Create the queue and spawn the worker tasks.
+        """
+        if self._accepting:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"reward-ingest-{n}")
+            for n in range(self.workers)
+        ]
+        self._accepting = True
+
+    def submit(self, developer_id: int, req: RewardRequest) -> str:
+        """
+        Queue a validated reward request and return its tracking id.
+        Raises IngestQueueFull when the queue is at capacity.
+        """
+        if not self._accepting:
+            raise IngestClosed("Reward ingestion is not running")
+        tracking_id = uuid.uuid4().hex
+        try:
+            self._queue.put_nowait((tracking_id, developer_id, req))
+        except asyncio.QueueFull:
+            raise IngestQueueFull("Reward ingestion queue is full")
+        self.statuses.set(tracking_id, {"developer_id": developer_id, "status": "queued"})
+        return tracking_id
+
+    def status(self, tracking_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the recorded outcome for `tracking_id`, or None if unknown/expired.
+        """
+        entry = self.statuses.get(tracking_id)
+        return None if entry is MISSING else entry
+
+    async def drain(self) -> None:
+        """
+        Stop accepting requests, wait for everything queued to be committed,
+        then stop the workers.
+        """
+        if self._queue is None:
+            return
+        self._accepting = False
+        await self._queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            try:
+                await self._commit(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _record(self, developer_id: int, entries: List[Tuple[str, RewardRequest]]) -> None:
+        """
+        Commit `entries` in one transaction and mark them committed, or
+        failed when record_rewards rejected them (e.g. a reused key).
+        """
+        async with self.session_factory() as session:
+            results = await record_rewards(session, developer_id, [req for _, req in entries])
+        for (tracking_id, _), result in zip(entries, results):
+            if result.error is not None:
+                self.statuses.set(tracking_id, {
+                    "developer_id": developer_id,
+                    "status": "failed",
+                    "error": result.error,
+                })
+                continue
+            self.statuses.set(tracking_id, {
+                "developer_id": developer_id,
+                "status": "committed",
+                "result": {
+                    "reward_id": result.reward_id,
+                    "balance": result.balance,
+                    "status": result.status,
+                },
+            })
+
+    async def _commit(self, batch: List[Tuple[str, int, RewardRequest]]) -> None:
+        groups: Dict[int, List[Tuple[str, RewardRequest]]] = {}
+        for tracking_id, developer_id, req in batch:
+            groups.setdefault(developer_id, []).append((tracking_id, req))
+
+        for developer_id, entries in groups.items():
+            # Transient errors (a lost idempotency race, a busy database)
+            # usually clear on a retry; record_rewards replays keys that
+            # were committed meanwhile
+            for attempt in range(self.group_retries + 1):
+                try:
+                    await self._record(developer_id, entries)
+                    break
+                except Exception:
+                    logger.warning(
+                        "Failed to commit %d queued rewards (attempt %d)",
+                        len(entries), attempt + 1, exc_info=True,
+                    )
+                    if attempt < self.group_retries:
+                        await asyncio.sleep(0.05 * 2 ** attempt)
+            else:
+                await self._commit_each(developer_id, entries)
+
+    async def _commit_each(self, developer_id: int, entries: List[Tuple[str, RewardRequest]]) -> None:
+        """
+        Commit a group that keeps failing one request per transaction, so
+        only the requests that fail on their own are marked failed.
+        """
+        for entry in entries:
+            try:
+                await self._record(developer_id, [entry])
+            except Exception as e:
+                logger.exception("Failed to commit queued reward %s", entry[0])
+                self.statuses.set(entry[0], {
+                    "developer_id": developer_id,
+                    "status": "failed",
+                    "error": getattr(e, "detail", None) or "Internal server error",
+                })
+
+
+def _default_session_factory():
+    # Imported lazily so tests can build ingestors on their own engines
+    from api.db.database import SessionLocal
+    return SessionLocal()
+
+
+# Shared ingestor used by the reward routes when REWARD_INGEST_MODE=async
+reward_ingestor = RewardIngestor(_default_session_factory)
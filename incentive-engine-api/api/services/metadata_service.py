@@ -0,0 +1,252 @@
+# incentive-engine-api/api/services/metadata_service.py
+
+"""
+Promoted event metadata keys.
+
+Event metadata is stored as a compressed blob that SQL can't look inside.
+A developer can promote up to PROMOTED_KEYS_MAX keys (say `campaign`); from
+then on every event's value for the key is also written to the indexed
+`event_attributes` table, in the transaction that records the event, so
+listings can filter on it and rewards can be aggregated per value without
+scanning events.
+
+Values are stored as text: strings as-is, numbers and booleans as JSON
+(`5`, `2.5`, `true`). Other values (lists, objects, null) are not promoted.
+"""
+
+import asyncio
+import json
+from datetime import datetime
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.config import PROMOTED_KEYS_CACHE_TTL, PROMOTED_KEYS_MAX
+from api.db.dialect import upsert
+from api.db.models import Event, EventAttribute, PromotedMetadataKey, Reward
+from api.models.metadata import MetadataBreakdownResponse, MetadataValueStats
+from api.utils.cache import TTLCache, MISSING
+from api.utils.invalidation import invalidation_bus
+
+# Events read per chunk when backfilling a newly promoted key
+BACKFILL_CHUNK_SIZE = 1000
+
+# developer id -> frozenset of promoted keys
+promoted_key_cache = TTLCache(maxsize=10000, ttl=PROMOTED_KEYS_CACHE_TTL)
+invalidation_bus.register("promoted_keys", promoted_key_cache)
+
+
+async def promoted_keys(session: AsyncSession, developer_id: int) -> FrozenSet[str]:
+    """
+    The developer's promoted keys, cached for PROMOTED_KEYS_CACHE_TTL seconds.
+    """
+    keys = promoted_key_cache.get(developer_id)
+    if keys is MISSING:
+        keys = frozenset((await session.execute(
+            select(PromotedMetadataKey.key).where(
+                PromotedMetadataKey.developer_account_id == developer_id
+            )
+        )).scalars())
+        promoted_key_cache.set(developer_id, keys)
+    return keys
+
+
+def attribute_value(value: Any) -> Optional[str]:
+    """
+    Text stored for a promoted value, or None if the value can't be promoted.
+    """
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (bool, int, float)):
+        return json.dumps(value)
+    return None
+
+
+def attribute_rows(
+    developer_id: int,
+    keys: FrozenSet[str],
+    events: Iterable[Tuple[int, datetime, Optional[Dict[str, Any]]]],
+) -> List[Dict[str, Any]]:
+    """
+    event_attributes rows for the promoted keys found in (event id,
+    timestamp, metadata) triples.
+    """
+    rows = []
+    for event_id, timestamp, metadata in events:
+        if not metadata:
+            continue
+        for key in keys.intersection(metadata):
+            value = attribute_value(metadata[key])
+            if value is not None:
+                rows.append({
+                    "event_id": event_id,
+                    "developer_account_id": developer_id,
+                    "key": key,
+                    "value": value,
+                    "timestamp": timestamp,
+                })
+    return rows
+
+
+async def record_attributes(
+    session: AsyncSession,
+    developer_id: int,
+    events: Iterable[Tuple[int, datetime, Optional[Dict[str, Any]]]],
+) -> None:
+    """
+    Write the promoted values of newly inserted events. Call it in the
+    transaction that inserts the events; it issues no SQL for developers
+    without promoted keys once their (empty) key set is cached.
+    """
+    keys = await promoted_keys(session, developer_id)
+    if not keys:
+        return
+    rows = attribute_rows(developer_id, keys, events)
+    if rows:
+        await session.execute(insert(EventAttribute), rows)
+
+
+async def _require_promoted(session: AsyncSession, developer_id: int, key: str) -> None:
+    if key not in await promoted_keys(session, developer_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Metadata key {key!r} is not promoted, so it can't be queried",
+        )
+
+
+async def attribute_filters(
+    session: AsyncSession, developer_id: int, filters: List[str]
+) -> Dict[str, str]:
+    """
+    Parse `key:value` filters, raising 400 unless each key is promoted.
+    """
+    attributes: Dict[str, str] = {}
+    for item in filters:
+        key, sep, value = item.partition(":")
+        if not sep or not key:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Metadata filter {item!r} must look like key:value",
+            )
+        await _require_promoted(session, developer_id, key)
+        attributes[key] = value
+    return attributes
+
+
+async def _backfill(
+    session: AsyncSession, developer_id: int, key: str, chunk_size: int
+) -> int:
+    """
+    Add the key's attribute rows to existing events that lack one.
+    """
+    written = 0
+    last_id = 0
+    keys = frozenset([key])
+    while True:
+        rows = (await session.execute(
+            select(Event.id, Event.timestamp, Event.meta)
+            .outerjoin(
+                EventAttribute,
+                (EventAttribute.event_id == Event.id) & (EventAttribute.key == key),
+            )
+            .where(
+                Event.developer_account_id == developer_id,
+                Event.id > last_id,
+                EventAttribute.id.is_(None),
+            )
+            .order_by(Event.id)
+            .limit(chunk_size)
+        )).all()
+        if not rows:
+            return written
+        last_id = rows[-1].id
+        attributes = attribute_rows(developer_id, keys, rows)
+        if attributes:
+            await session.execute(insert(EventAttribute), attributes)
+        await session.commit()
+        written += len(attributes)
+
+
+async def promote_key(
+    session: AsyncSession,
+    developer_id: int,
+    key: str,
+    wait: Optional[float] = None,
+    chunk_size: int = BACKFILL_CHUNK_SIZE,
+) -> int:
+    """
+    Promote `key` for the developer and backfill existing events, returning
+    the number of attribute rows written. `session` must be on the
+    developer's shard.
+
+    The backfill starts once every worker's cached key set has expired
+    (`wait` seconds, PROMOTED_KEYS_CACHE_TTL + 1 by default), so events
+    written meanwhile are covered either by their worker or by the backfill.
+    """
+    keys = await promoted_keys(session, developer_id)
+    if key not in keys and len(keys) >= PROMOTED_KEYS_MAX:
+        raise ValueError(f"At most {PROMOTED_KEYS_MAX} metadata keys can be promoted")
+    await session.execute(
+        upsert(session, PromotedMetadataKey)
+        .values(developer_account_id=developer_id, key=key, created_at=datetime.utcnow())
+        .on_conflict_do_nothing(
+            index_elements=[PromotedMetadataKey.developer_account_id, PromotedMetadataKey.key]
+        )
+    )
+    await session.commit()
+    invalidation_bus.invalidate("promoted_keys", [developer_id])
+    await asyncio.sleep(PROMOTED_KEYS_CACHE_TTL + 1 if wait is None else wait)
+    return await _backfill(session, developer_id, key, chunk_size)
+
+
+async def demote_key(session: AsyncSession, developer_id: int, key: str) -> int:
+    """
+    Stop promoting `key` and drop its attribute rows; returns how many.
+    Values stay in each event's metadata.
+    """
+    await session.execute(
+        delete(PromotedMetadataKey).where(
+            PromotedMetadataKey.developer_account_id == developer_id,
+            PromotedMetadataKey.key == key,
+        )
+    )
+    result = await session.execute(
+        delete(EventAttribute).where(
+            EventAttribute.developer_account_id == developer_id, EventAttribute.key == key
+        )
+    )
+    await session.commit()
+    invalidation_bus.invalidate("promoted_keys", [developer_id])
+    return result.rowcount
+
+
+async def metadata_breakdown(
+    session: AsyncSession,
+    developer_id: int,
+    key: str,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> MetadataBreakdownResponse:
+    """
+    Reward count and total per value of a promoted key, read from the
+    attribute index.
+    """
+    await _require_promoted(session, developer_id, key)
+    stmt = (
+        select(EventAttribute.value, func.count(Reward.id), func.sum(Reward.amount))
+        .join(Reward, Reward.event_id == EventAttribute.event_id)
+        .where(EventAttribute.developer_account_id == developer_id, EventAttribute.key == key)
+        .group_by(EventAttribute.value)
+        .order_by(EventAttribute.value)
+    )
+    if since is not None:
+        stmt = stmt.where(EventAttribute.timestamp >= since)
+    if until is not None:
+        stmt = stmt.where(EventAttribute.timestamp < until)
+    values = [
+        MetadataValueStats(value=value, rewards=count, amount=amount or 0.0)
+        for value, count, amount in await session.execute(stmt)
+    ]
+    return MetadataBreakdownResponse(key=key, since=since, until=until, values=values)
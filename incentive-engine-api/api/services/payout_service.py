@@ -0,0 +1,406 @@
+# incentive-engine-api/api/services/payout_service.py
+
+"""
+Settles pending rewards through the custody provider.
+
+Each pass claims a block of pending rewards (pending -> processing), sums
+them into one transfer per developer wallet and end user, submits the
+transfers in provider-sized batches with bounded concurrency, and records
+the outcome with bulk updates (processing -> paid / failed). Transfers go
+to the address registered for the end user in user_wallets; rewards of
+users without one stay pending. No transaction is held open while the
+provider is being called.
+
+A new transfer's amount is reserved on the developer's balance, with the
+same conditional UPDATE (balance >= amount) that guards withdrawals,
+before it is submitted. A developer whose balance cannot cover a pass's
+transfers has those rewards put back to pending and is skipped for the
+rest of the run, so the balance never goes negative. A paid transfer is
+then debited from the end user's balance, a failed one refunds the
+reservation, and one with an unknown outcome keeps it. The developer's
+balance is therefore SUM(user balances) - withdrawn - processing rewards.
+
+Every reward's transfer reference is committed before its transfer is
+submitted. When the provider's answer is lost (the call raised, or the
+worker died) the rewards stay "processing"; once their claim is older than
+PAYOUT_CLAIM_TIMEOUT a later pass reclaims them and resubmits the same
+transfers under the same references, and the provider's deduplication
+turns the resubmission into a lookup of the original outcome.
+
+Rewards of tenants being moved between shards are neither claimed nor
+reclaimed until the move is over.
+"""
+
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Collection, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import and_, bindparam, or_, select, update
+
+from api.config import (
+    PAYOUT_CLAIM_SIZE,
+    PAYOUT_CLAIM_TIMEOUT,
+    PAYOUT_TRANSFER_BATCH_SIZE,
+    PAYOUT_CONCURRENCY,
+)
+from api.db import sharding
+from api.db.models import DeveloperAccount, DeveloperBalance, Event, Reward, UserBalance, UserWallet
+from api.services.custody import CustodyProvider, Transfer, TransferResult
+from api.utils.invalidation import invalidation_bus
+
+logger = logging.getLogger(__name__)
+
+
+class PayoutSummary(NamedTuple):
+    """
+    Counts from one or more payout passes.
+    """
+    claimed: int = 0
+    transfers: int = 0
+    paid: int = 0
+    failed: int = 0
+    unknown: int = 0  # left "processing" for a later pass to reconcile
+    held: int = 0  # put back to pending: the developer's balance fell short
+
+    def __add__(self, other: "PayoutSummary") -> "PayoutSummary":
+        return PayoutSummary(*(a + b for a, b in zip(self, other)))
+
+
+class _Payee(NamedTuple):
+    """
+    Whose balances a Transfer settles, and the rewards it pays.
+    """
+    developer_id: int
+    user_id: str
+    reward_ids: List[int]
+
+
+def _wallet_join():
+    return and_(
+        UserWallet.developer_account_id == Reward.developer_account_id,
+        UserWallet.user_id == Event.user_id,
+    )
+
+
+async def claim_pending_rewards(
+    session, limit: int, exclude: Collection[int] = ()
+) -> List[int]:
+    """
+    Move up to `limit` of the oldest pending rewards whose end user has a
+    payout address to "processing" and return their ids, skipping the
+    developers in `exclude`. The status check in the UPDATE makes
+    concurrent payout workers skip rows another worker already claimed.
+    """
+    stmt = (
+        select(Reward.id)
+        .join(Event, Event.id == Reward.event_id)
+        .join(UserWallet, _wallet_join())
+        .where(Reward.status == "pending")
+    )
+    if exclude:
+        stmt = stmt.where(Reward.developer_account_id.notin_(exclude))
+    candidates = (await session.execute(
+        stmt.order_by(Reward.id).limit(limit)
+    )).scalars().all()
+    if not candidates:
+        return []
+    claimed = (await session.execute(
+        update(Reward)
+        .where(Reward.id.in_(candidates), Reward.status == "pending")
+        .values(status="processing", claimed_at=datetime.utcnow())
+        .returning(Reward.id)
+    )).scalars().all()
+    await session.commit()
+    return sorted(claimed)
+
+
+async def reclaim_stale_rewards(
+    session, limit: int, timeout: float = PAYOUT_CLAIM_TIMEOUT, exclude: Collection[int] = ()
+) -> List[int]:
+    """
+    Take over up to `limit` rewards that have been "processing" for longer
+    than `timeout` seconds (a lost provider answer or a crashed worker) and
+    return their ids, skipping the developers in `exclude`. Refreshing
+    `claimed_at` in the UPDATE keeps two workers from reclaiming the same
+    rows.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=timeout)
+    stale = or_(Reward.claimed_at < cutoff, Reward.claimed_at.is_(None))
+    if exclude:
+        stale = and_(stale, Reward.developer_account_id.notin_(exclude))
+    candidates = (await session.execute(
+        select(Reward.id)
+        .where(Reward.status == "processing", stale)
+        .order_by(Reward.id)
+        .limit(limit)
+    )).scalars().all()
+    if not candidates:
+        return []
+    reclaimed = (await session.execute(
+        update(Reward)
+        .where(Reward.id.in_(candidates), Reward.status == "processing", stale)
+        .values(claimed_at=datetime.utcnow())
+        .returning(Reward.id)
+    )).scalars().all()
+    await session.commit()
+    return sorted(reclaimed)
+
+
+async def _adjust_developer_balances(session, amounts: Dict[int, float]) -> None:
+    """
+    Add `amounts` (developer id -> amount) to the developers' balances.
+    """
+    if amounts:
+        await session.execute(
+            update(DeveloperBalance.__table__)
+            .where(DeveloperBalance.developer_account_id == bindparam("dev"))
+            .values(
+                balance=DeveloperBalance.balance + bindparam("amount"),
+                updated_at=datetime.utcnow(),
+            ),
+            [{"dev": dev, "amount": amount} for dev, amount in amounts.items()],
+        )
+
+
+async def _reserve(session, developer_id: int, amount: float) -> bool:
+    """
+    Take `amount` off the developer's balance if it covers it.
+    """
+    reserved = (await session.execute(
+        update(DeveloperBalance)
+        .where(
+            DeveloperBalance.developer_account_id == developer_id,
+            DeveloperBalance.balance >= amount,
+        )
+        .values(balance=DeveloperBalance.balance - amount, updated_at=datetime.utcnow())
+        .returning(DeveloperBalance.developer_account_id)
+    )).first()
+    return reserved is not None
+
+
+async def _group_transfers(
+    session, reward_ids: List[int]
+) -> Tuple[List[Transfer], List[_Payee], Dict[int, int]]:
+    """
+    Build the Transfers settling the claimed rewards. Rewards that already
+    have a reference (reclaimed after an unknown outcome) are regrouped
+    under it, so they are resubmitted exactly as before; the others get one
+    new Transfer per (developer wallet, end user), their amounts are
+    reserved on the developer balance, and their references are committed
+    before anything is submitted. Reclaimed rewards whose user no longer
+    has an address go back to pending, releasing their reservation.
+    Returns the transfers, for each whose rewards it pays, and the number
+    of rewards held back per developer whose balance fell short.
+    """
+    rows = await session.execute(
+        select(
+            Reward.id, Reward.amount, Reward.payout_reference, Reward.developer_account_id,
+            DeveloperAccount.wallet_id, Event.user_id, UserWallet.address,
+        )
+        .join(Event, Event.id == Reward.event_id)
+        .join(DeveloperAccount, DeveloperAccount.id == Reward.developer_account_id)
+        .outerjoin(UserWallet, _wallet_join())
+        .where(Reward.id.in_(reward_ids))
+        .order_by(Reward.id)
+    )
+    groups: Dict[Tuple, List[Tuple[int, float]]] = {}
+    changes = []
+    released: Dict[int, float] = {}
+    for reward_id, amount, reference, developer_id, wallet_id, user_id, address in rows:
+        if address is None:
+            changes.append({"id": reward_id, "status": "pending", "claimed_at": None})
+            if reference is not None:
+                released[developer_id] = released.get(developer_id, 0.0) + amount
+                changes[-1]["payout_reference"] = None
+            continue
+        key = (developer_id, wallet_id, user_id, address, reference)
+        groups.setdefault(key, []).append((reward_id, amount))
+
+    # USDC has 6 decimals
+    totals = {key: round(sum(amount for _, amount in items), 6) for key, items in groups.items()}
+    needed: Dict[int, float] = {}
+    for key, total in totals.items():
+        if key[4] is None:
+            needed[key[0]] = needed.get(key[0], 0.0) + total
+    await _adjust_developer_balances(session, released)
+    short = {dev for dev, amount in needed.items() if not await _reserve(session, dev, amount)}
+
+    transfers, payees = [], []
+    held: Dict[int, int] = {}
+    for key, items in groups.items():
+        developer_id, wallet_id, user_id, address, reference = key
+        ids = [reward_id for reward_id, _ in items]
+        if reference is None and developer_id in short:
+            changes.extend({"id": i, "status": "pending", "claimed_at": None} for i in ids)
+            held[developer_id] = held.get(developer_id, 0) + len(ids)
+            continue
+        if reference is None:
+            # Reward ids repeat across shards, which share one custodian
+            reference = f"payout-{uuid.uuid4().hex}"
+            changes.extend({"id": i, "payout_reference": reference} for i in ids)
+        transfers.append(Transfer(
+            source_wallet_id=wallet_id,
+            destination=address,
+            amount=totals[key],
+            reference=reference,
+        ))
+        payees.append(_Payee(developer_id, user_id, ids))
+    if changes:
+        await session.execute(update(Reward), changes)
+    await session.commit()
+    return transfers, payees, held
+
+
+async def _debit_paid(session, paid: List[Tuple[_Payee, float]]) -> None:
+    """
+    Take settled amounts off the end users' balances. The developer's
+    share was reserved when the transfer was built.
+    """
+    users = [
+        {"dev": payee.developer_id, "uid": payee.user_id, "amount": amount}
+        for payee, amount in paid
+    ]
+    await session.execute(
+        update(UserBalance.__table__)
+        .where(
+            UserBalance.developer_account_id == bindparam("dev"),
+            UserBalance.user_id == bindparam("uid"),
+        )
+        .values(balance=UserBalance.balance - bindparam("amount"), updated_at=datetime.utcnow()),
+        users,
+    )
+
+
+async def _submit(
+    provider: CustodyProvider,
+    transfers: List[Transfer],
+    batch_size: int,
+    concurrency: int,
+) -> List[TransferResult]:
+    """
+    Submit `transfers` in batches of `batch_size`, at most `concurrency`
+    provider calls at a time. Transfers of a batch whose outcome is unknown
+    (the call raised, or answered with the wrong number of results) get
+    None instead of a TransferResult.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send(batch: List[Transfer]) -> List[Optional[TransferResult]]:
+        async with semaphore:
+            try:
+                results = await provider.submit_transfers(batch)
+            except Exception:
+                logger.exception("Custody provider failed a batch of %d transfers", len(batch))
+                return [None] * len(batch)
+        if len(results) != len(batch):
+            logger.error(
+                "Custody provider returned %d results for %d transfers", len(results), len(batch)
+            )
+            return [None] * len(batch)
+        return results
+
+    batches = [
+        transfers[i:i + batch_size] for i in range(0, len(transfers), batch_size)
+    ]
+    results: List[Optional[TransferResult]] = []
+    for batch_results in await asyncio.gather(*(send(b) for b in batches)):
+        results.extend(batch_results)
+    return results
+
+
+async def run_payout_pass(
+    session_factory: Callable,
+    provider: CustodyProvider,
+    claim_size: int = PAYOUT_CLAIM_SIZE,
+    batch_size: Optional[int] = None,
+    concurrency: int = PAYOUT_CONCURRENCY,
+    claim_timeout: float = PAYOUT_CLAIM_TIMEOUT,
+    held: Optional[Set[int]] = None,
+) -> PayoutSummary:
+    """
+    Claim, group, submit and settle one block of rewards: stale claims
+    first, then pending rewards. Developers in `held` are skipped, and
+    those whose balance could not cover their transfers are added to it.
+    """
+    batch_size = min(batch_size or PAYOUT_TRANSFER_BATCH_SIZE, provider.max_batch_size)
+    held = set() if held is None else held
+
+    skip = [*await sharding.shard_router.moving_tenants(), *held]
+    async with session_factory() as session:
+        reward_ids = await reclaim_stale_rewards(session, claim_size, claim_timeout, skip)
+        if len(reward_ids) < claim_size:
+            reward_ids += await claim_pending_rewards(
+                session, claim_size - len(reward_ids), skip
+            )
+        if not reward_ids:
+            return PayoutSummary()
+        transfers, payees, short = await _group_transfers(session, reward_ids)
+    held.update(short)
+
+    results = await _submit(provider, transfers, batch_size, concurrency)
+
+    updates = []
+    settled = []
+    refunds: Dict[int, float] = {}
+    paid = failed = unknown = 0
+    for transfer, payee, result in zip(transfers, payees, results):
+        ids = payee.reward_ids
+        if result is None:
+            # Stays "processing" under its reference until reclaimed
+            unknown += len(ids)
+        elif result.tx_hash:
+            paid += len(ids)
+            settled.append((payee, transfer.amount))
+            updates.extend({"id": i, "status": "paid", "tx_hash": result.tx_hash} for i in ids)
+        else:
+            failed += len(ids)
+            refunds[payee.developer_id] = refunds.get(payee.developer_id, 0.0) + transfer.amount
+            updates.extend({"id": i, "status": "failed", "tx_hash": None} for i in ids)
+
+    if updates:
+        async with session_factory() as session:
+            # ORM bulk UPDATE by primary key: one executemany for the whole pass
+            await session.execute(update(Reward), updates)
+            if settled:
+                await _debit_paid(session, settled)
+            await _adjust_developer_balances(session, refunds)
+            await session.commit()
+        invalidation_bus.invalidate(
+            "user_balance", [(payee.developer_id, payee.user_id) for payee, _ in settled]
+        )
+
+    return PayoutSummary(
+        claimed=len(reward_ids), transfers=len(transfers), paid=paid, failed=failed,
+        unknown=unknown, held=sum(short.values()),
+    )
+
+
+async def run_payouts(
+    session_factory: Callable,
+    provider: CustodyProvider,
+    claim_size: int = PAYOUT_CLAIM_SIZE,
+    batch_size: Optional[int] = None,
+    concurrency: int = PAYOUT_CONCURRENCY,
+    max_passes: Optional[int] = None,
+    claim_timeout: float = PAYOUT_CLAIM_TIMEOUT,
+) -> PayoutSummary:
+    """
+    Run payout passes until no claimable rewards remain (or `max_passes`).
+    A pass whose outcomes were all unknown ends the run; those rewards are
+    retried once their claim times out. Developers whose balance fell short
+    are skipped for the rest of the run.
+    """
+    total = PayoutSummary()
+    passes = 0
+    held: Set[int] = set()
+    while max_passes is None or passes < max_passes:
+        summary = await run_payout_pass(
+            session_factory, provider, claim_size, batch_size, concurrency, claim_timeout, held
+        )
+        passes += 1
+        total += summary
+        if not summary.claimed or summary.unknown == summary.claimed:
+            break
+    return total
@@ -1,12 +1,184 @@
 # incentive-engine-api/api/services/reward_service.py
 
-from sqlalchemy import select
-from sqlalchemy.exc import NoResultFound
+import hashlib
+import json
+from collections import namedtuple
+from typing import Any, Dict, List, Optional
+
+from pydantic import ValidationError
+from datetime import datetime
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status
 
-from api.db.models import DeveloperAccount, Event, Reward, UserBalance
-from api.models.reward import RewardResponse
+from api.db.dialect import upsert
+from api.db.sharding import tenant_session
+from api.config import (
+    IDEMPOTENCY_CACHE_SIZE,
+    IDEMPOTENCY_CACHE_TTL,
+    USER_BALANCE_CACHE_SIZE,
+    USER_BALANCE_CACHE_TTL,
+)
+from api.db.models import (
+    DeveloperBalance,
+    Event,
+    IdempotencyKey,
+    Reward,
+    UserBalance,
+)
+from api.models.reward import RewardRequest, RewardResponse, BatchRewardResult
+from api.services.metadata_service import record_attributes
+from api.services.rollup_service import apply_rollups
+from api.utils.auth import resolve_developer_id
+from api.utils.cache import TTLCache, MISSING
+from api.utils.invalidation import invalidation_bus
+
+# Response recorded for an idempotency key, with the fingerprint of the
+# request that first used it (None for keys stored before fingerprints)
+StoredResponse = namedtuple("StoredResponse", ["request_hash", "response"])
+
+# (developer_id, idempotency key) -> StoredResponse for recently seen keys
+idempotency_cache = TTLCache(maxsize=IDEMPOTENCY_CACHE_SIZE, ttl=IDEMPOTENCY_CACHE_TTL)
+
+# Idempotency keys deleted per statement by purge_idempotency_keys
+PURGE_CHUNK_SIZE = 1000
+
+KEY_REUSED = "Idempotency key was already used with a different request"
+
+# (developer_id, user_id) -> balance; written after every committed credit
+user_balance_cache = TTLCache(maxsize=USER_BALANCE_CACHE_SIZE, ttl=USER_BALANCE_CACHE_TTL)
+invalidation_bus.register("user_balance", user_balance_cache)
+
+
+def cache_user_balances(developer_id: int, balances: Dict[str, float]) -> None:
+    """
+    Record balances returned by a committed credit in the read cache, and
+    make other workers drop their now stale copies.
+    """
+    for user_id, balance in balances.items():
+        user_balance_cache.set((developer_id, user_id), balance)
+    invalidation_bus.publish("user_balance", ((developer_id, user_id) for user_id in balances))
+
+
+def request_fingerprint(event_name: str, user_id: str, amount: float, metadata: Any) -> str:
+    """
+    Hash of a reward request's content, stored with its idempotency key so a
+    key reused for a different request can be told apart from a retry.
+    """
+    payload = json.dumps(
+        [event_name, user_id, amount, metadata], sort_keys=True, separators=(",", ":")
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _reused(stored: StoredResponse, request_hash: str) -> bool:
+    return stored.request_hash is not None and stored.request_hash != request_hash
+
+
+def replay(stored: StoredResponse, request_hash: str) -> RewardResponse:
+    """
+    The stored response for a retried request, or 422 if the key was first
+    used for a different request.
+    """
+    if _reused(stored, request_hash):
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=KEY_REUSED)
+    return stored.response
+
+
+async def _developer_id_or_401(session: AsyncSession, api_key: str) -> int:
+    """
+    Resolve `api_key` to a developer account id or raise 401.
+    """
+    developer_id = await resolve_developer_id(api_key, session)
+    if developer_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid API key"
+        )
+    return developer_id
+
+
+async def _stored_responses(
+    session: AsyncSession,
+    developer_id: int,
+    keys: List[str]
+) -> Dict[str, StoredResponse]:
+    """
+    Load the responses recorded for `keys`, warming the idempotency cache.
+    Keys never used by this developer are absent from the result.
+    """
+    stmt = select(IdempotencyKey).where(
+        IdempotencyKey.developer_account_id == developer_id,
+        IdempotencyKey.key.in_(keys)
+    )
+    stored = {}
+    for record in (await session.execute(stmt)).scalars():
+        response = StoredResponse(record.request_hash, RewardResponse(
+            reward_id=record.reward_id,
+            balance=record.balance,
+            status=record.status
+        ))
+        idempotency_cache.set((developer_id, record.key), response)
+        stored[record.key] = response
+    return stored
+
+
+async def _credit_user_balances(
+    session: AsyncSession,
+    developer_id: int,
+    amounts: Dict[str, float]
+) -> Dict[str, float]:
+    """
+    Add `amounts` (user_id -> amount) to the developer's UserBalance rows in a
+    single INSERT ... ON CONFLICT DO UPDATE, creating missing rows.
+    The increment happens in the database, so concurrent credits to the same
+    user can't lose updates. Returns user_id -> balance after the credit.
+    """
+    now = datetime.utcnow()
+    stmt = upsert(session, UserBalance).values([
+        {
+            "developer_account_id": developer_id,
+            "user_id": user_id,
+            "balance": amount,
+            "updated_at": now,
+        }
+        for user_id, amount in amounts.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UserBalance.developer_account_id, UserBalance.user_id],
+        set_={
+            "balance": UserBalance.balance + stmt.excluded.balance,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    ).returning(UserBalance.user_id, UserBalance.balance)
+    result = await session.execute(stmt)
+    return dict(result.all())
+
+
+async def _credit_developer_balance(
+    session: AsyncSession,
+    developer_id: int,
+    amount: float
+) -> None:
+    """
+    Add `amount` to the developer's running balance, creating the row if needed.
+    """
+    stmt = upsert(session, DeveloperBalance).values(
+        developer_account_id=developer_id,
+        balance=amount,
+        withdrawn=0.0,
+        updated_at=datetime.utcnow(),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DeveloperBalance.developer_account_id],
+        set_={
+            "balance": DeveloperBalance.balance + stmt.excluded.balance,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    await session.execute(stmt)
 
 
 async def process_reward(
@@ -15,65 +187,348 @@ async def process_reward(
     event_name: str,
     user_id: str,
     amount: float,
-    metadata: dict
+    metadata: dict,
+    idempotency_key: Optional[str] = None
 ) -> RewardResponse:
     """
     Record a reward event, update user balance, and return the result.
+    If `idempotency_key` was already used by this developer, the stored
+    response is returned and nothing is written; if it was used for a
+    different request, HTTPException(422) is raised.
     Raises HTTPException if the developer API key is invalid.
     """
-    # 1. Lookup developer account by API key
-    stmt = select(DeveloperAccount).where(DeveloperAccount.api_key == api_key)
-    try:
-        result = await session.execute(stmt)
-        developer = result.scalar_one()
-    except NoResultFound:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid API key"
+    # 1. Resolve developer account by API key (cached)
+    developer_id = await _developer_id_or_401(session, api_key)
+
+    # Fast path: a retry of a request we answered recently
+    request_hash = None
+    if idempotency_key is not None:
+        request_hash = request_fingerprint(event_name, user_id, amount, metadata)
+        cached = idempotency_cache.get((developer_id, idempotency_key))
+        if cached is not MISSING:
+            return replay(cached, request_hash)
+
+    async with tenant_session(session, developer_id) as session:
+        return await _record_reward(
+            session, developer_id, event_name, user_id, amount, metadata,
+            idempotency_key, request_hash,
         )
 
+
+async def _record_reward(
+    session: AsyncSession,
+    developer_id: int,
+    event_name: str,
+    user_id: str,
+    amount: float,
+    metadata: dict,
+    idempotency_key: Optional[str],
+    request_hash: Optional[str],
+) -> RewardResponse:
+    """
+    Steps 2-7 of process_reward, on the session for the developer's shard.
+    """
+    # A key missing from this worker's cache (restart, another worker,
+    # eviction) may still be stored: answer from it before writing anything
+    if idempotency_key is not None:
+        stored = await _stored_responses(session, developer_id, [idempotency_key])
+        if idempotency_key in stored:
+            return replay(stored[idempotency_key], request_hash)
+
     # 2. Create and persist Event
+    now = datetime.utcnow()
     event = Event(
-        developer_account_id=developer.id,
+        developer_account_id=developer_id,
         event_name=event_name,
         user_id=user_id,
-        metadata=metadata
+        meta=metadata,
+        timestamp=now,
     )
     session.add(event)
     await session.flush()  # assign event.id
+    await record_attributes(session, developer_id, [(event.id, now, metadata)])
 
     # 3. Create and persist Reward
     reward = Reward(
         event_id=event.id,
-        developer_account_id=developer.id,
-        amount=amount
+        developer_account_id=developer_id,
+        amount=amount,
+        timestamp=now,
     )
     session.add(reward)
 
-    # 4. Update or create UserBalance
-    balance_stmt = select(UserBalance).where(
-        UserBalance.developer_account_id == developer.id,
-        UserBalance.user_id == user_id
+    # 4. Atomically credit the UserBalance (created on first reward)
+    rows = await _credit_user_balances(session, developer_id, {user_id: amount})
+    balance = rows[user_id]
+    await _credit_developer_balance(session, developer_id, amount)
+    await apply_rollups(session, developer_id, [(event_name, now, amount)])
+
+    response = RewardResponse(
+        reward_id=reward.id,
+        balance=balance,
+        status=reward.status
     )
-    balance_result = await session.execute(balance_stmt)
-    user_balance = balance_result.scalar_one_or_none()
-
-    if user_balance:
-        user_balance.balance += amount
-    else:
-        user_balance = UserBalance(
-            developer_account_id=developer.id,
-            user_id=user_id,
-            balance=amount
+
+    # 5. Claim the idempotency key; if a concurrent request claimed it since
+    #    the check above, undo our writes and answer with its response
+    if idempotency_key is not None:
+        claimed = await session.execute(
+            upsert(session, IdempotencyKey).values(
+                developer_account_id=developer_id,
+                key=idempotency_key,
+                reward_id=response.reward_id,
+                balance=response.balance,
+                status=response.status,
+                request_hash=request_hash,
+                created_at=datetime.utcnow(),
+            ).on_conflict_do_nothing(
+                index_elements=[
+                    IdempotencyKey.developer_account_id, IdempotencyKey.key
+                ]
+            ).returning(IdempotencyKey.id)
         )
-        session.add(user_balance)
+        if claimed.first() is None:
+            await session.rollback()
+            stored = await _stored_responses(session, developer_id, [idempotency_key])
+            return replay(stored[idempotency_key], request_hash)
 
-    # 5. Persist all changes
+    # 6. Persist all changes
     await session.commit()
+    cache_user_balances(developer_id, rows)
+    if idempotency_key is not None:
+        idempotency_cache.set(
+            (developer_id, idempotency_key), StoredResponse(request_hash, response)
+        )
 
-    # 6. Return a structured response
-    return RewardResponse(
-        reward_id=reward.id,
-        balance=user_balance.balance,
-        status=reward.status
-    )
+    # 7. Return a structured response
+    return response
+
+
+def _batch_item_error(exc: Exception) -> str:
+    """
+    Render a validation failure for a single batch item as a short message.
+    """
+    if isinstance(exc, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}"
+            for err in exc.errors()
+        )
+    return str(exc)
+
+
+async def process_reward_batch(
+    session: AsyncSession,
+    api_key: str,
+    items: List[Dict[str, Any]]
+) -> List[BatchRewardResult]:
+    """
+    Record many reward events in a single transaction.
+
+    The developer account is resolved once, Event and Reward rows are
+    bulk-inserted, and UserBalance changes are summed per user so each
+    balance row is written once. Items that fail validation are reported
+    individually and do not affect the rest of the batch.
+    Raises HTTPException if the developer API key is invalid.
+    """
+    # 1. Resolve developer account by API key (once for the whole batch)
+    developer_id = await _developer_id_or_401(session, api_key)
+
+    # 2. Validate each item on its own so one bad entry doesn't sink the batch
+    results: List[BatchRewardResult] = [None] * len(items)
+    accepted = []  # (index, RewardRequest)
+    for index, item in enumerate(items):
+        try:
+            if not isinstance(item, dict):
+                raise ValueError("item must be a JSON object")
+            accepted.append((index, RewardRequest(**item)))
+        except (ValidationError, ValueError, TypeError) as e:
+            results[index] = BatchRewardResult(
+                index=index, status="rejected", error=_batch_item_error(e)
+            )
+
+    # 3. Record the valid items together
+    recorded = await record_rewards(session, developer_id, [req for _, req in accepted])
+    for (index, _), result in zip(accepted, recorded):
+        result.index = index
+        results[index] = result
+    return results
+
+
+async def record_rewards(
+    session: AsyncSession,
+    developer_id: int,
+    requests: List[RewardRequest]
+) -> List[BatchRewardResult]:
+    """
+    Record already-validated rewards for one developer in a single transaction.
+
+    Items whose idempotency key was used before (or earlier in `requests`)
+    get the original result, or are rejected if the key was used for a
+    different request. Returns one result per request, in order,
+    with `index` set to the position in `requests`.
+    Raises HTTPException(409) if a concurrent request claimed one of the keys.
+    """
+    async with tenant_session(session, developer_id) as session:
+        return await _record_rewards(session, developer_id, requests)
+
+
+async def _record_rewards(
+    session: AsyncSession,
+    developer_id: int,
+    requests: List[RewardRequest]
+) -> List[BatchRewardResult]:
+    results: List[BatchRewardResult] = [None] * len(requests)
+    accepted = list(enumerate(requests))
+
+    # 1. Answer items whose idempotency key was already used
+    keys = {req.idempotency_key for _, req in accepted if req.idempotency_key}
+    hashes = {
+        index: request_fingerprint(req.event, req.user_id, req.amount, req.metadata)
+        for index, req in accepted if req.idempotency_key
+    }
+    stored: Dict[str, StoredResponse] = {}
+    for key in keys:
+        cached = idempotency_cache.get((developer_id, key))
+        if cached is not MISSING:
+            stored[key] = cached
+    if len(stored) < len(keys):
+        stored.update(await _stored_responses(session, developer_id, list(keys - set(stored))))
+
+    fresh = []       # (index, RewardRequest) to record now
+    repeats = []     # (index, key) repeating a key first seen in this batch
+    claimed = {}     # key -> fingerprint of the item in this batch claiming it
+    for index, req in accepted:
+        key = req.idempotency_key
+        if key in stored or key in claimed:
+            first_hash = stored[key].request_hash if key in stored else claimed[key]
+            if first_hash is not None and first_hash != hashes[index]:
+                results[index] = BatchRewardResult(index=index, status="rejected", error=KEY_REUSED)
+            elif key in stored:
+                results[index] = BatchRewardResult(index=index, **stored[key].response.dict())
+            else:
+                repeats.append((index, key))
+        else:
+            if key:
+                claimed[key] = hashes[index]
+            fresh.append((index, req))
+
+    if not fresh:
+        return results
+
+    # 2. Bulk-insert Events, then Rewards pointing at them
+    now = datetime.utcnow()
+    event_ids = (await session.execute(
+        insert(Event).returning(Event.id, sort_by_parameter_order=True),
+        [
+            {
+                "developer_account_id": developer_id,
+                "event_name": req.event,
+                "user_id": req.user_id,
+                "meta": req.metadata,
+                "timestamp": now,
+            }
+            for _, req in fresh
+        ],
+    )).scalars().all()
+    await record_attributes(session, developer_id, [
+        (event_id, now, req.metadata) for event_id, (_, req) in zip(event_ids, fresh)
+    ])
+
+    reward_rows = (await session.execute(
+        insert(Reward).returning(
+            Reward.id, Reward.status, sort_by_parameter_order=True
+        ),
+        [
+            {
+                "event_id": event_id,
+                "developer_account_id": developer_id,
+                "amount": req.amount,
+                "timestamp": now,
+            }
+            for event_id, (_, req) in zip(event_ids, fresh)
+        ],
+    )).all()
+
+    # 3. Apply balance changes grouped per user
+    totals: Dict[str, float] = {}
+    for _, req in fresh:
+        totals[req.user_id] = totals.get(req.user_id, 0.0) + req.amount
+
+    final = await _credit_user_balances(session, developer_id, totals)
+    await _credit_developer_balance(session, developer_id, sum(totals.values()))
+    await apply_rollups(session, developer_id, [(req.event, now, req.amount) for _, req in fresh])
+    running = {
+        user_id: final[user_id] - total for user_id, total in totals.items()
+    }
+
+    # 4. Work out each item's result, with the user's balance as of that item
+    responses: Dict[str, RewardResponse] = {}
+    response_hashes: Dict[str, str] = {}
+    for (index, req), reward in zip(fresh, reward_rows):
+        running[req.user_id] += req.amount
+        results[index] = BatchRewardResult(
+            index=index,
+            reward_id=reward.id,
+            balance=running[req.user_id],
+            status=reward.status,
+        )
+        if req.idempotency_key:
+            responses[req.idempotency_key] = RewardResponse(
+                reward_id=reward.id,
+                balance=running[req.user_id],
+                status=reward.status,
+            )
+            response_hashes[req.idempotency_key] = hashes[index]
+    for index, key in repeats:
+        results[index] = BatchRewardResult(index=index, **responses[key].dict())
+
+    # 5. Record idempotency keys and persist all changes at once
+    try:
+        if responses:
+            await session.execute(insert(IdempotencyKey), [
+                {
+                    "developer_account_id": developer_id,
+                    "key": key,
+                    "reward_id": response.reward_id,
+                    "balance": response.balance,
+                    "status": response.status,
+                    "request_hash": response_hashes[key],
+                    "created_at": now,
+                }
+                for key, response in responses.items()
+            ])
+        await session.commit()
+    except IntegrityError:
+        # A concurrent request claimed one of our keys first
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Idempotency key in use by a concurrent request; retry the batch",
+        )
+    cache_user_balances(developer_id, final)
+    for key, response in responses.items():
+        idempotency_cache.set((developer_id, key), StoredResponse(response_hashes[key], response))
+    return results
+
+
+async def purge_idempotency_keys(
+    session: AsyncSession, older_than: datetime, chunk_size: int = PURGE_CHUNK_SIZE
+) -> int:
+    """
+    Delete idempotency keys created before `older_than`, a chunk per
+    transaction so the table isn't locked for long. Retries after that
+    are recorded as new rewards. Returns the number of keys deleted.
+    """
+    deleted = 0
+    while True:
+        ids = (await session.execute(
+            select(IdempotencyKey.id)
+            .where(IdempotencyKey.created_at < older_than)
+            .order_by(IdempotencyKey.created_at)
+            .limit(chunk_size)
+        )).scalars().all()
+        if not ids:
+            return deleted
+        await session.execute(delete(IdempotencyKey).where(IdempotencyKey.id.in_(ids)))
+        await session.commit()
+        deleted += len(ids)
@@ -0,0 +1,195 @@
+# incentive-engine-api/api/services/rollup_service.py
+
+"""
+Hourly and daily reward rollups per developer and event name.
+
+Every code path that records rewards calls `apply_rollups` in its own
+transaction, so the rollups are exactly as current as the rewards. Stats
+queries read a handful of rollup rows instead of scanning events and
+rewards; `rebuild_rollups` recomputes them from the raw tables.
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.db.dialect import upsert
+from api.db.models import Event, Reward, RewardRollup
+from api.models.stats import StatsBucket, StatsResponse
+
+GRANULARITIES = ("hour", "day")
+
+# Rows per INSERT when rebuilding
+REBUILD_CHUNK_SIZE = 1000
+
+
+def bucket_start(timestamp: datetime, granularity: str) -> datetime:
+    """
+    Start of the hour or day containing `timestamp`.
+    """
+    if granularity == "hour":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+async def apply_rollups(
+    session: AsyncSession,
+    developer_id: int,
+    rewards: Iterable[Tuple[str, datetime, float]],
+) -> None:
+    """
+    Add (event name, timestamp, amount) rewards to the developer's hourly
+    and daily rollups with one INSERT ... ON CONFLICT DO UPDATE. Call it
+    in the transaction that records the rewards.
+    """
+    totals: Dict[Tuple[str, datetime, str], List] = {}
+    for event_name, timestamp, amount in rewards:
+        for granularity in GRANULARITIES:
+            key = (granularity, bucket_start(timestamp, granularity), event_name)
+            entry = totals.setdefault(key, [0, 0.0])
+            entry[0] += 1
+            entry[1] += amount
+    if not totals:
+        return
+
+    now = datetime.utcnow()
+    stmt = upsert(session, RewardRollup).values([
+        {
+            "developer_account_id": developer_id,
+            "granularity": granularity,
+            "bucket_start": start,
+            "event_name": event_name,
+            "reward_count": count,
+            "amount_total": amount,
+            "updated_at": now,
+        }
+        for (granularity, start, event_name), (count, amount) in totals.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[
+            RewardRollup.developer_account_id,
+            RewardRollup.granularity,
+            RewardRollup.bucket_start,
+            RewardRollup.event_name,
+        ],
+        set_={
+            "reward_count": RewardRollup.reward_count + stmt.excluded.reward_count,
+            "amount_total": RewardRollup.amount_total + stmt.excluded.amount_total,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    await session.execute(stmt)
+
+
+def _bucket_expression(session: AsyncSession, granularity: str):
+    """
+    SQL truncating Reward.timestamp to the bucket start.
+    """
+    if session.bind.dialect.name == "postgresql":
+        return func.date_trunc(granularity, Reward.timestamp)
+    fmt = "%Y-%m-%d %H:00:00" if granularity == "hour" else "%Y-%m-%d 00:00:00"
+    return func.strftime(literal_column(f"'{fmt}'"), Reward.timestamp)
+
+
+async def rebuild_rollups(session: AsyncSession, account_id: Optional[int] = None) -> int:
+    """
+    Recompute the rollups (all developers, or just `account_id`) from
+    events and rewards in one transaction. Returns the number of rows
+    written.
+    """
+    clear = delete(RewardRollup)
+    if account_id is not None:
+        clear = clear.where(RewardRollup.developer_account_id == account_id)
+    await session.execute(clear)
+
+    now = datetime.utcnow()
+    written = 0
+    for granularity in GRANULARITIES:
+        bucket = _bucket_expression(session, granularity).label("bucket")
+        stmt = (
+            select(
+                Reward.developer_account_id,
+                Event.event_name,
+                bucket,
+                func.count(Reward.id),
+                func.sum(Reward.amount),
+            )
+            .join(Event, Event.id == Reward.event_id)
+            .group_by(Reward.developer_account_id, Event.event_name, bucket)
+        )
+        if account_id is not None:
+            stmt = stmt.where(Reward.developer_account_id == account_id)
+
+        # Grouping happens in the database; only one row per bucket comes back
+        result = await session.stream(stmt.execution_options(yield_per=REBUILD_CHUNK_SIZE))
+        async for rows in result.partitions():
+            await session.execute(insert(RewardRollup), [
+                {
+                    "developer_account_id": developer_id,
+                    "granularity": granularity,
+                    "bucket_start": (
+                        datetime.fromisoformat(start) if isinstance(start, str) else start
+                    ),
+                    "event_name": event_name,
+                    "reward_count": count,
+                    "amount_total": amount,
+                    "updated_at": now,
+                }
+                for developer_id, event_name, start, count, amount in rows
+            ])
+            written += len(rows)
+    await session.commit()
+    return written
+
+
+async def get_stats(
+    session: AsyncSession,
+    developer_id: int,
+    granularity: str,
+    since: datetime,
+    until: datetime,
+    event: Optional[str] = None,
+) -> StatsResponse:
+    """
+    Rewards per event name and bucket for buckets starting in [since, until).
+    """
+    stmt = (
+        select(
+            RewardRollup.bucket_start,
+            RewardRollup.event_name,
+            RewardRollup.reward_count,
+            RewardRollup.amount_total,
+        )
+        .where(
+            RewardRollup.developer_account_id == developer_id,
+            RewardRollup.granularity == granularity,
+            RewardRollup.bucket_start >= bucket_start(since, granularity),
+            RewardRollup.bucket_start < until,
+        )
+        .order_by(RewardRollup.bucket_start, RewardRollup.event_name)
+    )
+    if event is not None:
+        stmt = stmt.where(RewardRollup.event_name == event)
+    buckets = [
+        StatsBucket(bucket=start, event=event_name, rewards=count, amount=amount)
+        for start, event_name, count, amount in await session.execute(stmt)
+    ]
+    return StatsResponse(
+        granularity=granularity,
+        since=bucket_start(since, granularity),
+        until=until,
+        total_rewards=sum(b.rewards for b in buckets),
+        total_amount=sum(b.amount for b in buckets),
+        buckets=buckets,
+    )
+
+
+def default_window(granularity: str, until: Optional[datetime]) -> Tuple[datetime, datetime]:
+    """
+    Default stats window: the last 48 hours, or the last 30 days.
+    """
+    until = until or datetime.utcnow()
+    span = timedelta(hours=48) if granularity == "hour" else timedelta(days=30)
+    return until - span, until
@@ -0,0 +1,278 @@
+# incentive-engine-api/api/services/shard_service.py
+
+"""
+Moves a tenant's data between shards.
+
+A move runs in four steps:
+
+1. The tenant is marked "moving" in the directory. Requests routed for the
+   tenant get 503 from then on. The move waits one SHARD_CACHE_TTL so every
+   worker has dropped its cached assignment.
+2. The tenant's rows are copied to the target shard in chunks. Event,
+   reward and idempotency-key ids are reassigned by the target database,
+   and references are remapped one chunk at a time.
+3. The directory entry is switched to the target shard.
+4. The tenant's rows are deleted from the source shard.
+
+Payout passes skip tenants marked "moving". A move is refused while the
+tenant has rewards "processing" or withdrawals "pending" on the source:
+their outcome would be settled on the source after the rows were copied.
+The check runs again after the copy, and the move is undone if a payout
+or withdrawal slipped in.
+
+A move that fails part-way can simply be run again. Step 2 starts by
+clearing whatever an earlier attempt left on the target, and a rerun after
+step 3 deletes the rows left on the other shards.
+"""
+
+import asyncio
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.db.dialect import upsert
+from api.db.models import (
+    DeveloperAccount,
+    DeveloperBalance,
+    Event,
+    EventAttribute,
+    IdempotencyKey,
+    ImportJob,
+    PromotedMetadataKey,
+    Reward,
+    RewardRollup,
+    TenantShard,
+    UserBalance,
+    UserWallet,
+    Withdrawal,
+)
+from api.db.sharding import DEFAULT_SHARD, ShardRouter
+
+# Tenant tables copied without id remapping. Ids other than the developer
+# account id are reassigned by the target database.
+PLAIN_TABLES = (
+    UserBalance, UserWallet, DeveloperBalance, Withdrawal, ImportJob, RewardRollup,
+    PromotedMetadataKey,
+)
+
+# Every tenant table, children before parents (the order rows are deleted in)
+TENANT_TABLES = (IdempotencyKey, Reward, EventAttribute, Event, *PLAIN_TABLES)
+
+CHUNK_SIZE = 1000
+
+
+def _row(obj, drop_id: bool = True) -> Dict:
+    columns = obj.__table__.columns
+    return {
+        c.key: getattr(obj, c.key)
+        for c in columns
+        if not (drop_id and c.primary_key and c.key != "developer_account_id")
+    }
+
+
+async def _set_assignment(session: AsyncSession, developer_id: int, shard: str, state: str) -> None:
+    stmt = upsert(session, TenantShard).values(
+        developer_account_id=developer_id, shard=shard, state=state, updated_at=datetime.utcnow()
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[TenantShard.developer_account_id],
+        set_={"shard": stmt.excluded.shard, "state": stmt.excluded.state,
+              "updated_at": stmt.excluded.updated_at},
+    )
+    await session.execute(stmt)
+    await session.commit()
+
+
+async def _delete_tenant(session: AsyncSession, developer_id: int) -> None:
+    for model in TENANT_TABLES:
+        await session.execute(delete(model).where(model.developer_account_id == developer_id))
+    await session.commit()
+
+
+async def _in_flight(session: AsyncSession, developer_id: int) -> Optional[str]:
+    """
+    Why the tenant cannot be moved yet: payouts or withdrawals whose
+    outcome is still to be recorded on this shard. None when there are none.
+    """
+    processing = await session.scalar(
+        select(func.count()).select_from(Reward).where(
+            Reward.developer_account_id == developer_id, Reward.status == "processing"
+        )
+    )
+    pending = await session.scalar(
+        select(func.count()).select_from(Withdrawal).where(
+            Withdrawal.developer_account_id == developer_id, Withdrawal.status == "pending"
+        )
+    )
+    if processing or pending:
+        return (
+            f"Developer account {developer_id} has {processing} reward(s) being paid out "
+            f"and {pending} pending withdrawal(s); retry once they are settled"
+        )
+    return None
+
+
+async def _copy_events(
+    source: AsyncSession, target: AsyncSession, developer_id: int, chunk_size: int
+) -> Dict[str, int]:
+    """
+    Copy events with their rewards, idempotency keys and promoted
+    attributes, a chunk of events at a time, remapping ids through the
+    chunk's old -> new maps.
+    """
+    counts = {"events": 0, "rewards": 0, "idempotency_keys": 0, "event_attributes": 0}
+    last_id = 0
+    while True:
+        events = (await source.execute(
+            select(Event)
+            .where(Event.developer_account_id == developer_id, Event.id > last_id)
+            .order_by(Event.id)
+            .limit(chunk_size)
+        )).scalars().all()
+        if not events:
+            return counts
+        last_id = events[-1].id
+
+        new_event_ids = (await target.execute(
+            insert(Event).returning(Event.id, sort_by_parameter_order=True),
+            [_row(e) for e in events],
+        )).scalars().all()
+        event_map = {e.id: new for e, new in zip(events, new_event_ids)}
+
+        attributes = (await source.execute(
+            select(EventAttribute).where(EventAttribute.event_id.in_(event_map))
+        )).scalars().all()
+        if attributes:
+            rows = []
+            for a in attributes:
+                row = _row(a)
+                row["event_id"] = event_map[a.event_id]
+                rows.append(row)
+            await target.execute(insert(EventAttribute), rows)
+        counts["event_attributes"] += len(attributes)
+
+        rewards = (await source.execute(
+            select(Reward).where(Reward.event_id.in_(event_map)).order_by(Reward.id)
+        )).scalars().all()
+        reward_map = {}
+        if rewards:
+            rows = []
+            for r in rewards:
+                row = _row(r)
+                row["event_id"] = event_map[r.event_id]
+                rows.append(row)
+            new_reward_ids = (await target.execute(
+                insert(Reward).returning(Reward.id, sort_by_parameter_order=True), rows
+            )).scalars().all()
+            reward_map = {r.id: new for r, new in zip(rewards, new_reward_ids)}
+
+            keys = (await source.execute(
+                select(IdempotencyKey).where(IdempotencyKey.reward_id.in_(reward_map))
+            )).scalars().all()
+            if keys:
+                rows = []
+                for k in keys:
+                    row = _row(k)
+                    row["reward_id"] = reward_map[k.reward_id]
+                    rows.append(row)
+                await target.execute(insert(IdempotencyKey), rows)
+            counts["idempotency_keys"] += len(keys)
+
+        await target.commit()
+        source.expunge_all()
+        counts["events"] += len(events)
+        counts["rewards"] += len(rewards)
+
+
+async def _copy_plain(
+    source: AsyncSession, target: AsyncSession, developer_id: int, chunk_size: int
+) -> Dict[str, int]:
+    counts = {}
+    for model in PLAIN_TABLES:
+        counts[model.__tablename__] = 0
+        result = await source.stream(
+            select(model)
+            .where(model.developer_account_id == developer_id)
+            .execution_options(yield_per=chunk_size)
+        )
+        async for partition in result.scalars().partitions():
+            await target.execute(insert(model), [_row(obj) for obj in partition])
+            counts[model.__tablename__] += len(partition)
+        await target.commit()
+    return counts
+
+
+async def move_tenant(
+    router: ShardRouter,
+    developer_id: int,
+    target_shard: str,
+    wait: Optional[float] = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> Dict[str, int]:
+    """
+    Move `developer_id`'s data to `target_shard`. Returns the number of rows
+    copied per table (empty if the tenant already lives there). Raises
+    ValueError while payouts or withdrawals of the tenant are in flight.
+    """
+    directory_factory = router.session_factory(DEFAULT_SHARD)
+    target_factory = router.session_factory(target_shard)
+
+    async with directory_factory() as directory:
+        account = await directory.get(DeveloperAccount, developer_id)
+        if account is None:
+            raise ValueError(f"Developer account {developer_id} does not exist")
+        account_row = _row(account, drop_id=False)
+        # Read the directory itself rather than this process's cache
+        row = (await directory.execute(
+            select(TenantShard.shard).where(TenantShard.developer_account_id == developer_id)
+        )).first()
+        source_shard = row.shard if row else DEFAULT_SHARD
+        if source_shard == target_shard:
+            # A move that failed after step 3 left the originals behind
+            for shard in router.names:
+                if shard != target_shard:
+                    async with router.session_factory(shard)() as stale:
+                        await _delete_tenant(stale, developer_id)
+            return {}
+
+        # 1. Freeze the tenant and let cached assignments expire everywhere
+        await _set_assignment(directory, developer_id, source_shard, "moving")
+    router.forget(developer_id)
+    await asyncio.sleep(router.cache_ttl + 1 if wait is None else wait)
+
+    source_factory = router.session_factory(source_shard)
+    async with source_factory() as source, target_factory() as target:
+        busy = await _in_flight(source, developer_id)
+        if busy is None:
+            # 2. Copy, starting from a clean slate on the target
+            await _delete_tenant(target, developer_id)
+            if target_shard != DEFAULT_SHARD:
+                # Reference copy of the account row, for foreign keys and payouts
+                await target.execute(
+                    upsert(target, DeveloperAccount).values(**account_row)
+                    .on_conflict_do_nothing(index_elements=[DeveloperAccount.id])
+                )
+                await target.commit()
+            counts = await _copy_events(source, target, developer_id, chunk_size)
+            counts.update(await _copy_plain(source, target, developer_id, chunk_size))
+            # A payout or withdrawal that started before the freeze took hold
+            busy = await _in_flight(source, developer_id)
+            if busy is not None:
+                await _delete_tenant(target, developer_id)
+    if busy is not None:
+        async with directory_factory() as directory:
+            await _set_assignment(directory, developer_id, source_shard, "active")
+        router.forget(developer_id)
+        raise ValueError(busy)
+
+    # 3. Switch the directory entry
+    async with directory_factory() as directory:
+        await _set_assignment(directory, developer_id, target_shard, "active")
+    router.forget(developer_id)
+
+    # 4. Remove the originals
+    async with source_factory() as source:
+        await _delete_tenant(source, developer_id)
+    return counts
@@ -1,7 +1,26 @@
 # incentive-engine-api/api/utils/auth.py
 
+from typing import Optional
+
 from fastapi import Header, HTTPException, status
-from api.config import API_KEY
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.config import (
+    API_KEY,
+    API_KEY_CACHE_SIZE,
+    API_KEY_CACHE_TTL,
+    API_KEY_CACHE_NEGATIVE_TTL,
+)
+from api.db.models import DeveloperAccount
+from api.utils.cache import TTLCache, MISSING
+from api.utils.invalidation import invalidation_bus
+
+# Shared API key -> developer account id cache. Unknown keys are cached as
+# None (for a shorter TTL) so floods of invalid keys don't reach the DB.
+developer_key_cache = TTLCache(maxsize=API_KEY_CACHE_SIZE, ttl=API_KEY_CACHE_TTL)
+invalidation_bus.register("api_key", developer_key_cache)
+
 
 async def api_key_auth(x_api_key: str = Header(..., alias="X-API-KEY")) -> str:
     """
@@ -13,3 +32,53 @@ async def api_key_auth(x_api_key: str = Header(..., alias="X-API-KEY")) -> str:
             detail="Unauthorized: invalid API key"
         )
     return x_api_key
+
+
+async def resolve_developer_id(
+    api_key: str, session: Optional[AsyncSession] = None
+) -> Optional[int]:
+    """
+    Return the DeveloperAccount id for `api_key`, or None if no account uses it.
+    Served from `developer_key_cache` when possible; on a miss the account is
+    looked up with `session`, or a short-lived session if none is given.
+    """
+    developer_id = developer_key_cache.get(api_key)
+    if developer_id is not MISSING:
+        return developer_id
+
+    stmt = select(DeveloperAccount.id).where(DeveloperAccount.api_key == api_key)
+    if session is None:
+        # Imported here so the cache can be used without configuring an engine
+        from api.db.database import SessionLocal
+        async with SessionLocal() as own_session:
+            developer_id = (await own_session.execute(stmt)).scalar_one_or_none()
+    else:
+        developer_id = (await session.execute(stmt)).scalar_one_or_none()
+
+    if developer_id is None:
+        developer_key_cache.set(api_key, None, ttl=API_KEY_CACHE_NEGATIVE_TTL)
+    else:
+        developer_key_cache.set(api_key, developer_id)
+    return developer_id
+
+
+def invalidate_api_key(api_key: str) -> None:
+    """
+    Forget any cached resolution for `api_key` (e.g. after it is issued),
+    in every worker.
+    """
+    invalidation_bus.invalidate("api_key", [api_key])
+
+
+async def developer_auth(x_api_key: str = Header(..., alias="X-API-KEY")) -> int:
+    """
+    FastAPI dependency that resolves X-API-KEY to a developer account id.
+    Only touches the database on a cache miss.
+    """
+    developer_id = await resolve_developer_id(x_api_key)
+    if developer_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Unauthorized: invalid API key"
+        )
+    return developer_id
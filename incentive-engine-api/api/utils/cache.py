@@ -0,0 +1,109 @@
+# incentive-engine-api/api/utils/cache.py
+
+"""
+Small in-process caches used on the request hot path.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+# Returned by TTLCache.get when a key is absent or expired
+MISSING = object()
+
+
+class TTLCache:
+    """
+    Bounded mapping with per-entry expiry and least-recently-used eviction.
+
+    Lookups and writes are O(1). Entries expire `ttl` seconds after being
+    written (or a per-entry override); once `maxsize` entries are held, the
+    least recently used one is evicted to make room. Not thread-safe: it is
+    meant to be used from a single event loop.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        """
+        Return the cached value for `key`, or `default` if absent or expired.
+        """
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        value, expires_at = entry
+        if expires_at <= self._clock():
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Store `value` under `key`, evicting the least recently used entry if full.
+        """
+        expires_at = self._clock() + (self.ttl if ttl is None else ttl)
+        if key in self._data:
+            self._data.move_to_end(key)
+        elif len(self._data) >= self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+        self._data[key] = (value, expires_at)
+
+    def add(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> bool:
+        """
+        Store `value` only if `key` has no live entry; returns whether it did.
+        Read-through fills use this so a value loaded before a concurrent
+        write can't overwrite the fresher one that write cached.
+        """
+        entry = self._data.get(key)
+        if entry is not None and entry[1] > self._clock():
+            return False
+        self.set(key, value, ttl)
+        return True
+
+    def invalidate(self, key: Hashable) -> None:
+        """
+        Drop `key` from the cache if present.
+        """
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Drop every entry (counters are kept).
+        """
+        self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return hit/miss/eviction counters and the current size.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "size": len(self._data),
+        }
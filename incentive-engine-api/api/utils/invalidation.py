@@ -0,0 +1,174 @@
+# incentive-engine-api/api/utils/invalidation.py
+
+"""
+Cross-process cache invalidation for multi-worker deployments.
+
+Each worker binds a Unix datagram socket in INVALIDATION_SOCKET_DIR. When a
+worker changes data that other workers may have cached (a newly issued API
+key, a credited user balance, a promoted metadata key), it drops or
+refreshes its own entry and sends the key to every other socket in the
+directory. Receivers drop the key from the named cache, so their next read
+goes to the database.
+
+Delivery is best effort. A worker whose socket buffer is full loses the
+message and keeps serving the old entry until it expires, so cache TTLs
+still bound staleness. With INVALIDATION_SOCKET_DIR unset (a single
+worker) publishing does nothing.
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import socket
+from typing import Dict, Hashable, Iterable, List, Optional
+
+from api.config import INVALIDATION_SOCKET_DIR
+from api.utils.cache import TTLCache
+
+# Keys per datagram, keeping messages far below the socket buffer size
+KEYS_PER_MESSAGE = 200
+
+_SUFFIX = ".sock"
+
+# Distinguishes buses within one process (tests run several)
+_instances = itertools.count()
+
+
+def _decode_key(key) -> Hashable:
+    # JSON turns tuple keys such as (developer id, user id) into lists
+    return tuple(key) if isinstance(key, list) else key
+
+
+class InvalidationBus:
+    """
+    Sends and receives cache invalidations over Unix datagram sockets.
+    """
+
+    def __init__(self, directory: str = INVALIDATION_SOCKET_DIR):
+        self.directory = directory
+        self.path: Optional[str] = None
+        self._caches: Dict[str, TTLCache] = {}
+        self._receiver: Optional[socket.socket] = None
+        self._sender: Optional[socket.socket] = None
+        self.sent = 0
+        self.received = 0
+        self.dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory)
+
+    def register(self, name: str, cache: TTLCache) -> None:
+        """
+        Let other workers invalidate entries of `cache` as `name`.
+        """
+        self._caches[name] = cache
+
+    def _peers(self) -> List[str]:
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        return [
+            os.path.join(self.directory, name) for name in names
+            if name.endswith(_SUFFIX) and os.path.join(self.directory, name) != self.path
+        ]
+
+    def publish(self, name: str, keys: Iterable[Hashable]) -> None:
+        """
+        Tell every other worker to drop `keys` from cache `name`.
+        """
+        if not self.enabled:
+            return
+        keys = list(keys)
+        if not keys:
+            return
+        if self._sender is None:
+            self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self._sender.setblocking(False)
+        messages = [
+            json.dumps({"cache": name, "keys": keys[i:i + KEYS_PER_MESSAGE]}).encode()
+            for i in range(0, len(keys), KEYS_PER_MESSAGE)
+        ]
+        for peer in self._peers():
+            for message in messages:
+                try:
+                    self._sender.sendto(message, peer)
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # The worker exited without removing its socket
+                    try:
+                        os.unlink(peer)
+                    except OSError:
+                        pass
+                    break
+                except OSError:
+                    # BlockingIOError when the peer's buffer is full
+                    self.dropped += 1
+                else:
+                    self.sent += 1
+
+    def invalidate(self, name: str, keys: Iterable[Hashable]) -> None:
+        """
+        Drop `keys` from cache `name` in this worker and all others.
+        """
+        keys = list(keys)
+        cache = self._caches.get(name)
+        if cache is not None:
+            for key in keys:
+                cache.invalidate(key)
+        self.publish(name, keys)
+
+    def _receive(self) -> None:
+        while True:
+            try:
+                data = self._receiver.recv(65536)
+            except OSError:
+                # BlockingIOError once every pending message is read
+                return
+            self.received += 1
+            try:
+                message = json.loads(data)
+                cache = self._caches.get(message["cache"])
+                keys = message["keys"]
+            except (ValueError, KeyError, TypeError):
+                continue
+            if cache is not None:
+                for key in keys:
+                    cache.invalidate(_decode_key(key))
+
+    async def start(self) -> None:
+        """
+        Bind this worker's socket and start applying invalidations from
+        other workers. Call it from the worker's event loop.
+        """
+        if not self.enabled or self._receiver is not None:
+            return
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        self.path = os.path.join(
+            self.directory, f"worker-{os.getpid()}-{next(_instances)}{_SUFFIX}"
+        )
+        self._receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._receiver.setblocking(False)
+        self._receiver.bind(self.path)
+        asyncio.get_running_loop().add_reader(self._receiver.fileno(), self._receive)
+
+    async def stop(self) -> None:
+        """
+        Stop receiving and remove this worker's socket.
+        """
+        if self._receiver is not None:
+            asyncio.get_running_loop().remove_reader(self._receiver.fileno())
+            self._receiver.close()
+            self._receiver = None
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+            self.path = None
+        if self._sender is not None:
+            self._sender.close()
+            self._sender = None
+
+
+invalidation_bus = InvalidationBus()
@@ -0,0 +1,219 @@
+# incentive-engine-api/api/utils/metrics.py
+
+"""
+In-process request and database metrics rendered in the Prometheus text format.
+
+Everything recorded on the request path is pre-allocated: each instrumented
+route owns its histograms and counters (created once, when the route is
+registered), and a request only carries a small slotted object in a context
+variable so the SQLAlchemy cursor hooks can attribute statements to it.
+"""
+
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fastapi.exceptions import RequestValidationError
+from fastapi.routing import APIRoute
+
+# Upper bounds (seconds) for request latency and time spent in the database
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Upper bounds for SQL statements issued by a single request
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram; `observe` is a bisect and two additions.
+    """
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        # One slot per bound plus +Inf; cumulated only when rendered
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name: str, labels: str) -> Iterable[str]:
+        sep = "," if labels else ""
+        cumulative = 0
+        for bound, n in zip(self.bounds, self.counts):
+            cumulative += n
+            yield f'{name}_bucket{{{labels}{sep}le="{bound}"}} {cumulative}'
+        yield f'{name}_bucket{{{labels}{sep}le="+Inf"}} {self.count}'
+        yield f"{name}_sum{{{labels}}} {self.sum}"
+        yield f"{name}_count{{{labels}}} {self.count}"
+
+
+class RequestRecord:
+    """
+    Per-request database accounting, filled in by the cursor hooks.
+    """
+
+    __slots__ = ("statements", "db_time")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_time = 0.0
+
+
+class RouteMetrics:
+    """
+    Latency, in-flight, response-class and database metrics for one route.
+    """
+
+    __slots__ = ("labels", "in_flight", "responses", "latency", "db_statements", "db_time")
+
+    def __init__(self, method: str, route: str):
+        self.labels = f'method="{method}",route="{route}"'
+        self.in_flight = 0
+        # Responses by status class: index 1 -> 1xx ... index 5 -> 5xx
+        self.responses = [0] * 6
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.db_statements = Histogram(STATEMENT_BUCKETS)
+        self.db_time = Histogram(LATENCY_BUCKETS)
+
+
+_current: ContextVar[Optional[RequestRecord]] = ContextVar("incentive_request", default=None)
+
+# Registered routes, keyed by (method, path template)
+ROUTES: Dict[Tuple[str, str], RouteMetrics] = {}
+
+# Totals across every statement, including ones issued outside a request
+# (ingestion workers, CLI commands): [statements, seconds]
+DB_TOTALS = [0, 0.0]
+
+
+def route_metrics(method: str, route: str) -> RouteMetrics:
+    """
+    Return the metrics for a route, creating them on first registration.
+    """
+    key = (method, route)
+    if key not in ROUTES:
+        ROUTES[key] = RouteMetrics(method, route)
+    return ROUTES[key]
+
+
+class InstrumentedRoute(APIRoute):
+    """
+    APIRoute that records latency, in-flight requests, response status and
+    per-request database usage. Use as `APIRouter(route_class=...)`.
+    """
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        method = ",".join(sorted(self.methods or ()))
+        metrics = route_metrics(method, self.path_format)
+
+        async def instrumented_handler(request):
+            record = RequestRecord()
+            token = _current.set(record)
+            metrics.in_flight += 1
+            started = time.perf_counter()
+            status_code = 500
+            try:
+                response = await handler(request)
+                status_code = response.status_code
+                return response
+            except RequestValidationError:
+                status_code = 422
+                raise
+            except Exception as exc:
+                status_code = getattr(exc, "status_code", 500)
+                raise
+            finally:
+                metrics.latency.observe(time.perf_counter() - started)
+                metrics.in_flight -= 1
+                metrics.responses[min(status_code // 100, 5)] += 1
+                metrics.db_statements.observe(record.statements)
+                metrics.db_time.observe(record.db_time)
+                _current.reset(token)
+
+        return instrumented_handler
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """
+    SQLAlchemy hook: stamp the statement's start time.
+    """
+    context._metrics_started = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """
+    SQLAlchemy hook: add the statement to the global and per-request totals.
+    """
+    elapsed = time.perf_counter() - context._metrics_started
+    DB_TOTALS[0] += 1
+    DB_TOTALS[1] += elapsed
+    record = _current.get()
+    if record is not None:
+        record.statements += 1
+        record.db_time += elapsed
+
+
+def render(samples: Iterable[Tuple[str, str, str, str, float]] = ()) -> str:
+    """
+    Render all metrics in the Prometheus text exposition format. `samples`
+    are extra (name, type, help, labels, value) values collected at scrape
+    time; samples of one metric must be adjacent.
+    """
+    routes = list(ROUTES.values())
+    lines: List[str] = []
+
+    def family(name, kind, help_text):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    family("incentive_http_request_duration_seconds", "histogram",
+           "Request latency by route.")
+    for m in routes:
+        lines.extend(m.latency.render("incentive_http_request_duration_seconds", m.labels))
+
+    family("incentive_http_requests_in_flight", "gauge",
+           "Requests currently being handled by route.")
+    lines.extend(f"incentive_http_requests_in_flight{{{m.labels}}} {m.in_flight}" for m in routes)
+
+    family("incentive_http_responses_total", "counter",
+           "Responses by route and status class.")
+    for m in routes:
+        for cls in range(1, 6):
+            if m.responses[cls]:
+                lines.append(
+                    f'incentive_http_responses_total{{{m.labels},code="{cls}xx"}} '
+                    f"{m.responses[cls]}"
+                )
+
+    family("incentive_db_statements_per_request", "histogram",
+           "SQL statements issued per request by route.")
+    for m in routes:
+        lines.extend(m.db_statements.render("incentive_db_statements_per_request", m.labels))
+
+    family("incentive_db_time_per_request_seconds", "histogram",
+           "Time spent executing SQL per request by route.")
+    for m in routes:
+        lines.extend(m.db_time.render("incentive_db_time_per_request_seconds", m.labels))
+
+    family("incentive_db_statements_total", "counter",
+           "SQL statements executed by this process.")
+    lines.append(f"incentive_db_statements_total {DB_TOTALS[0]}")
+    family("incentive_db_seconds_total", "counter",
+           "Time spent executing SQL by this process.")
+    lines.append(f"incentive_db_seconds_total {DB_TOTALS[1]}")
+
+    previous = None
+    for name, kind, help_text, labels, value in samples:
+        if name != previous:
+            previous = name
+            family(name, kind, help_text)
+        lines.append(f"{name}{{{labels}}} {value}" if labels else f"{name} {value}")
+
+    return "\n".join(lines) + "\n"
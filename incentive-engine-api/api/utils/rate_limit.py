@@ -0,0 +1,348 @@
+# incentive-engine-api/api/utils/rate_limit.py
+
+"""
+Per-developer rate limits and daily quotas for the reward endpoints.
+
+Every request is checked against an in-memory token bucket and daily
+counter for its developer, so the decision is O(1) and never waits on I/O.
+A request costs one token per reward it records, so a batch of 100 items
+uses as much of the limits as 100 single requests.
+With a shared counter backend configured, each worker also reports its
+usage to the backend at most once per RATE_LIMIT_SYNC_INTERVAL per
+developer and debits its local bucket by what the other workers consumed,
+so the limits hold across processes (overshooting by at most one sync
+interval's worth of traffic). Shared token counters are kept per refill
+window (the time an empty bucket takes to fill), so a worker that starts
+or creates a bucket late is only charged for other workers' recent usage.
+"""
+
+import math
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Callable, Dict, NamedTuple, Optional
+
+from fastapi import Header, HTTPException, status
+from sqlalchemy import case, delete
+
+from api.config import (
+    DAILY_REQUEST_QUOTA,
+    RATE_LIMIT_BACKEND,
+    RATE_LIMIT_BURST,
+    RATE_LIMIT_OVERRIDES,
+    RATE_LIMIT_PER_SECOND,
+    RATE_LIMIT_SYNC_INTERVAL,
+)
+from api.db.dialect import upsert
+from api.db.models import RateLimitCounter
+from api.utils.auth import resolve_developer_id
+
+DAY = 86400
+
+
+class CounterBackend(ABC):
+    """
+    Atomic counters visible to every worker, e.g. Redis INCRBY + EXPIRE.
+    """
+
+    @abstractmethod
+    async def incr(self, key: str, amount: int, expire: float) -> int:
+        """
+        Add `amount` to `key` and return the new total. A missing or expired
+        key starts at 0 and expires `expire` seconds after it is created.
+        """
+
+
+class LocalCounterBackend(CounterBackend):
+    """
+    In-process stand-in for a shared counter store. Limiters that share an
+    instance behave like workers sharing a real backend.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self._clock = clock
+        self._counters: Dict[str, list] = {}
+
+    async def incr(self, key: str, amount: int, expire: float) -> int:
+        now = self._clock()
+        entry = self._counters.get(key)
+        if entry is None or entry[1] <= now:
+            # Drop whatever else has expired while we are here
+            for stale in [k for k, (_, expires_at) in self._counters.items() if expires_at <= now]:
+                del self._counters[stale]
+            entry = self._counters[key] = [0, now + expire]
+        entry[0] += amount
+        return entry[0]
+
+
+class DatabaseCounterBackend(CounterBackend):
+    """
+    Counters in the main database's `rate_limit_counters` table, shared by
+    every worker connected to it. Each increment is one upsert; expired
+    counters are purged at most once per `purge_interval` seconds.
+    """
+
+    def __init__(self, session_factory: Optional[Callable] = None, purge_interval: float = 3600):
+        if session_factory is None:
+            from api.db.database import SessionLocal
+            session_factory = SessionLocal
+        self.session_factory = session_factory
+        self.purge_interval = purge_interval
+        self._next_purge = 0.0
+
+    async def incr(self, key: str, amount: int, expire: float) -> int:
+        now = datetime.utcnow()
+        async with self.session_factory() as session:
+            stmt = upsert(session, RateLimitCounter).values(
+                key=key, count=amount, expires_at=now + timedelta(seconds=expire)
+            )
+            expired = RateLimitCounter.expires_at <= now
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[RateLimitCounter.key],
+                set_={
+                    "count": case(
+                        (expired, stmt.excluded.count),
+                        else_=RateLimitCounter.count + stmt.excluded.count,
+                    ),
+                    "expires_at": case(
+                        (expired, stmt.excluded.expires_at),
+                        else_=RateLimitCounter.expires_at,
+                    ),
+                },
+            ).returning(RateLimitCounter.count)
+            total = (await session.execute(stmt)).scalar_one()
+            if time.monotonic() >= self._next_purge:
+                self._next_purge = time.monotonic() + self.purge_interval
+                await session.execute(
+                    delete(RateLimitCounter).where(RateLimitCounter.expires_at <= now)
+                )
+            await session.commit()
+        return total
+
+
+# Backends selectable with the RATE_LIMIT_BACKEND setting
+BACKENDS: Dict[str, Callable[[], CounterBackend]] = {
+    "local": LocalCounterBackend,
+    "database": DatabaseCounterBackend,
+}
+
+
+def get_counter_backend(name: str = RATE_LIMIT_BACKEND) -> Optional[CounterBackend]:
+    """
+    Instantiate the configured shared backend, or None for per-process limits.
+    """
+    if not name:
+        return None
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise RuntimeError(
+            f"Unknown RATE_LIMIT_BACKEND {name!r}; expected one of {sorted(BACKENDS)}"
+        )
+
+
+class Limits(NamedTuple):
+    """
+    Limits for one developer; 0 disables the corresponding check.
+    """
+    per_second: float = 0.0
+    burst: int = 0
+    daily_quota: int = 0
+
+
+class Rejection(NamedTuple):
+    """
+    Why a request was refused and how many seconds to wait before retrying.
+    """
+    reason: str  # "rate" or "quota"
+    retry_after: float
+
+
+class _Bucket:
+    """
+    Limiter state for one developer.
+    """
+
+    __slots__ = (
+        "limits", "tokens", "updated", "day", "used_today", "pending",
+        "seen_window", "seen_total", "next_sync",
+    )
+
+    def __init__(self, limits: Limits, now: float, day: int):
+        self.limits = limits
+        self.tokens = float(limits.burst)
+        self.updated = now
+        self.day = day
+        self.used_today = 0
+        # Tokens admitted since the last sync with the shared backend
+        self.pending = 0
+        # Backend's consumed-token count for refill window `seen_window` as
+        # of the last sync
+        self.seen_window: Optional[int] = None
+        self.seen_total = 0
+        self.next_sync = now
+
+
+class RateLimiter:
+    """
+    Token buckets and daily quotas keyed by developer account id.
+    """
+
+    def __init__(
+        self,
+        per_second: float = 0.0,
+        burst: int = 0,
+        daily_quota: int = 0,
+        overrides: Optional[Dict] = None,
+        backend: Optional[CounterBackend] = None,
+        sync_interval: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+        wall_clock: Callable[[], float] = time.time,
+    ):
+        self.default = self._limits(per_second, burst, daily_quota)
+        self.overrides = {
+            int(developer_id): self._limits(
+                limits.get("per_second", per_second),
+                # An override that only changes the rate gets a matching burst
+                limits.get("burst", burst if "per_second" not in limits else 0),
+                limits.get("daily_quota", daily_quota),
+            )
+            for developer_id, limits in (overrides or {}).items()
+        }
+        self.enabled = any(self.default) or any(any(l) for l in self.overrides.values())
+        self.backend = backend
+        self.sync_interval = sync_interval
+        self._clock = clock
+        self._wall_clock = wall_clock
+        self._buckets: Dict[int, _Bucket] = {}
+        # Refused requests by reason, exported on /metrics
+        self.rejected = {"rate": 0, "quota": 0}
+
+    @staticmethod
+    def _limits(per_second: float, burst: int, daily_quota: int) -> Limits:
+        # Without an explicit burst, allow one second's worth of requests
+        if per_second and not burst:
+            burst = max(1, math.ceil(per_second))
+        return Limits(float(per_second), int(burst), int(daily_quota))
+
+    def limits_for(self, developer_id: int) -> Limits:
+        return self.overrides.get(developer_id, self.default)
+
+    def check(self, developer_id: int, cost: int = 1) -> Optional[Rejection]:
+        """
+        Admit a request costing `cost` tokens for `developer_id`, or return
+        why it is refused. Only touches in-memory state.
+        """
+        now = self._clock()
+        wall = self._wall_clock()
+        day = int(wall // DAY)
+        bucket = self._buckets.get(developer_id)
+        if bucket is None:
+            bucket = self._buckets[developer_id] = _Bucket(self.limits_for(developer_id), now, day)
+        if bucket.day != day:
+            bucket.day = day
+            bucket.used_today = 0
+
+        limits = bucket.limits
+        if limits.per_second:
+            bucket.tokens = min(
+                limits.burst, bucket.tokens + (now - bucket.updated) * limits.per_second
+            )
+            bucket.updated = now
+            # A request larger than the burst needs a full bucket and leaves
+            # it in debt, so the average rate still holds
+            needed = min(cost, limits.burst)
+            if bucket.tokens < needed:
+                self.rejected["rate"] += 1
+                return Rejection("rate", (needed - bucket.tokens) / limits.per_second)
+        if limits.daily_quota and bucket.used_today + cost > limits.daily_quota:
+            self.rejected["quota"] += 1
+            return Rejection("quota", DAY - wall % DAY)
+
+        bucket.tokens -= cost
+        bucket.used_today += cost
+        bucket.pending += cost
+        return None
+
+    async def acquire(self, developer_id: int, cost: int = 1) -> Optional[Rejection]:
+        """
+        `check`, then reconcile with the shared backend if a sync is due.
+        """
+        rejection = self.check(developer_id, cost)
+        if self.backend is not None:
+            bucket = self._buckets[developer_id]
+            if self._clock() >= bucket.next_sync:
+                await self._sync(developer_id, bucket)
+        return rejection
+
+    async def _sync(self, developer_id: int, bucket: _Bucket) -> None:
+        """
+        Report this worker's usage since the last sync and take on what the
+        other workers used in the meantime.
+        """
+        pending, bucket.pending = bucket.pending, 0
+        bucket.next_sync = self._clock() + self.sync_interval
+        limits = bucket.limits
+
+        if limits.per_second:
+            # Tokens used before the current refill window have been refilled
+            # since, so only this window's counter matters
+            refill = max(1.0, limits.burst / limits.per_second)
+            window = int(self._wall_clock() // refill)
+            total = await self.backend.incr(
+                f"ratelimit:{developer_id}:tokens:{window}", pending, 2 * refill
+            )
+            seen = bucket.seen_total if bucket.seen_window == window else 0
+            # A counter that expired and restarted tells us nothing about others
+            others = total - seen - pending
+            if others > 0:
+                bucket.tokens -= others
+            bucket.seen_window, bucket.seen_total = window, total
+
+        if limits.daily_quota:
+            day = bucket.day
+            used = await self.backend.incr(f"ratelimit:{developer_id}:day:{day}", pending, 2 * DAY)
+            if bucket.day == day:
+                # Requests admitted while we were waiting are not in `used` yet
+                bucket.used_today = used + bucket.pending
+
+
+rate_limiter = RateLimiter(
+    per_second=RATE_LIMIT_PER_SECOND,
+    burst=RATE_LIMIT_BURST,
+    daily_quota=DAILY_REQUEST_QUOTA,
+    overrides=RATE_LIMIT_OVERRIDES,
+    backend=get_counter_backend(),
+    sync_interval=RATE_LIMIT_SYNC_INTERVAL,
+)
+
+
+async def charge(x_api_key: str, cost: int = 1) -> None:
+    """
+    Debit `cost` tokens from the caller's rate limit and daily quota.
+    Refused requests get 429 with a Retry-After header. Unknown keys are
+    left for the route's auth dependency to reject.
+    """
+    if not rate_limiter.enabled:
+        return
+    developer_id = await resolve_developer_id(x_api_key)
+    if developer_id is None:
+        return
+    rejection = await rate_limiter.acquire(developer_id, cost)
+    if rejection is not None:
+        detail = (
+            "Rate limit exceeded" if rejection.reason == "rate"
+            else "Daily request quota exhausted"
+        )
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=detail,
+            headers={"Retry-After": str(max(1, math.ceil(rejection.retry_after)))},
+        )
+
+
+async def rate_limit(x_api_key: str = Header(..., alias="X-API-KEY")) -> None:
+    """
+    FastAPI dependency charging one token for the request.
+    """
+    await charge(x_api_key)
@@ -0,0 +1,382 @@
+# incentive-engine-api/benchmarks/bench_api.py
+
+"""
+Load benchmark for the Incentive Engine API.
+
+Drives POST /reward, GET /accounts/{id}/balance and POST /accounts/{id}/withdraw
+at a fixed concurrency and reports throughput, p50/p95/p99 latency and SQL
+statements per request. Two targets are supported:
+
+  inprocess  the FastAPI `app` called through httpx's ASGI transport
+  uvicorn    a local `uvicorn api.main:app` subprocess over real sockets
+
+and two databases:
+
+  sqlite     a fresh database file in a temporary directory
+  postgres   BENCH_POSTGRES_URL if set (a throwaway database: its tables are
+             dropped), otherwise a temporary cluster started with initdb/pg_ctl
+             when those binaries are on PATH; skipped when neither is available
+
+Each scenario runs in its own subprocess because the API reads DATABASE_URL at
+import time. Results are compared with benchmarks/baselines.json; a scenario
+regresses when throughput drops or p99 latency grows by more than the
+tolerance, or when it issues more SQL statements per request than recorded.
+
+Usage:
+    python benchmarks/bench_api.py [--target all] [--db all]
+        [--requests 500] [--concurrency 20] [--profile bench] [--tolerance 0.25]
+        [--update-baselines]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINES = os.path.join(ROOT, "benchmarks", "baselines.json")
+ENDPOINTS = ("reward", "balance", "withdraw")
+MASTER_KEY = "bench-master-key"
+DEVELOPER_KEY = "bench-developer-key"
+
+
+# --------------------------------------------------------------------------
+# Worker: runs one (target, database) scenario and writes its results
+# --------------------------------------------------------------------------
+
+def percentile(ordered, pct):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def summarize(latencies, elapsed, statements, errors):
+    ordered = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(ordered, 0.50) * 1e3, 3),
+        "p95_ms": round(percentile(ordered, 0.95) * 1e3, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1e3, 3),
+        "sql_per_request": (
+            None if statements is None else round(statements / len(latencies), 2)
+        ),
+    }
+
+
+async def drive(client, make_request, total, concurrency):
+    """
+    Issue `total` requests from `concurrency` workers; return latencies,
+    wall time and the number of non-2xx responses.
+    """
+    latencies = []
+    errors = 0
+    issued = 0
+
+    async def worker():
+        nonlocal issued, errors
+        while issued < total:
+            n = issued
+            issued += 1
+            method, path, body, headers = make_request(n)
+            start = time.perf_counter()
+            response = await client.request(method, path, json=body, headers=headers)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 300:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, time.perf_counter() - started, errors
+
+
+def request_makers(account_id):
+    def reward(n):
+        key = uuid.uuid4().hex
+        body = {"event": "bench_event", "user_id": f"user_{n % 1000}", "amount": 1.0}
+        return "POST", "/reward/", body, {"X-API-KEY": DEVELOPER_KEY, "Idempotency-Key": key}
+
+    def balance(n):
+        return "GET", f"/accounts/{account_id}/balance", None, None
+
+    def withdraw(n):
+        body = {"user_address": "0x" + "0" * 40, "amount": 0.01}
+        return "POST", f"/accounts/{account_id}/withdraw", body, {"X-API-KEY": DEVELOPER_KEY}
+
+    return {"reward": reward, "balance": balance, "withdraw": withdraw}
+
+
+async def prepare_database():
+    """
+    Recreate the schema with the migrations and seed one developer account.
+    """
+    from api.db import migrations
+    from api.db.database import engine, migrate_db, SessionLocal
+    from api.db.models import Base, DeveloperAccount
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(migrations.version_metadata.drop_all)
+    await migrate_db()
+    async with SessionLocal() as session:
+        dev = DeveloperAccount(api_key=DEVELOPER_KEY, wallet_id="bench_wallet")
+        session.add(dev)
+        await session.commit()
+        return dev.id
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def uvicorn_server():
+    port = free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app",
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT,
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            if proc.poll() is not None:
+                raise RuntimeError("uvicorn exited during startup")
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError("uvicorn did not start within 30s")
+                time.sleep(0.1)
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        proc.terminate()
+        proc.wait(10)
+
+
+async def run_worker(args):
+    import httpx
+    from sqlalchemy import event
+
+    from api.db.database import engine, init_db
+
+    account_id = await prepare_database()
+    limits = httpx.Limits(
+        max_connections=args.concurrency, max_keepalive_connections=args.concurrency
+    )
+
+    statements = [0]
+    if args.target == "inprocess":
+        from api.main import app
+
+        def count(*_):
+            statements[0] += 1
+
+        # The ASGI transport does not run lifespan events
+        await init_db()
+        event.listen(engine.sync_engine, "before_cursor_execute", count)
+        # Unhandled errors become 500s, as they would behind uvicorn
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        client_cm = httpx.AsyncClient(
+            transport=transport, base_url="http://bench", limits=limits
+        )
+        server_cm = None
+    else:
+        # Statements run in the server process and cannot be counted here
+        statements = None
+        await engine.dispose()
+        server_cm = uvicorn_server()
+        client_cm = httpx.AsyncClient(base_url=server_cm.__enter__(), limits=limits)
+
+    results = {}
+    try:
+        async with client_cm as client:
+            makers = request_makers(account_id)
+            # Warm-up: prime caches and connections, and fund the withdrawals
+            for name in ENDPOINTS:
+                await drive(client, makers[name], min(args.requests, 50), args.concurrency)
+            for name in ENDPOINTS:
+                before = statements[0] if statements else None
+                latencies, elapsed, errors = await drive(
+                    client, makers[name], args.requests, args.concurrency
+                )
+                executed = None if statements is None else statements[0] - before
+                results[name] = summarize(latencies, elapsed, executed, errors)
+    finally:
+        if server_cm is not None:
+            server_cm.__exit__(None, None, None)
+
+    with open(args.output, "w") as fh:
+        json.dump(results, fh)
+
+
+# --------------------------------------------------------------------------
+# Orchestrator: database setup, scenarios, baseline comparison
+# --------------------------------------------------------------------------
+
+@contextmanager
+def sqlite_database():
+    with tempfile.TemporaryDirectory() as tmp:
+        yield f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}"
+
+
+@contextmanager
+def postgres_database():
+    url = os.getenv("BENCH_POSTGRES_URL")
+    if url:
+        yield url
+        return
+    if not (shutil.which("initdb") and shutil.which("pg_ctl")):
+        yield None
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        data = os.path.join(tmp, "data")
+        port = free_port()
+        subprocess.run(
+            ["initdb", "-D", data, "-U", "postgres", "-A", "trust", "--no-sync"],
+            check=True, stdout=subprocess.DEVNULL,
+        )
+        subprocess.run(
+            ["pg_ctl", "-D", data, "-l", os.path.join(tmp, "pg.log"), "-w",
+             "-o", f"-p {port} -k {tmp} -c listen_addresses=''", "start"],
+            check=True, stdout=subprocess.DEVNULL,
+        )
+        try:
+            yield f"postgresql+asyncpg://postgres@/postgres?host={tmp}&port={port}"
+        finally:
+            subprocess.run(
+                ["pg_ctl", "-D", data, "-m", "fast", "stop"],
+                stdout=subprocess.DEVNULL,
+            )
+
+
+DATABASES = {"sqlite": sqlite_database, "postgres": postgres_database}
+
+
+def run_scenario(target, url, args):
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as out:
+        output = out.name
+    env = dict(
+        os.environ, DATABASE_URL=url, INCENTIVE_API_KEY=MASTER_KEY, DB_PROFILE=args.profile
+    )
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [ROOT, env.get("PYTHONPATH")]))
+    try:
+        subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker",
+             "--target", target, "--requests", str(args.requests),
+             "--concurrency", str(args.concurrency), "--output", output],
+            cwd=ROOT, env=env, check=True,
+            # SQL echo logging goes to stdout; keep the report readable
+            stdout=subprocess.DEVNULL,
+        )
+        with open(output) as fh:
+            return json.load(fh)
+    finally:
+        os.unlink(output)
+
+
+def compare(key, result, baseline, tolerance):
+    """
+    Return a list of regression messages for one scenario.
+    """
+    problems = []
+    if result["errors"]:
+        problems.append(f"{result['errors']} non-2xx responses")
+    if baseline is None:
+        return problems
+    if result["throughput"] < baseline["throughput"] * (1 - tolerance):
+        problems.append(
+            f"throughput {result['throughput']}/s < baseline {baseline['throughput']}/s"
+        )
+    if result["p99_ms"] > baseline["p99_ms"] * (1 + tolerance):
+        problems.append(f"p99 {result['p99_ms']}ms > baseline {baseline['p99_ms']}ms")
+    sql, base_sql = result["sql_per_request"], baseline.get("sql_per_request")
+    if sql is not None and base_sql is not None and sql > base_sql + 0.01:
+        problems.append(f"{sql} SQL statements/request > baseline {base_sql}")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--target", choices=("inprocess", "uvicorn", "all"), default="all")
+    parser.add_argument("--db", choices=("sqlite", "postgres", "all"), default="all")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--profile", choices=("dev", "prod", "bench"), default="bench",
+                        help="DB_PROFILE used by the API under test")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed relative throughput/p99 change before failing")
+    parser.add_argument("--update-baselines", action="store_true",
+                        help="Record this run's results as the new baselines")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        asyncio.run(run_worker(args))
+        return 0
+
+    targets = ("inprocess", "uvicorn") if args.target == "all" else (args.target,)
+    databases = ("sqlite", "postgres") if args.db == "all" else (args.db,)
+    try:
+        with open(BASELINES) as fh:
+            baselines = json.load(fh)
+    except FileNotFoundError:
+        baselines = {}
+
+    regressions = 0
+    print(f"{'scenario':<40} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'sql/req':>8}")
+    for db in databases:
+        with DATABASES[db]() as url:
+            if url is None:
+                print(f"{db}: skipped (set BENCH_POSTGRES_URL or install PostgreSQL)")
+                continue
+            for target in targets:
+                if target == "uvicorn" and shutil.which("uvicorn") is None:
+                    try:
+                        import uvicorn  # noqa: F401
+                    except ImportError:
+                        print(f"{target}/{db}: skipped (uvicorn is not installed)")
+                        continue
+                results = run_scenario(target, url, args)
+                for name in ENDPOINTS:
+                    key = f"{target}/{db}/{name}@c{args.concurrency}"
+                    r = results[name]
+                    sql = "-" if r["sql_per_request"] is None else f"{r['sql_per_request']:.2f}"
+                    print(
+                        f"{key:<40} {r['throughput']:>8.1f} {r['p50_ms']:>6.2f}ms "
+                        f"{r['p95_ms']:>6.2f}ms {r['p99_ms']:>6.2f}ms {sql:>8}"
+                    )
+                    problems = compare(key, r, baselines.get(key), args.tolerance)
+                    for problem in problems:
+                        print(f"  REGRESSION: {problem}")
+                    regressions += bool(problems)
+                    if args.update_baselines:
+                        baselines[key] = {
+                            "throughput": r["throughput"],
+                            "p99_ms": r["p99_ms"],
+                            "sql_per_request": r["sql_per_request"],
+                        }
+
+    if args.update_baselines:
+        with open(BASELINES, "w") as fh:
+            json.dump(dict(sorted(baselines.items())), fh, indent=2)
+            fh.write("\n")
+        print(f"baselines written to {os.path.relpath(BASELINES, ROOT)}")
+        return 0
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,204 @@
+# incentive-engine-api/benchmarks/bench_metadata.py
+
+"""
+Storage and query benchmark for event metadata on a large events table.
+
+Builds a SQLite database holding --rows events for one developer, each
+with a reward and a few hundred bytes of metadata including a `campaign`
+key: one of --campaigns common values, or a rare one on every 1000th
+event. It fills it two ways:
+
+  promoted  the current schema: metadata compressed in `metadata_blob`,
+            with `campaign` promoted to `event_attributes`
+  json      a copy of the events with metadata as plain JSON text, the way
+            it was stored before promotion existed
+
+It then reports the metadata's size on disk, plus the time to read a page
+of events for a common and for the rare campaign and to total rewards per
+campaign. The promoted variant uses the service functions the API calls.
+The json variant uses json_extract, which has to read every row.
+
+Usage:
+    python benchmarks/bench_metadata.py [--rows 2000000] [--campaigns 50] [--repeat 5]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("INCENTIVE_API_KEY", "bench-master-key")
+
+T0 = datetime(2024, 1, 1)
+BATCH = 20000
+PAGE = 100
+COMMON = "campaign-7"
+RARE = "campaign-rare"
+
+
+def make_metadata(rng, n, campaigns):
+    return {
+        "campaign": RARE if n % 1000 == 0 else f"campaign-{rng.randrange(campaigns)}",
+        "source": rng.choice(("ios", "android", "web")),
+        "session": f"{rng.getrandbits(64):016x}",
+        "items": [
+            {"sku": f"sku-{rng.randrange(1000)}", "qty": rng.randrange(1, 5), "price": 9.99}
+            for _ in range(4)
+        ],
+        "note": "purchase completed via checkout flow v2",
+        "seq": n,
+    }
+
+
+def populate(path, rows, campaigns):
+    """
+    Create both variants with raw sqlite3 executemany, which is much faster
+    than going through the API for millions of rows.
+    """
+    from sqlalchemy import create_engine
+
+    from api.db import migrations
+    from api.db.types import pack_json
+
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        migrations.upgrade(conn)
+    engine.dispose()
+
+    rng = random.Random(42)
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=OFF")
+    db.execute("INSERT INTO developer_accounts (id, api_key, wallet_id) VALUES (1, 'bench', 'w')")
+    db.execute("INSERT INTO promoted_metadata_keys (developer_account_id, key) VALUES (1, 'campaign')")
+    db.execute(
+        "CREATE TABLE events_json (id INTEGER PRIMARY KEY, developer_account_id INTEGER, "
+        "event_name VARCHAR, user_id VARCHAR, metadata JSON, timestamp DATETIME)"
+    )
+    for start in range(0, rows, BATCH):
+        events, rewards, attributes, legacy = [], [], [], []
+        for n in range(start + 1, min(start + BATCH, rows) + 1):
+            metadata = make_metadata(rng, n, campaigns)
+            ts = (T0 + timedelta(seconds=n)).isoformat(" ")
+            events.append((n, f"user{n % 5000}", pack_json(metadata), ts))
+            rewards.append((n, 1.0, ts))
+            attributes.append((n, metadata["campaign"], ts))
+            legacy.append((n, f"user{n % 5000}", json.dumps(metadata), ts))
+        db.executemany(
+            "INSERT INTO events (id, developer_account_id, event_name, user_id, metadata_blob, "
+            "timestamp) VALUES (?, 1, 'purchase', ?, ?, ?)", events,
+        )
+        db.executemany(
+            "INSERT INTO rewards (event_id, developer_account_id, amount, status, timestamp) "
+            "VALUES (?, 1, ?, 'paid', ?)", rewards,
+        )
+        db.executemany(
+            "INSERT INTO event_attributes (event_id, developer_account_id, key, value, timestamp) "
+            "VALUES (?, 1, 'campaign', ?, ?)", attributes,
+        )
+        db.executemany(
+            "INSERT INTO events_json (id, developer_account_id, event_name, user_id, metadata, "
+            "timestamp) VALUES (?, 1, 'purchase', ?, ?, ?)", legacy,
+        )
+        db.commit()
+    db.execute("CREATE INDEX ix_events_json_developer_timestamp ON events_json (developer_account_id, timestamp)")
+    db.execute("ANALYZE")
+    db.commit()
+    return db
+
+
+def best_of(repeat, fn):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+async def promoted_timings(path, repeat):
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from api.services.history_service import list_events
+    from api.services.metadata_service import metadata_breakdown
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    results = {}
+    async with factory() as session:
+        for name, run in (
+            ("page, common value", lambda: list_events(
+                session, 1, PAGE, attributes={"campaign": COMMON})),
+            ("page, rare value", lambda: list_events(
+                session, 1, PAGE, attributes={"campaign": RARE})),
+            ("rewards per campaign", lambda: metadata_breakdown(session, 1, "campaign")),
+        ):
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                await run()
+                timings.append(time.perf_counter() - started)
+            results[name] = min(timings)
+    await engine.dispose()
+    return results
+
+
+def json_timings(db, repeat):
+    page = (
+        "SELECT id, metadata FROM events_json WHERE developer_account_id = 1 "
+        "AND json_extract(metadata, '$.campaign') = ? ORDER BY timestamp, id LIMIT ?"
+    )
+    per_campaign = (
+        "SELECT json_extract(e.metadata, '$.campaign') AS c, count(*), sum(r.amount) "
+        "FROM events_json e JOIN rewards r ON r.event_id = e.id "
+        "WHERE e.developer_account_id = 1 GROUP BY c"
+    )
+    return {
+        "page, common value": best_of(
+            repeat, lambda: db.execute(page, (COMMON, PAGE)).fetchall())[0],
+        "page, rare value": best_of(
+            repeat, lambda: db.execute(page, (RARE, PAGE)).fetchall())[0],
+        "rewards per campaign": best_of(repeat, lambda: db.execute(per_campaign).fetchall())[0],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=2_000_000, help="Events to create")
+    parser.add_argument("--campaigns", type=int, default=50, help="Distinct campaign values")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per query (best is reported)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "metadata.db")
+        started = time.perf_counter()
+        db = populate(path, args.rows, args.campaigns)
+        print(f"populated {args.rows} events in {time.perf_counter() - started:.1f}s")
+
+        blob, = db.execute("SELECT sum(length(metadata_blob)) FROM events").fetchone()
+        text, = db.execute("SELECT sum(length(CAST(metadata AS BLOB))) FROM events_json").fetchone()
+        print(f"metadata size: {text / 2**20:.1f} MiB as JSON, {blob / 2**20:.1f} MiB compressed "
+              f"({blob / text:.0%})")
+
+        promoted = asyncio.run(promoted_timings(path, args.repeat))
+        legacy = json_timings(db, args.repeat)
+        db.close()
+
+    print(f"\n{'query':<22}{'json_extract':>14}{'promoted':>12}{'speedup':>10}")
+    for name in promoted:
+        print(f"{name:<22}{legacy[name] * 1000:>12.1f}ms{promoted[name] * 1000:>10.1f}ms"
+              f"{legacy[name] / promoted[name]:>9.0f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,218 @@
+# incentive-engine-api/benchmarks/bench_startup.py
+
+"""
+Cold-start benchmark for the API and the SDK.
+
+Every measurement runs in a fresh interpreter, so module imports are paid
+in full each time; the median of --runs is reported. Measured:
+
+  api/import                 `import api.main`
+  api/first_request/check    import, lifespan startup and one GET /health/
+                             through httpx's ASGI transport, with the
+                             schema check running (SCHEMA_CHECK_CACHE_TTL=0)
+  api/first_request/stamp    the same, starting within the schema-check
+                             cache window as restarted workers do
+  uvicorn/first_request      from spawning `uvicorn api.main:app` until it
+                             answers GET /health/ (skipped without uvicorn)
+  sdk/import                 `import incentive`
+  sdk/import_client          `from incentive import IncentiveClient`
+
+The database is a migrated SQLite file in a temporary directory. Results
+are compared with the "startup/..." entries of benchmarks/baselines.json; a
+measurement regresses when it is slower than its baseline by more than the
+tolerance plus --slack-ms, which keeps sub-millisecond timings from
+failing on noise.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 7] [--tolerance 0.25]
+        [--slack-ms 5] [--update-baselines]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SDK_ROOT = os.path.join(os.path.dirname(ROOT), "incentive-engine-sdk")
+BASELINES = os.path.join(ROOT, "benchmarks", "baselines.json")
+MASTER_KEY = "bench-master-key"
+
+# Each script prints its elapsed milliseconds as JSON
+API_IMPORT = """
+import json, time
+started = time.perf_counter()
+import api.main
+print(json.dumps((time.perf_counter() - started) * 1000))
+"""
+
+API_FIRST_REQUEST = """
+import asyncio, json, time
+import httpx  # the client's import is not the server's startup cost
+started = time.perf_counter()
+from api.main import app
+
+async def first_request():
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            (await client.get("/health/")).raise_for_status()
+        return (time.perf_counter() - started) * 1000
+
+print(json.dumps(asyncio.run(first_request())))
+"""
+
+SDK_IMPORT = """
+import json, time
+started = time.perf_counter()
+import incentive
+print(json.dumps((time.perf_counter() - started) * 1000))
+"""
+
+SDK_IMPORT_CLIENT = """
+import json, time
+started = time.perf_counter()
+from incentive import IncentiveClient
+print(json.dumps((time.perf_counter() - started) * 1000))
+"""
+
+
+def run_script(script, env, cwd):
+    out = subprocess.run(
+        [sys.executable, "-c", script], cwd=cwd, env=env, check=True,
+        capture_output=True, text=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def uvicorn_first_request(env):
+    """
+    Milliseconds from spawning uvicorn until GET /health/ succeeds.
+    """
+    sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+    from bench_api import free_port
+
+    port = free_port()
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app",
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL,
+    )
+    try:
+        while True:
+            if proc.poll() is not None:
+                raise RuntimeError("uvicorn exited during startup")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health/", timeout=1):
+                    return (time.perf_counter() - started) * 1000
+            except OSError:
+                if time.perf_counter() - started > 30:
+                    raise RuntimeError("uvicorn did not answer within 30s")
+                time.sleep(0.005)
+    finally:
+        proc.terminate()
+        proc.wait(10)
+
+
+def prepare_database(tmp):
+    """
+    Migrated SQLite file for the API under test. Returns its async URL.
+    """
+    os.environ.setdefault("INCENTIVE_API_KEY", MASTER_KEY)
+    sys.path.insert(0, ROOT)
+    from sqlalchemy import create_engine
+
+    from api.db import migrations
+
+    path = os.path.join(tmp, "startup.db")
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        migrations.upgrade(conn)
+    engine.dispose()
+    return f"sqlite+aiosqlite:///{path}"
+
+
+def measure(runs, tmp):
+    url = prepare_database(tmp)
+    api_env = dict(
+        os.environ, DATABASE_URL=url, INCENTIVE_API_KEY=MASTER_KEY,
+        SCHEMA_CHECK_CACHE_DIR=os.path.join(tmp, "stamps"),
+    )
+    api_env["PYTHONPATH"] = os.pathsep.join(filter(None, [ROOT, api_env.get("PYTHONPATH")]))
+    sdk_env = dict(os.environ)
+    sdk_env["PYTHONPATH"] = os.pathsep.join(filter(None, [SDK_ROOT, sdk_env.get("PYTHONPATH")]))
+
+    scenarios = {
+        "api/import": lambda: run_script(API_IMPORT, api_env, ROOT),
+        "api/first_request/check": lambda: run_script(
+            API_FIRST_REQUEST, dict(api_env, SCHEMA_CHECK_CACHE_TTL="0"), ROOT),
+        # The first run writes the stamp; the median comes from later ones
+        "api/first_request/stamp": lambda: run_script(API_FIRST_REQUEST, api_env, ROOT),
+        "sdk/import": lambda: run_script(SDK_IMPORT, sdk_env, SDK_ROOT),
+        "sdk/import_client": lambda: run_script(SDK_IMPORT_CLIENT, sdk_env, SDK_ROOT),
+    }
+    try:
+        import uvicorn  # noqa: F401
+    except ImportError:
+        print("uvicorn/first_request: skipped (uvicorn is not installed)")
+    else:
+        scenarios["uvicorn/first_request"] = lambda: uvicorn_first_request(api_env)
+
+    results = {}
+    for name, run in scenarios.items():
+        # One untimed run warms the OS file cache
+        run()
+        results[name] = round(statistics.median(run() for _ in range(runs)), 1)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=7, help="Timed runs per measurement")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed relative slowdown before failing")
+    parser.add_argument("--slack-ms", type=float, default=5.0,
+                        help="Allowed absolute slowdown on top of the tolerance")
+    parser.add_argument("--update-baselines", action="store_true",
+                        help="Record this run's results as the new baselines")
+    args = parser.parse_args(argv)
+
+    try:
+        with open(BASELINES) as fh:
+            baselines = json.load(fh)
+    except FileNotFoundError:
+        baselines = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = measure(args.runs, tmp)
+
+    regressions = 0
+    print(f"{'measurement':<36} {'median':>10} {'baseline':>10}")
+    for name, ms in results.items():
+        key = f"startup/{name}"
+        baseline = baselines.get(key, {}).get("ms")
+        shown = "-" if baseline is None else f"{baseline:.1f}ms"
+        print(f"{key:<36} {ms:>8.1f}ms {shown:>10}")
+        if baseline is not None and ms > baseline * (1 + args.tolerance) + args.slack_ms:
+            print(f"  REGRESSION: {ms}ms > baseline {baseline}ms")
+            regressions += 1
+        if args.update_baselines:
+            baselines[key] = {"ms": ms}
+
+    if args.update_baselines:
+        with open(BASELINES, "w") as fh:
+            json.dump(dict(sorted(baselines.items())), fh, indent=2)
+            fh.write("\n")
+        print(f"baselines written to {os.path.relpath(BASELINES, ROOT)}")
+        return 0
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
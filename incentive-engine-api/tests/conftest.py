@@ -0,0 +1,124 @@
+# incentive-engine-api/tests/conftest.py
+
+import os
+import tempfile
+
+# api.config refuses to import without a master key; give the test run one
+os.environ.setdefault("INCENTIVE_API_KEY", "testkey")
+
+# Optionally run the concurrency tests against PostgreSQL as well
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+# Point the app's own engine at a scratch database instead of ./dev.db
+_APP_DB_PATH = os.path.join(tempfile.mkdtemp(prefix="incentive-tests-"), "app.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{_APP_DB_PATH}")
+# ...and keep startup's schema-check stamps beside it
+os.environ.setdefault("SCHEMA_CHECK_CACHE_DIR", os.path.dirname(_APP_DB_PATH))
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import Session, sessionmaker
+
+from api.db import migrations
+from api.db.models import Base, DeveloperAccount
+from api.services.metadata_service import promoted_key_cache
+from api.services.reward_service import idempotency_cache, user_balance_cache
+from api.utils.auth import developer_key_cache
+
+
+@pytest.fixture(scope="session", autouse=True)
+def app_database():
+    """
+    Create the schema in the scratch database used by TestClient requests.
+    """
+    engine = create_engine(f"sqlite:///{_APP_DB_PATH}")
+    with engine.begin() as conn:
+        migrations.upgrade(conn)
+    engine.dispose()
+    yield
+
+
+@pytest.fixture
+def app_db_session(app_database):
+    """
+    Synchronous session on the scratch database behind TestClient requests,
+    for seeding rows that routes will read.
+    """
+    engine = create_engine(f"sqlite:///{_APP_DB_PATH}")
+    with Session(engine) as s:
+        yield s
+    engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def clear_key_cache():
+    """
+    Each test starts with empty in-process caches.
+    """
+    developer_key_cache.clear()
+    idempotency_cache.clear()
+    user_balance_cache.clear()
+    promoted_key_cache.clear()
+    yield
+
+
+@pytest_asyncio.fixture
+async def db_engine(tmp_path):
+    """
+    A throwaway file-backed SQLite engine, migrated to the latest schema.
+    """
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(migrations.upgrade)
+    yield engine
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def session_factory(db_engine):
+    """
+    Session factory bound to the test engine, configured like SessionLocal.
+    """
+    return sessionmaker(bind=db_engine, class_=AsyncSession, expire_on_commit=False)
+
+
+@pytest_asyncio.fixture
+async def session(session_factory):
+    """
+    A single AsyncSession on the test engine.
+    """
+    async with session_factory() as s:
+        yield s
+
+
+@pytest_asyncio.fixture
+async def developer(session):
+    """
+    A persisted DeveloperAccount to issue rewards against.
+    """
+    dev = DeveloperAccount(api_key="devkey", wallet_id="wallet_test")
+    session.add(dev)
+    await session.commit()
+    return dev
+
+
+@pytest_asyncio.fixture(params=["sqlite", "postgresql"])
+async def concurrent_factory(request, tmp_path):
+    """
+    Session factory with a pool large enough for many concurrent sessions,
+    on SQLite and (when TEST_POSTGRES_URL is set) PostgreSQL.
+    """
+    if request.param == "sqlite":
+        url = f"sqlite+aiosqlite:///{tmp_path / 'concurrent.db'}"
+    elif TEST_POSTGRES_URL:
+        url = TEST_POSTGRES_URL
+    else:
+        pytest.skip("TEST_POSTGRES_URL not set")
+    engine = create_async_engine(url, pool_size=20, max_overflow=0)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    yield sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    await engine.dispose()
@@ -5,6 +5,7 @@ from fastapi.testclient import TestClient
 
 import api.config
 from api.main import app
+from api.routes.accounts import own_account
 
 # Set a known master key for tests
 api.config.API_KEY = "masterkey"
@@ -57,6 +58,8 @@ def stub_account_service(monkeypatch):
         "api.services.account_service.withdraw",
         fake_withdraw,
     )
+    # Withdrawals need the account's own key; act as account 1's developer
+    monkeypatch.setitem(app.dependency_overrides, own_account, lambda account_id: account_id)
     yield
 
 def test_create_account_unauthorized():
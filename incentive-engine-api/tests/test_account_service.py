@@ -0,0 +1,251 @@
+# incentive-engine-api/tests/test_account_service.py
+
+import asyncio
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import select, update
+
+from api.db.models import DeveloperAccount, DeveloperBalance, UserBalance, UserWallet, Withdrawal
+from api.main import app
+from api.services import account_service
+from api.services.custody import CustodyProvider, FakeCustodyProvider
+from api.services.account_service import (
+    get_balance,
+    get_user_balances,
+    withdraw,
+    rebuild_developer_balances,
+    reconcile_withdrawals,
+)
+from api.services.reward_service import (
+    process_reward,
+    process_reward_batch,
+    user_balance_cache,
+)
+
+
+@pytest.mark.asyncio
+async def test_balance_tracks_rewards(session, developer):
+    """Single and batch rewards both feed the developer's running total."""
+    assert await get_balance(session, developer.id) == 0.0
+    await process_reward(session, "devkey", "e", "alice", 2.0, {})
+    await process_reward_batch(session, "devkey", [
+        {"event": "e", "user_id": "bob", "amount": 1.0},
+        {"event": "e", "user_id": "alice", "amount": 0.5},
+    ])
+    assert await get_balance(session, developer.id) == 3.5
+
+
+@pytest.mark.asyncio
+async def test_withdraw_debits_running_total(session, developer):
+    """Withdrawals reduce the balance and over-withdrawals are refused."""
+    await process_reward(session, "devkey", "e", "alice", 10.0, {})
+
+    tx_hash = await withdraw(session, developer.id, "0xabc", 4.0)
+    assert tx_hash.startswith("0x")
+    assert await get_balance(session, developer.id) == 6.0
+
+    with pytest.raises(HTTPException) as exc:
+        await withdraw(session, developer.id, "0xabc", 7.0)
+    assert exc.value.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_rebuild_corrects_drift(session, developer):
+    """Reconciliation recomputes totals from user balances net of withdrawals."""
+    await process_reward(session, "devkey", "e", "alice", 10.0, {})
+    await process_reward(session, "devkey", "e", "bob", 5.0, {})
+    await withdraw(session, developer.id, "0xabc", 3.0)
+
+    # Simulate drift between the ledger and user_balances
+    await session.execute(update(DeveloperBalance).values(balance=999.0))
+    await session.commit()
+
+    changed = await rebuild_developer_balances(session)
+    assert changed == {developer.id: (999.0, 12.0)}
+    assert await get_balance(session, developer.id) == 12.0
+    assert await rebuild_developer_balances(session) == {}
+
+
+@pytest.mark.asyncio
+async def test_withdrawals_are_recorded_in_the_ledger(session, developer, monkeypatch):
+    """Each withdrawal leaves a ledger row; failed transfers are refunded."""
+    monkeypatch.setattr(
+        account_service, "custody_provider", FakeCustodyProvider(fail_destinations={"0xbad"})
+    )
+    await process_reward(session, "devkey", "e", "alice", 10.0, {})
+
+    tx_hash = await withdraw(session, developer.id, "0xabc", 3.0)
+    with pytest.raises(HTTPException) as exc:
+        await withdraw(session, developer.id, "0xbad", 2.0)
+    assert exc.value.status_code == 502
+    assert await get_balance(session, developer.id) == 7.0
+
+    rows = (await session.execute(select(Withdrawal).order_by(Withdrawal.id))).scalars().all()
+    assert [(w.user_address, w.amount, w.status) for w in rows] == [
+        ("0xabc", 3.0, "submitted"),
+        ("0xbad", 2.0, "failed"),
+    ]
+    assert rows[0].tx_hash == tx_hash
+    assert await session.scalar(select(DeveloperBalance.withdrawn)) == 3.0
+
+
+@pytest.mark.asyncio
+async def test_unknown_withdrawal_outcomes_stay_pending_until_reconciled(session, developer, monkeypatch):
+    """A lost provider answer keeps the debit; reconciliation resolves it by reference."""
+    custodian = FakeCustodyProvider(fail_destinations={"0xbad"}, record=True)
+
+    class LostAnswerProvider(CustodyProvider):
+        async def submit_transfers(self, transfers):
+            await custodian.submit_transfers(transfers)
+            raise ConnectionError("connection reset")
+
+    monkeypatch.setattr(account_service, "custody_provider", LostAnswerProvider())
+    await process_reward(session, "devkey", "e", "alice", 10.0, {})
+    for address in ("0xabc", "0xbad"):
+        with pytest.raises(HTTPException) as exc:
+            await withdraw(session, developer.id, address, 2.0)
+        assert exc.value.status_code == 504
+    assert await get_balance(session, developer.id) == 6.0
+
+    # Too recent to reconcile, then resolved through the real custodian
+    monkeypatch.setattr(account_service, "custody_provider", custodian)
+    assert await reconcile_withdrawals(session) == {"submitted": 0, "failed": 0, "pending": 0}
+    counts = await reconcile_withdrawals(session, older_than=-1)
+    assert counts == {"submitted": 1, "failed": 1, "pending": 0}
+
+    rows = (await session.execute(select(Withdrawal).order_by(Withdrawal.id))).scalars().all()
+    assert [(w.status, w.tx_hash) for w in rows] == [
+        ("submitted", custodian.results[rows[0].reference].tx_hash),
+        ("failed", None),
+    ]
+    # Resubmitted under the original references, so nothing was sent twice
+    assert len(custodian.results) == 2
+    assert await get_balance(session, developer.id) == 8.0
+
+
+@pytest.mark.asyncio
+async def test_withdraw_unknown_account_is_404(session):
+    with pytest.raises(HTTPException) as exc:
+        await withdraw(session, 424242, "0xabc", 1.0)
+    assert exc.value.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_concurrent_withdrawals_never_overdraw(concurrent_factory):
+    """200 parallel withdrawals against a balance covering 50 of them."""
+    async with concurrent_factory() as s:
+        dev = DeveloperAccount(api_key="stress-key", wallet_id="wallet_stress")
+        s.add(dev)
+        await s.flush()
+        s.add(DeveloperBalance(developer_account_id=dev.id, balance=50.0, withdrawn=0.0))
+        await s.commit()
+        dev_id = dev.id
+
+    async def attempt(n):
+        async with concurrent_factory() as s:
+            try:
+                return await withdraw(s, dev_id, f"0x{n:040x}", 1.0)
+            except HTTPException as e:
+                return e.status_code
+
+    outcomes = await asyncio.gather(*(attempt(n) for n in range(200)))
+
+    succeeded = [o for o in outcomes if isinstance(o, str)]
+    assert len(succeeded) == 50
+    assert outcomes.count(400) == 150
+    async with concurrent_factory() as s:
+        row = await s.get(DeveloperBalance, dev_id)
+        ledger = (await s.execute(select(Withdrawal.status))).scalars().all()
+    assert (row.balance, row.withdrawn) == (0.0, 50.0)
+    assert ledger == ["submitted"] * 50
+
+
+@pytest.mark.asyncio
+async def test_user_balances_read_through_cache(session, developer):
+    """Credits update cached balances in place; misses are loaded once."""
+    await process_reward(session, "devkey", "e", "alice", 2.0, {})
+    assert user_balance_cache.get((developer.id, "alice")) == 2.0
+
+    await process_reward_batch(session, "devkey", [
+        {"event": "e", "user_id": "alice", "amount": 1.0},
+        {"event": "e", "user_id": "bob", "amount": 0.5},
+    ])
+    assert await get_user_balances(session, developer.id, ["alice", "bob", "carol"]) == {
+        "alice": 3.0, "bob": 0.5, "carol": 0.0,
+    }
+
+    # Served from memory: a change made behind the cache's back isn't seen
+    await session.execute(update(UserBalance).values(balance=99.0))
+    await session.commit()
+    assert await get_user_balances(session, developer.id, ["alice"]) == {"alice": 3.0}
+
+    user_balance_cache.clear()
+    assert await get_user_balances(session, developer.id, ["alice"]) == {"alice": 99.0}
+
+
+def test_user_balance_routes(app_db_session):
+    key = f"balances-{uuid.uuid4().hex}"
+    dev = DeveloperAccount(api_key=key, wallet_id=f"wallet-{key}")
+    app_db_session.add(dev)
+    app_db_session.flush()
+    app_db_session.add(UserBalance(developer_account_id=dev.id, user_id="alice", balance=4.5))
+    app_db_session.commit()
+
+    client = TestClient(app)
+    headers = {"X-API-KEY": key}
+    response = client.get(f"/accounts/{dev.id}/users/alice/balance", headers=headers)
+    assert response.json() == {"user_id": "alice", "balance": 4.5}
+
+    response = client.get(
+        f"/accounts/{dev.id}/users/balances?user_id=alice&user_id=bob", headers=headers
+    )
+    assert response.json() == {"balances": {"alice": 4.5, "bob": 0.0}}
+
+    assert client.get(f"/accounts/{dev.id}/users/balances", headers=headers).status_code == 422
+    assert client.get(
+        f"/accounts/{dev.id + 1}/users/alice/balance", headers=headers
+    ).status_code == 404
+
+
+def test_user_address_route(app_db_session):
+    key = f"address-{uuid.uuid4().hex}"
+    dev = DeveloperAccount(api_key=key, wallet_id=f"wallet-{key}")
+    app_db_session.add(dev)
+    app_db_session.commit()
+
+    client = TestClient(app)
+    headers = {"X-API-KEY": key}
+    for address in ("0xfirst", "0xsecond"):
+        response = client.put(
+            f"/accounts/{dev.id}/users/alice/address", json={"address": address}, headers=headers
+        )
+        assert response.json() == {"user_id": "alice", "address": address}
+    rows = app_db_session.execute(
+        select(UserWallet.address).where(UserWallet.developer_account_id == dev.id)
+    ).scalars().all()
+    assert rows == ["0xsecond"]
+
+    assert client.put(
+        f"/accounts/{dev.id + 1}/users/alice/address", json={"address": "0x"}, headers=headers
+    ).status_code == 404
+
+
+def test_withdraw_route_requires_the_accounts_own_key(app_db_session):
+    key = f"withdraw-{uuid.uuid4().hex}"
+    dev = DeveloperAccount(api_key=key, wallet_id=f"wallet-{key}")
+    app_db_session.add(dev)
+    app_db_session.commit()
+
+    client = TestClient(app)
+    body = {"user_address": "0xabc", "amount": 1.0}
+    assert client.post(f"/accounts/{dev.id}/withdraw", json=body).status_code == 422
+    assert client.post(
+        f"/accounts/{dev.id + 1}/withdraw", json=body, headers={"X-API-KEY": key}
+    ).status_code == 404
+    # Authorized, but nothing to withdraw yet
+    assert client.post(
+        f"/accounts/{dev.id}/withdraw", json=body, headers={"X-API-KEY": key}
+    ).status_code == 400
@@ -0,0 +1,102 @@
+# incentive-engine-api/tests/test_auth_cache.py
+
+import pytest
+from sqlalchemy import event
+
+from api.services.account_service import create_account
+from api.utils.auth import developer_key_cache, resolve_developer_id
+from api.utils.cache import TTLCache, MISSING
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_cache_expires_entries():
+    """Entries disappear once their TTL has elapsed."""
+    clock = FakeClock()
+    cache = TTLCache(maxsize=4, ttl=10, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", None, ttl=2)
+
+    clock.now = 5
+    assert cache.get("a") == 1
+    assert cache.get("b") is MISSING
+
+    clock.now = 11
+    assert cache.get("a") is MISSING
+    assert cache.stats()["expirations"] == 2
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    """A full cache evicts the entry that was used least recently."""
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 3 and stats["misses"] == 1
+
+
+def test_ttl_cache_add_keeps_live_entries():
+    """add() fills absent or expired keys but never replaces a live value."""
+    clock = FakeClock()
+    cache = TTLCache(maxsize=4, ttl=10, clock=clock)
+    assert cache.add("a", 1)
+    assert not cache.add("a", 2)
+    assert cache.get("a") == 1
+    clock.now = 11
+    assert cache.add("a", 3)
+    assert cache.get("a") == 3
+
+
+def _count_statements(engine):
+    counter = {"n": 0}
+
+    def before_execute(*args):
+        counter["n"] += 1
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_execute)
+    return counter
+
+
+@pytest.mark.asyncio
+async def test_resolve_developer_id_hits_db_once(db_engine, session, developer):
+    """Repeat lookups of a known key are served from the cache."""
+    counter = _count_statements(db_engine)
+    hits_before = developer_key_cache.stats()["hits"]
+    for _ in range(5):
+        assert await resolve_developer_id("devkey", session) == developer.id
+    assert counter["n"] == 1
+    assert developer_key_cache.stats()["hits"] - hits_before == 4
+
+
+@pytest.mark.asyncio
+async def test_unknown_keys_are_negatively_cached(db_engine, session, developer):
+    """Invalid keys are remembered so floods don't reach the database."""
+    counter = _count_statements(db_engine)
+    for _ in range(5):
+        assert await resolve_developer_id("bogus", session) is None
+    assert counter["n"] == 1
+
+
+@pytest.mark.asyncio
+async def test_create_account_invalidates_key(session, monkeypatch):
+    """A key cached as unknown resolves once an account is issued for it."""
+    monkeypatch.setattr(
+        "api.services.account_service.secrets.token_urlsafe",
+        lambda n: "issued-key",
+    )
+    assert await resolve_developer_id("issued-key", session) is None
+
+    dev = await create_account(session)
+    assert await resolve_developer_id("issued-key", session) == dev.id
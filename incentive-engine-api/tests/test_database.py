@@ -0,0 +1,83 @@
+# incentive-engine-api/tests/test_database.py
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from api.db import database
+from api.db.database import (
+    InstrumentedQueuePool,
+    create_engine_for,
+    engine_options,
+    pool_stats,
+)
+from api.main import app
+
+
+@pytest.mark.asyncio
+async def test_sqlite_connections_use_wal_and_profile_pragmas(tmp_path):
+    engine = create_engine_for(f"sqlite+aiosqlite:///{tmp_path / 'wal.db'}")
+    try:
+        async with engine.connect() as conn:
+            journal = (await conn.execute(text("PRAGMA journal_mode"))).scalar()
+            synchronous = (await conn.execute(text("PRAGMA synchronous"))).scalar()
+            busy = (await conn.execute(text("PRAGMA busy_timeout"))).scalar()
+        assert journal == "wal"
+        assert synchronous == 1  # NORMAL
+        assert busy > 0
+    finally:
+        await engine.dispose()
+
+
+def test_in_memory_sqlite_keeps_default_pool():
+    options = engine_options("sqlite+aiosqlite:///:memory:")
+    assert "poolclass" not in options
+    assert "pool_size" not in options
+    assert engine_options("sqlite+aiosqlite:///./x.db")["poolclass"] is InstrumentedQueuePool
+
+
+@pytest.mark.asyncio
+async def test_pool_stats_report_checkouts_and_usage(tmp_path):
+    engine = create_engine_for(f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}")
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            during = pool_stats(engine)
+        after = pool_stats(engine)
+    finally:
+        await engine.dispose()
+    assert during["checked_out"] == 1
+    assert after["checked_out"] == 0
+    assert after["checkouts"] >= 1
+    assert after["checkout_wait_max"] >= after["checkout_wait_avg"] >= 0
+
+
+def test_health_route_exposes_pool_stats():
+    client = TestClient(app)
+    response = client.get("/health/")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "ok"
+    assert "checked_out" in body["database"]
+
+
+def test_schema_check_stamp_is_keyed_on_database_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "SCHEMA_CHECK_CACHE_DIR", str(tmp_path / "stamps"))
+    path = tmp_path / "app.db"
+    url = f"sqlite+aiosqlite:///{path}"
+    # Nothing to vouch for until the file exists
+    assert database._schema_stamp([url]) is None
+    path.touch()
+    stamp = database._schema_stamp([url])
+    assert not database._stamp_is_fresh(stamp)
+    database._write_stamp(stamp)
+    assert database._stamp_is_fresh(stamp)
+
+    # A replaced database file is checked again
+    path.rename(tmp_path / "old.db")
+    path.touch()
+    assert database._schema_stamp([url]) != stamp
+    assert database._schema_stamp(["sqlite+aiosqlite:///:memory:"]) is None
+
+    monkeypatch.setattr(database, "SCHEMA_CHECK_CACHE_TTL", 0)
+    assert database._schema_stamp([url]) is None
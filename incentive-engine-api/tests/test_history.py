@@ -0,0 +1,126 @@
+# incentive-engine-api/tests/test_history.py
+
+import json
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from api.db.models import DeveloperAccount, Event, Reward
+from api.db.sharding import ShardRouter
+from api.main import app
+from api.services.history_service import export_events, list_events, list_rewards
+
+T0 = datetime(2024, 1, 1)
+
+
+async def seed(session, developer, count):
+    # Pairs of rows share a timestamp so the id tie-break is exercised
+    for n in range(count):
+        event = Event(
+            developer_account_id=developer.id,
+            event_name="signup" if n % 3 == 0 else "purchase",
+            user_id=f"user{n % 2}",
+            meta={"n": n},
+            timestamp=T0 + timedelta(minutes=n // 2),
+        )
+        session.add(event)
+        await session.flush()
+        session.add(Reward(
+            event_id=event.id, developer_account_id=developer.id,
+            amount=1.0 + n, timestamp=event.timestamp,
+        ))
+    await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_keyset_pages_cover_every_event_once(session, developer):
+    await seed(session, developer, 25)
+    seen, cursor = [], None
+    while True:
+        page = await list_events(session, developer.id, limit=4, cursor=cursor)
+        seen.extend(item.id for item in page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    assert len(seen) == 25
+    assert seen == sorted(seen)
+
+
+@pytest.mark.asyncio
+async def test_listings_filter_by_event_user_and_time(session, developer):
+    await seed(session, developer, 12)
+    page = await list_events(
+        session, developer.id, limit=100, event="signup", user_id="user0",
+        since=T0 + timedelta(minutes=1), until=T0 + timedelta(minutes=6),
+    )
+    # signup events are n = 0, 3, 6, 9; user0 keeps 0 and 6; time keeps 6
+    assert [item.metadata["n"] for item in page.items] == [6]
+
+    rewards = await list_rewards(session, developer.id, limit=100, user_id="user1")
+    assert {r.user_id for r in rewards.items} == {"user1"}
+    assert len(rewards.items) == 6
+    assert rewards.items[0].status == "pending"
+
+
+@pytest.mark.asyncio
+async def test_invalid_cursor_is_rejected(session, developer):
+    with pytest.raises(HTTPException) as exc:
+        await list_events(session, developer.id, limit=10, cursor="not-a-cursor")
+    assert exc.value.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_export_streams_ndjson_in_chunks(session_factory, session, developer):
+    await seed(session, developer, 7)
+    chunks = [c async for c in export_events(session_factory, developer.id, fetch_size=3)]
+    assert len(chunks) == 3
+    lines = b"".join(chunks).decode().splitlines()
+    assert [json.loads(line)["metadata"]["n"] for line in lines] == list(range(7))
+
+
+@pytest.mark.asyncio
+async def test_open_export_leaves_the_request_pool_free(db_engine, session, developer):
+    await seed(session, developer, 4)
+    # A single-connection pool, as in the prod SQLite profile
+    requests_engine = create_async_engine(db_engine.url, pool_size=1, max_overflow=0, pool_timeout=1)
+    factory = sessionmaker(bind=requests_engine, class_=AsyncSession, expire_on_commit=False)
+    router = ShardRouter({}, factory, default_url=str(db_engine.url), export_pool_size=1)
+    export_factory = await router.export_factory_for(developer.id)
+    try:
+        chunks = export_events(export_factory, developer.id, fetch_size=1)
+        # A client still downloading: the export holds its connection
+        first = await chunks.__anext__()
+        async with factory() as other:
+            assert await other.scalar(select(func.count()).select_from(Event)) == 4
+        rest = [chunk async for chunk in chunks]
+        assert len([first, *rest]) == 4
+    finally:
+        await requests_engine.dispose()
+        await export_factory.kw["bind"].dispose()
+
+
+def test_routes_require_the_accounts_own_key(app_db_session):
+    key = f"history-{uuid.uuid4().hex}"
+    dev = DeveloperAccount(api_key=key, wallet_id=f"wallet-{key}")
+    app_db_session.add(dev)
+    app_db_session.flush()
+    app_db_session.add(Event(developer_account_id=dev.id, event_name="e", user_id="u", meta={}))
+    app_db_session.commit()
+
+    client = TestClient(app)
+    response = client.get(f"/accounts/{dev.id}/events", headers={"X-API-KEY": key})
+    assert response.status_code == 200
+    assert [item["event"] for item in response.json()["items"]] == ["e"]
+
+    response = client.get(f"/accounts/{dev.id}/events/export", headers={"X-API-KEY": key})
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert json.loads(response.text.splitlines()[0])["user_id"] == "u"
+
+    assert client.get(f"/accounts/{dev.id + 1}/rewards", headers={"X-API-KEY": key}).status_code == 404
+    assert client.get(f"/accounts/{dev.id}/rewards", headers={"X-API-KEY": "nope"}).status_code == 401
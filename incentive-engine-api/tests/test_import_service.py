@@ -0,0 +1,190 @@
+# incentive-engine-api/tests/test_import_service.py
+
+import json
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select, update
+
+from api.db.models import DeveloperAccount, DeveloperBalance, Event, ImportJob, Reward, UserBalance
+from api.main import app
+from api.services.import_service import ImportRowError, import_rewards, parse_rows
+
+
+async def stream(data: bytes, size: int = 7):
+    # Small, odd-sized chunks split lines and quoted fields across reads
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def csv_body(count: int, start: int = 0) -> bytes:
+    # Pending rows, so balances are credited
+    lines = ["event,user_id,amount,metadata,timestamp,status"]
+    for n in range(start, start + count):
+        lines.append(
+            f'purchase,user{n % 3},{n + 1},"{{""n"": {n}}}",2023-01-01T00:{n % 60:02d}:00,pending'
+        )
+    return ("\n".join(lines) + "\n").encode()
+
+
+async def balances(session, developer):
+    users = dict((await session.execute(
+        select(UserBalance.user_id, UserBalance.balance)
+        .where(UserBalance.developer_account_id == developer.id)
+    )).all())
+    total = await session.scalar(
+        select(DeveloperBalance.balance)
+        .where(DeveloperBalance.developer_account_id == developer.id)
+    )
+    return users, total
+
+
+@pytest.mark.asyncio
+async def test_parse_csv_with_multiline_quoted_field():
+    body = b'event,user_id,amount,metadata\r\n"sign\nup",u1,2.5,"{""note"": ""a, b""}"\r\n'
+    rows = [r async for r in parse_rows(stream(body, 3), "csv")]
+    assert len(rows) == 1
+    assert rows[0].event == "sign\nup"
+    assert rows[0].metadata == {"note": "a, b"}
+    assert rows[0].amount == 2.5
+    assert rows[0].status == "paid"
+
+
+@pytest.mark.asyncio
+async def test_parse_reports_the_bad_line():
+    body = b'{"event": "a", "user_id": "u", "amount": 1}\n{"event": "a", "amount": 1}\n'
+    with pytest.raises(ImportRowError) as exc:
+        [r async for r in parse_rows(stream(body), "ndjson")]
+    assert exc.value.line == 2
+    assert "user_id" in str(exc.value)
+
+
+@pytest.mark.asyncio
+async def test_csv_import_writes_rows_and_credits_balances(session, developer):
+    result = await import_rewards(
+        session, developer.id, "history", stream(csv_body(10)), "csv", chunk_size=4
+    )
+    assert result.rows_committed == 10
+    assert result.rows_skipped == 0
+    assert result.status == "completed"
+
+    rewards = (await session.execute(
+        select(Reward.amount, Reward.status, Event.user_id, Event.meta)
+        .join(Event, Event.id == Reward.event_id)
+        .where(Reward.developer_account_id == developer.id)
+        .order_by(Reward.id)
+    )).all()
+    assert [r.amount for r in rewards] == [float(n + 1) for n in range(10)]
+    assert {r.status for r in rewards} == {"pending"}
+    assert [r.meta["n"] for r in rewards] == list(range(10))
+
+    users, total = await balances(session, developer)
+    assert users == {"user0": 22.0, "user1": 15.0, "user2": 18.0}
+    assert total == 55.0
+
+
+@pytest.mark.asyncio
+async def test_ndjson_import_keeps_explicit_status(session, developer):
+    body = "\n".join(json.dumps(r) for r in [
+        {"event": "signup", "user_id": "u1", "amount": 1, "status": "pending"},
+        {"event": "signup", "user_id": "u1", "amount": 2, "tx_hash": "0xabc"},
+    ]).encode()
+    result = await import_rewards(session, developer.id, "nd", stream(body), "ndjson")
+    assert result.rows_committed == 2
+    statuses = (await session.execute(
+        select(Reward.status, Reward.tx_hash).order_by(Reward.id)
+    )).all()
+    assert statuses == [("pending", None), ("paid", "0xabc")]
+
+
+@pytest.mark.asyncio
+async def test_only_pending_history_is_credited(session, developer):
+    body = "\n".join(json.dumps(r) for r in [
+        {"event": "e", "user_id": "u1", "amount": 1, "status": "pending"},
+        {"event": "e", "user_id": "u1", "amount": 2, "status": "paid"},
+        {"event": "e", "user_id": "u2", "amount": 4, "status": "failed"},
+        {"event": "e", "user_id": "u2", "amount": 8},
+    ]).encode()
+    await import_rewards(session, developer.id, "mixed", stream(body), "ndjson")
+    assert await session.scalar(select(func.count(Reward.id))) == 4
+    assert await balances(session, developer) == ({"u1": 1.0}, 1.0)
+
+
+@pytest.mark.asyncio
+async def test_failed_import_resumes_from_last_committed_chunk(session, developer):
+    good = csv_body(7)
+    broken = good + b"purchase,user0,not-a-number,,\n"
+    with pytest.raises(HTTPException) as exc:
+        await import_rewards(session, developer.id, "resume", stream(broken), "csv", chunk_size=3)
+    assert exc.value.status_code == 400
+    assert "line 9" in exc.value.detail
+
+    job = await session.scalar(select(ImportJob).where(ImportJob.name == "resume"))
+    assert (job.rows_committed, job.status) == (7, "failed")
+
+    # Resubmit the corrected file: the first 7 rows are skipped
+    fixed = good + csv_body(3, start=7).split(b"\n", 1)[1]
+    result = await import_rewards(session, developer.id, "resume", stream(fixed), "csv", chunk_size=3)
+    assert (result.rows_committed, result.rows_skipped, result.status) == (10, 7, "completed")
+
+    count = await session.scalar(select(func.count(Reward.id)))
+    assert count == 10
+    _, total = await balances(session, developer)
+    assert total == 55.0
+
+
+@pytest.mark.asyncio
+async def test_job_format_cannot_change(session, developer):
+    await import_rewards(session, developer.id, "fmt", stream(csv_body(1)), "csv")
+    with pytest.raises(HTTPException) as exc:
+        await import_rewards(session, developer.id, "fmt", stream(b""), "ndjson")
+    assert exc.value.status_code == 409
+
+
+@pytest.mark.asyncio
+async def test_running_job_is_claimed_once(session, developer):
+    first = stream(csv_body(6), size=4096)
+    # The first run stops mid-import, still holding the job
+    session.add(ImportJob(
+        developer_account_id=developer.id, name="dup", format="csv", status="running",
+    ))
+    await session.commit()
+    with pytest.raises(HTTPException) as exc:
+        await import_rewards(session, developer.id, "dup", first, "csv")
+    assert exc.value.status_code == 409
+    assert await session.scalar(select(func.count(Reward.id))) == 0
+
+    # Once the run stops committing for longer than the lease, a rerun takes over
+    await session.execute(
+        update(ImportJob).where(ImportJob.name == "dup")
+        .values(updated_at=datetime.utcnow() - timedelta(hours=1))
+    )
+    await session.commit()
+    result = await import_rewards(session, developer.id, "dup", first, "csv")
+    assert (result.rows_committed, result.status) == (6, "completed")
+
+
+def test_import_route_streams_the_body(app_db_session):
+    key = f"import-{uuid.uuid4().hex}"
+    dev = DeveloperAccount(api_key=key, wallet_id=f"wallet-{key}")
+    app_db_session.add(dev)
+    app_db_session.commit()
+
+    client = TestClient(app)
+    response = client.post(
+        f"/accounts/{dev.id}/import?format=csv&job=route",
+        content=csv_body(5),
+        headers={"X-API-KEY": key, "Content-Type": "text/csv"},
+    )
+    assert response.status_code == 200
+    assert response.json() == {
+        "job": "route", "rows_committed": 5, "rows_skipped": 0, "status": "completed",
+    }
+    response = client.post(
+        f"/accounts/{dev.id}/import?format=xml&job=route",
+        content=b"", headers={"X-API-KEY": key},
+    )
+    assert response.status_code == 422
@@ -0,0 +1,139 @@
+# incentive-engine-api/tests/test_ingest_service.py
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, select, func
+
+from api.db.models import Reward, UserBalance
+from api.main import app
+from api.models.reward import RewardRequest, RewardStatusResponse
+from api.routes.reward import api_key_auth
+from api.services.ingest_service import RewardIngestor, IngestQueueFull
+from api.utils.auth import developer_key_cache
+
+
+@pytest.mark.asyncio
+async def test_queued_rewards_commit_in_groups(db_engine, session_factory, session, developer):
+    """Queued rewards are committed by workers, many per transaction."""
+    commits = {"n": 0}
+
+    def on_commit(conn):
+        commits["n"] += 1
+
+    event.listen(db_engine.sync_engine, "commit", on_commit)
+
+    ingestor = RewardIngestor(session_factory, max_queue_size=500, workers=2, batch_size=50)
+    await ingestor.start()
+    tracking_ids = [
+        ingestor.submit(developer.id, RewardRequest(event="e", user_id=f"u{i % 5}", amount=1))
+        for i in range(200)
+    ]
+    await ingestor.drain()
+
+    statuses = [ingestor.status(t) for t in tracking_ids]
+    assert all(s["status"] == "committed" for s in statuses)
+    assert len({s["result"]["reward_id"] for s in statuses}) == 200
+    assert commits["n"] <= 200 // 50 + 2
+
+    assert await session.scalar(select(func.count(Reward.id))) == 200
+    assert await session.scalar(select(func.sum(UserBalance.balance))) == 200
+
+
+@pytest.mark.asyncio
+async def test_full_queue_applies_backpressure(session_factory, developer):
+    """Submitting beyond capacity fails fast instead of growing the queue."""
+    ingestor = RewardIngestor(session_factory, max_queue_size=2, workers=1)
+    await ingestor.start()
+    req = RewardRequest(event="e", user_id="u", amount=1)
+    # Workers can't run until we yield to the loop, so the queue fills up
+    ingestor.submit(developer.id, req)
+    ingestor.submit(developer.id, req)
+    with pytest.raises(IngestQueueFull):
+        ingestor.submit(developer.id, req)
+    await ingestor.drain()
+
+
+def test_async_mode_route_returns_202_and_status(monkeypatch):
+    """In async mode /reward answers 202 and the status endpoint tracks it."""
+    monkeypatch.setattr("api.routes.reward.REWARD_INGEST_MODE", "async")
+    monkeypatch.setitem(app.dependency_overrides, api_key_auth, lambda: "asynckey")
+    developer_key_cache.set("asynckey", 7)
+
+    class StubIngestor:
+        def submit(self, developer_id, req):
+            self.seen = (developer_id, req.event)
+            return "track-1"
+
+        def status(self, tracking_id):
+            if tracking_id == "track-1":
+                return {"developer_id": 7, "status": "queued"}
+            return None
+
+    stub = StubIngestor()
+    monkeypatch.setattr("api.routes.reward.reward_ingestor", stub)
+    client = TestClient(app)
+
+    response = client.post(
+        "/reward/", json={"event": "e", "user_id": "u", "amount": 1},
+        headers={"X-API-KEY": "asynckey"},
+    )
+    assert response.status_code == 202
+    assert response.json() == {"tracking_id": "track-1", "status": "queued"}
+    assert stub.seen == (7, "e")
+
+    status = client.get("/reward/status/track-1", headers={"X-API-KEY": "asynckey"})
+    assert status.status_code == 200 and status.json()["status"] == "queued"
+    missing = client.get("/reward/status/nope", headers={"X-API-KEY": "asynckey"})
+    assert missing.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_failing_group_falls_back_to_single_commits(session_factory, session, developer, monkeypatch):
+    """One request that can't be recorded fails alone; the rest of its group commits."""
+    from api.services import ingest_service
+
+    record_rewards = ingest_service.record_rewards
+    calls = []
+
+    async def flaky(session, developer_id, reqs):
+        calls.append(len(reqs))
+        if any(req.user_id == "bad" for req in reqs):
+            raise RuntimeError("cannot record")
+        return await record_rewards(session, developer_id, reqs)
+
+    monkeypatch.setattr(ingest_service, "record_rewards", flaky)
+    ingestor = RewardIngestor(session_factory, workers=1, batch_size=10, group_retries=1)
+    await ingestor.start()
+    tracking_ids = [
+        ingestor.submit(developer.id, RewardRequest(event="e", user_id=user, amount=1))
+        for user in ("a", "bad", "b")
+    ]
+    await ingestor.drain()
+
+    assert [ingestor.status(t)["status"] for t in tracking_ids] == ["committed", "failed", "committed"]
+    # Two attempts at the group, then one commit per request
+    assert calls == [3, 3, 1, 1, 1]
+    assert await session.scalar(select(func.count(Reward.id))) == 2
+
+
+@pytest.mark.asyncio
+async def test_reused_key_is_reported_failed(session_factory, session, developer):
+    """A key reused with another payload fails instead of reading as committed."""
+    ingestor = RewardIngestor(session_factory, workers=1)
+    await ingestor.start()
+    first = ingestor.submit(
+        developer.id, RewardRequest(event="e", user_id="u", amount=1, idempotency_key="k")
+    )
+    await ingestor.drain()
+    await ingestor.start()
+    reused = ingestor.submit(
+        developer.id, RewardRequest(event="e", user_id="u", amount=2, idempotency_key="k")
+    )
+    await ingestor.drain()
+
+    assert ingestor.status(first)["status"] == "committed"
+    entry = ingestor.status(reused)
+    assert entry["status"] == "failed" and entry["error"]
+    # The route can render it
+    RewardStatusResponse(tracking_id=reused, status=entry["status"], error=entry["error"])
+    assert await session.scalar(select(func.count(Reward.id))) == 1
@@ -0,0 +1,102 @@
+# incentive-engine-api/tests/test_invalidation.py
+
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+
+import pytest
+
+from api.services.reward_service import process_reward
+from api.utils.cache import MISSING, TTLCache
+from api.utils.invalidation import InvalidationBus, invalidation_bus
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# A second worker: caches alice's balance, waits for a line on stdin, then
+# reports whether the entry is still cached and what a fresh read returns
+WORKER = """
+import asyncio, sys
+from api.db.database import SessionLocal
+from api.services.account_service import get_user_balances
+from api.services.reward_service import user_balance_cache
+from api.utils.cache import MISSING
+from api.utils.invalidation import invalidation_bus
+
+async def main(developer_id):
+    await invalidation_bus.start()
+    async with SessionLocal() as session:
+        print((await get_user_balances(session, developer_id, ["alice"]))["alice"], flush=True)
+        await asyncio.get_running_loop().run_in_executor(None, sys.stdin.readline)
+        await asyncio.sleep(0.05)
+        print(user_balance_cache.get((developer_id, "alice")) is MISSING, flush=True)
+        print((await get_user_balances(session, developer_id, ["alice"]))["alice"], flush=True)
+    await invalidation_bus.stop()
+
+asyncio.run(main(int(sys.argv[1])))
+"""
+
+
+@pytest.mark.asyncio
+async def test_invalidations_reach_other_workers(tmp_path):
+    bus_dir = str(tmp_path / "bus")
+    a, b = InvalidationBus(bus_dir), InvalidationBus(bus_dir)
+    caches = {name: (TTLCache(10, 60), TTLCache(10, 60)) for name in ("api_key", "user_balance")}
+    for name, (cache_a, cache_b) in caches.items():
+        a.register(name, cache_a)
+        b.register(name, cache_b)
+    await a.start()
+    await b.start()
+    try:
+        # A worker that exited without cleaning up
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        stale.bind(os.path.join(bus_dir, "worker-0-0.sock"))
+        stale.close()
+
+        for cache in caches["api_key"]:
+            cache.set("new-key", None)
+        caches["user_balance"][1].set((1, "alice"), 5.0)
+        a.invalidate("api_key", ["new-key"])
+        a.publish("user_balance", [(1, "alice")])
+        await asyncio.sleep(0.05)
+
+        assert caches["api_key"][0].get("new-key") is MISSING
+        assert caches["api_key"][1].get("new-key") is MISSING
+        assert caches["user_balance"][1].get((1, "alice")) is MISSING
+        assert (a.sent, b.received) == (2, 2)
+        # The stale socket was removed
+        assert sorted(os.listdir(bus_dir)) == sorted(
+            os.path.basename(bus.path) for bus in (a, b)
+        )
+    finally:
+        await a.stop()
+        await b.stop()
+    assert os.listdir(bus_dir) == []
+
+
+@pytest.mark.asyncio
+async def test_user_balances_stay_coherent_across_workers(session, developer, tmp_path, monkeypatch):
+    bus_dir = str(tmp_path / "bus")
+    monkeypatch.setattr(invalidation_bus, "directory", bus_dir)
+    await process_reward(session, "devkey", "signup", "alice", 1.0, {})
+
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite+aiosqlite:///{tmp_path / 'test.db'}",
+        INVALIDATION_SOCKET_DIR=bus_dir,
+    )
+    worker = subprocess.Popen(
+        [sys.executable, "-c", WORKER, str(developer.id)], cwd=ROOT, env=env,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+    )
+    try:
+        assert worker.stdout.readline().strip() == "1.0"
+        # This worker credits alice; the other one must not keep serving 1.0
+        await process_reward(session, "devkey", "signup", "alice", 2.0, {})
+        out, _ = worker.communicate("go\n", timeout=30)
+    finally:
+        if worker.poll() is None:
+            worker.kill()
+    assert out.split() == ["True", "3.0"]
+    assert worker.returncode == 0
@@ -0,0 +1,97 @@
+# incentive-engine-api/tests/test_metadata.py
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, func, select, text
+
+from api.db import migrations
+from api.db.models import EventAttribute
+from api.db.types import pack_json, unpack_json
+from api.models.reward import RewardRequest
+from api.services.history_service import list_events, list_rewards
+from api.services.metadata_service import (
+    attribute_filters,
+    demote_key,
+    metadata_breakdown,
+    promote_key,
+)
+from api.services.reward_service import process_reward, record_rewards
+
+
+def test_large_metadata_is_compressed():
+    small = {"campaign": "spring"}
+    large = {"campaign": "spring", "note": "x" * 2000}
+    assert unpack_json(pack_json(small)) == small
+    assert unpack_json(pack_json(large)) == large
+    assert len(pack_json(large)) < 100
+    assert pack_json(None) is None
+
+
+@pytest.mark.asyncio
+async def test_promoted_key_filters_listings_and_aggregates(session, developer):
+    # Written before promotion: covered by the backfill
+    for n in range(4):
+        campaign = "spring" if n % 2 == 0 else "summer"
+        await process_reward(session, "devkey", "e", f"user{n}", 1.0 + n, {"campaign": campaign})
+    await process_reward(session, "devkey", "e", "nobody", 9.0, {"campaign": ["not", "scalar"]})
+
+    assert await promote_key(session, developer.id, "campaign", wait=0, chunk_size=2) == 4
+    # Promoting again finds nothing left to backfill
+    assert await promote_key(session, developer.id, "campaign", wait=0) == 0
+
+    # Written after promotion: attributes recorded with the event
+    await process_reward(session, "devkey", "e", "user4", 5.0, {"campaign": "spring", "tier": 2})
+    await record_rewards(session, developer.id, [
+        RewardRequest(event="e", user_id="user5", amount=6.0, metadata={"campaign": "spring"}),
+        RewardRequest(event="e", user_id="user6", amount=7.0, metadata={"campaign": "summer"}),
+    ])
+
+    seen, cursor = [], None
+    while True:
+        page = await list_events(
+            session, developer.id, limit=2, cursor=cursor, attributes={"campaign": "spring"}
+        )
+        seen.extend(item.user_id for item in page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    assert seen == ["user0", "user2", "user4", "user5"]
+    assert page.items[-1].metadata == {"campaign": "spring"}
+
+    rewards = await list_rewards(session, developer.id, limit=10, attributes={"campaign": "summer"})
+    assert [item.amount for item in rewards.items] == [2.0, 4.0, 7.0]
+
+    breakdown = await metadata_breakdown(session, developer.id, "campaign")
+    assert [(v.value, v.rewards, v.amount) for v in breakdown.values] == [
+        ("spring", 4, 15.0), ("summer", 3, 13.0),
+    ]
+
+    with pytest.raises(HTTPException) as exc:
+        await attribute_filters(session, developer.id, ["tier:2"])
+    assert exc.value.status_code == 400
+    with pytest.raises(HTTPException):
+        await attribute_filters(session, developer.id, ["campaign"])
+
+    assert await demote_key(session, developer.id, "campaign") == 7
+    assert await session.scalar(select(func.count()).select_from(EventAttribute)) == 0
+    with pytest.raises(HTTPException):
+        await metadata_breakdown(session, developer.id, "campaign")
+
+
+def test_migration_compresses_legacy_metadata(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        migrations.upgrade(conn, target=8)
+        # Databases from before version 9 have a JSON `metadata` column
+        conn.execute(text("ALTER TABLE events DROP COLUMN metadata_blob"))
+        conn.execute(text("ALTER TABLE events ADD COLUMN metadata JSON"))
+        conn.execute(text(
+            "INSERT INTO events (developer_account_id, event_name, user_id, metadata) VALUES "
+            "(1, 'e', 'u', '{\"campaign\": \"spring\"}'), (1, 'e', 'v', NULL)"
+        ))
+    with engine.begin() as conn:
+        migrations.upgrade(conn)
+        rows = conn.execute(text("SELECT metadata, metadata_blob FROM events ORDER BY id")).all()
+    engine.dispose()
+    assert [legacy for legacy, _ in rows] == [None, None]
+    assert [unpack_json(blob) for _, blob in rows] == [{"campaign": "spring"}, None]
@@ -0,0 +1,64 @@
+# incentive-engine-api/tests/test_metrics.py
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api.main import app
+from api.utils import metrics
+from api.utils.metrics import Histogram
+
+
+def sample(body: str, prefix: str) -> float:
+    """
+    Value of the first exposition line starting with `prefix`.
+    """
+    for line in body.splitlines():
+        if line.startswith(prefix):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{prefix!r} not found in /metrics output")
+
+
+def test_histogram_buckets_are_cumulative():
+    h = Histogram((0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        h.observe(value)
+    lines = list(h.render("x", 'route="/r"'))
+    assert lines[:3] == [
+        'x_bucket{route="/r",le="0.1"} 2',
+        'x_bucket{route="/r",le="1.0"} 3',
+        'x_bucket{route="/r",le="+Inf"} 4',
+    ]
+    assert lines[-1] == 'x_count{route="/r"} 4'
+
+
+def test_metrics_report_route_latency_and_db_statements():
+    client = TestClient(app)
+    labels = 'method="GET",route="/accounts/{account_id}/balance"'
+    before = client.get("/metrics").text
+    count_before = sample(before, f"incentive_http_request_duration_seconds_count{{{labels}}}")
+    statements_before = sample(before, f"incentive_db_statements_per_request_sum{{{labels}}}")
+
+    assert client.get("/accounts/987654/balance").status_code == 200
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert sample(body, f"incentive_http_request_duration_seconds_count{{{labels}}}") == count_before + 1
+    # The balance lookup is a single SELECT
+    assert sample(body, f"incentive_db_statements_per_request_sum{{{labels}}}") == statements_before + 1
+    assert sample(body, f"incentive_http_requests_in_flight{{{labels}}}") == 0
+    assert sample(body, f'incentive_http_responses_total{{{labels},code="2xx"}}') >= 1
+    assert "incentive_cache_hits_total{cache=\"api_key\"}" in body
+    assert "incentive_db_pool_checked_out" in body
+
+
+def test_error_responses_are_counted_by_status_class():
+    client = TestClient(app)
+    client.post("/reward/", json={"event": "e", "user_id": "u", "amount": 1},
+                headers={"X-API-KEY": "not-a-key"})
+    client.post("/reward/", json={"event": "e"}, headers={"X-API-KEY": "not-a-key"})
+    body = client.get("/metrics").text
+    assert sample(body, 'incentive_http_responses_total{method="POST",route="/reward/",code="4xx"}') >= 2
+    assert 'route="/reward/",code="5xx"' not in body
+
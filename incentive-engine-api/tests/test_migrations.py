@@ -0,0 +1,115 @@
+# incentive-engine-api/tests/test_migrations.py
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from api.db import migrations
+from api.db.types import unpack_json
+
+
+@pytest.fixture
+def sync_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrate.db'}")
+    yield engine
+    engine.dispose()
+
+
+def test_upgrade_fresh_database(sync_engine):
+    """All migrations apply to an empty database and are recorded once."""
+    with sync_engine.begin() as conn:
+        applied = migrations.upgrade(conn)
+        assert [m.version for m in applied] == [m.version for m in migrations.MIGRATIONS]
+        assert migrations.check_version(conn) == migrations.LATEST_VERSION
+    with sync_engine.begin() as conn:
+        assert migrations.upgrade(conn) == []
+
+
+def test_upgrade_adds_indexes_to_unversioned_database(sync_engine):
+    """Databases created by the old create_all startup gain the new indexes."""
+    with sync_engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE developer_accounts (id INTEGER PRIMARY KEY, "
+            "api_key VARCHAR NOT NULL UNIQUE, wallet_id VARCHAR NOT NULL UNIQUE, "
+            "created_at DATETIME)"
+        ))
+        conn.execute(text(
+            "CREATE TABLE events (id INTEGER PRIMARY KEY, developer_account_id INTEGER "
+            "NOT NULL, event_name VARCHAR NOT NULL, user_id VARCHAR NOT NULL, "
+            "metadata JSON, timestamp DATETIME)"
+        ))
+        assert migrations.current_version(conn) == 0
+        migrations.upgrade(conn)
+
+    indexes = {ix["name"] for ix in inspect(sync_engine).get_indexes("events")}
+    assert "ix_events_developer_timestamp" in indexes
+    assert inspect(sync_engine).has_table("idempotency_keys")
+
+
+def test_upgrade_compacts_legacy_metadata_in_chunks(sync_engine, monkeypatch):
+    """Legacy JSON metadata is moved into the blob column, chunk by chunk."""
+    monkeypatch.setattr(migrations, "METADATA_CHUNK_SIZE", 2)
+    with sync_engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE events (id INTEGER PRIMARY KEY, developer_account_id INTEGER "
+            "NOT NULL, event_name VARCHAR NOT NULL, user_id VARCHAR NOT NULL, "
+            "metadata JSON, timestamp DATETIME)"
+        ))
+        for n in range(1, 6):
+            conn.execute(text(
+                "INSERT INTO events (id, developer_account_id, event_name, user_id, metadata) "
+                "VALUES (:id, 1, 'e', 'u', :metadata)"
+            ), {"id": n, "metadata": None if n == 3 else f'{{"n": {n}}}'})
+        migrations.upgrade(conn)
+        rows = conn.execute(text(
+            "SELECT id, metadata, metadata_blob FROM events ORDER BY id"
+        )).all()
+    assert [(row_id, legacy, unpack_json(blob)) for row_id, legacy, blob in rows] == [
+        (1, None, {"n": 1}), (2, None, {"n": 2}), (3, None, None),
+        (4, None, {"n": 4}), (5, None, {"n": 5}),
+    ]
+
+
+def test_check_version_refuses_outdated_schema(sync_engine):
+    """Startup fails fast instead of running DDL when migrations are pending."""
+    with sync_engine.begin() as conn:
+        migrations.upgrade(conn, target=1)
+        with pytest.raises(migrations.SchemaVersionError):
+            migrations.check_version(conn)
+
+
+def test_upgrade_backfills_missing_developer_balances(sync_engine):
+    """Balances credited before running totals existed are not lost."""
+    with sync_engine.begin() as conn:
+        migrations.upgrade(conn, target=9)
+        conn.execute(text(
+            "INSERT INTO developer_accounts (id, api_key, wallet_id) VALUES "
+            "(1, 'a', 'wa'), (2, 'b', 'wb')"
+        ))
+        conn.execute(text(
+            "INSERT INTO user_balances (developer_account_id, user_id, balance) VALUES "
+            "(1, 'u1', 2.5), (1, 'u2', 1.5), (2, 'u1', 7.0)"
+        ))
+        # Developer 2 already has a running total, which must be kept
+        conn.execute(text(
+            "INSERT INTO developer_balances (developer_account_id, balance, withdrawn) "
+            "VALUES (2, 4.0, 3.0)"
+        ))
+        migrations.upgrade(conn)
+        rows = conn.execute(text(
+            "SELECT developer_account_id, balance, withdrawn FROM developer_balances "
+            "ORDER BY developer_account_id"
+        )).all()
+    assert [tuple(row) for row in rows] == [(1, 4.0, 0.0), (2, 4.0, 3.0)]
+
+
+def test_upgrade_keeps_legacy_withdrawal_references(sync_engine):
+    """Withdrawals sent before references were stored reconcile under the old ones."""
+    with sync_engine.begin() as conn:
+        migrations.upgrade(conn, target=15)
+        conn.execute(text(
+            "INSERT INTO withdrawals (id, developer_account_id, user_address, amount, status) "
+            "VALUES (7, 1, '0xabc', 1.0, 'pending')"
+        ))
+        migrations.upgrade(conn)
+        reference = conn.execute(text("SELECT reference FROM withdrawals")).scalar()
+    assert reference == "withdrawal-7"
@@ -0,0 +1,158 @@
+# incentive-engine-api/tests/test_payout_service.py
+
+import pytest
+from sqlalchemy import select
+
+from api.db.models import DeveloperAccount, DeveloperBalance, Reward, UserBalance
+from api.models.reward import RewardRequest
+from api.services.account_service import set_user_address
+from api.services.custody import CustodyProvider, FakeCustodyProvider
+from api.services.payout_service import claim_pending_rewards, run_payouts
+from api.services.reward_service import record_rewards
+
+
+async def issue(session, developer, *specs, addresses=True):
+    await record_rewards(session, developer.id, [
+        RewardRequest(event="e", user_id=user_id, amount=amount)
+        for user_id, amount in specs
+    ])
+    if addresses:
+        for user_id in {user_id for user_id, _ in specs}:
+            await set_user_address(session, developer.id, user_id, f"0x{user_id}")
+
+
+async def statuses(session):
+    rows = await session.execute(select(Reward.id, Reward.status, Reward.tx_hash).order_by(Reward.id))
+    return rows.all()
+
+
+@pytest.mark.asyncio
+async def test_pending_rewards_are_paid_one_transfer_per_user(session_factory, session, developer):
+    await issue(session, developer, ("u1", 1.0), ("u2", 2.0), ("u1", 3.0))
+    provider = FakeCustodyProvider(record=True)
+
+    summary = await run_payouts(session_factory, provider)
+
+    assert summary.claimed == 3 and summary.paid == 3 and summary.failed == 0
+    assert summary.transfers == 2
+    [batch] = provider.calls
+    assert {(t.destination, t.amount) for t in batch} == {("0xu1", 4.0), ("0xu2", 2.0)}
+    assert all(t.source_wallet_id == "wallet_test" for t in batch)
+
+    rows = await statuses(session)
+    assert {status for _, status, _ in rows} == {"paid"}
+    # Rewards settled by the same transfer share its transaction hash
+    assert rows[0].tx_hash == rows[2].tx_hash != rows[1].tx_hash
+
+
+@pytest.mark.asyncio
+async def test_transfers_are_split_into_provider_batches(session_factory, session, developer):
+    await issue(session, developer, *[(f"u{i}", 1.0) for i in range(7)])
+    provider = FakeCustodyProvider(max_batch_size=3, record=True)
+
+    summary = await run_payouts(session_factory, provider, claim_size=5, concurrency=2)
+
+    assert summary.paid == 7
+    # Claims of 5 then 2, each split into batches of at most 3
+    assert sorted(len(call) for call in provider.calls) == [2, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_rejected_and_errored_transfers_are_marked_failed(session_factory, session, developer):
+    class BrokenProvider(CustodyProvider):
+        async def submit_transfers(self, transfers):
+            raise ConnectionError("custodian unavailable")
+
+    await issue(session, developer, ("ok", 1.0), ("bad", 1.0))
+    summary = await run_payouts(session_factory, FakeCustodyProvider(fail_destinations={"0xbad"}))
+    assert (summary.paid, summary.failed) == (1, 1)
+
+    rows = await statuses(session)
+    assert [status for _, status, _ in rows] == ["paid", "failed"]
+    assert rows[1].tx_hash is None
+
+
+@pytest.mark.asyncio
+async def test_unknown_outcomes_are_resubmitted_under_the_same_reference(session_factory, session, developer):
+    custodian = FakeCustodyProvider(record=True)
+
+    class LostAnswerProvider(CustodyProvider):
+        # The custodian executes the transfers but the response never arrives
+        async def submit_transfers(self, transfers):
+            await custodian.submit_transfers(transfers)
+            raise ConnectionError("connection reset")
+
+    await issue(session, developer, ("u1", 1.0), ("u1", 2.0))
+    summary = await run_payouts(session_factory, LostAnswerProvider())
+    assert (summary.claimed, summary.paid, summary.failed, summary.unknown) == (2, 0, 0, 2)
+    assert [status for _, status, _ in await statuses(session)] == ["processing", "processing"]
+
+    # Not reclaimed while the claim is fresh
+    assert (await run_payouts(session_factory, custodian)).claimed == 0
+
+    summary = await run_payouts(session_factory, custodian, claim_timeout=0)
+    assert summary.paid == 2
+    first, retry = custodian.calls
+    assert retry == first
+    # The custodian matched the reference: one transfer, one transaction
+    [result] = custodian.results.values()
+    session.expire_all()
+    assert {(status, tx_hash) for _, status, tx_hash in await statuses(session)} == {
+        ("paid", result.tx_hash)
+    }
+
+
+@pytest.mark.asyncio
+async def test_claimed_rewards_are_not_claimed_again(session, developer):
+    await issue(session, developer, ("u1", 1.0), ("u2", 1.0))
+    first = await claim_pending_rewards(session, 10)
+    second = await claim_pending_rewards(session, 10)
+    assert len(first) == 2
+    assert second == []
+
+
+@pytest.mark.asyncio
+async def test_payouts_go_to_user_addresses_and_debit_balances(session_factory, session, developer):
+    developer_id = developer.id
+    await issue(session, developer, ("u1", 1.0), ("u1", 2.0), ("bad", 4.0))
+    await issue(session, developer, ("no-address", 8.0), addresses=False)
+
+    summary = await run_payouts(session_factory, FakeCustodyProvider(fail_destinations={"0xbad"}))
+
+    assert (summary.claimed, summary.paid, summary.failed) == (3, 2, 1)
+    # Users without an address keep their rewards pending
+    assert [status for _, status, _ in await statuses(session)] == [
+        "paid", "paid", "failed", "pending"
+    ]
+    session.expire_all()
+    balances = dict((await session.execute(select(UserBalance.user_id, UserBalance.balance))).all())
+    assert balances == {"u1": 0.0, "bad": 4.0, "no-address": 8.0}
+    assert await session.scalar(select(DeveloperBalance.balance)) == 12.0
+
+    await set_user_address(session, developer_id, "no-address", "0xlate")
+    assert (await run_payouts(session_factory, FakeCustodyProvider())).paid == 1
+
+
+@pytest.mark.asyncio
+async def test_payouts_never_overdraw_the_developer_balance(session_factory, session, developer):
+    developer_id = developer.id
+    await issue(session, developer, ("u1", 3.0), ("u2", 4.0))
+    # Funds the users were owed were already withdrawn down to 5.0
+    balance = await session.get(DeveloperBalance, developer_id)
+    balance.balance = 5.0
+    await session.commit()
+
+    summary = await run_payouts(session_factory, FakeCustodyProvider())
+    assert (summary.claimed, summary.paid, summary.held) == (2, 0, 2)
+    assert [status for _, status, _ in await statuses(session)] == ["pending", "pending"]
+    session.expire_all()
+    assert await session.scalar(select(DeveloperBalance.balance)) == 5.0
+
+    # Once the balance covers them, they are paid
+    balance = await session.get(DeveloperBalance, developer_id)
+    balance.balance = 7.0
+    await session.commit()
+    summary = await run_payouts(session_factory, FakeCustodyProvider())
+    assert summary.paid == 2
+    session.expire_all()
+    assert await session.scalar(select(DeveloperBalance.balance)) == 0.0
@@ -0,0 +1,198 @@
+# incentive-engine-api/tests/test_query_plans.py
+
+"""
+Guards against hot queries falling back to full table scans.
+
+Each scenario calls the service functions behind a hot path against a
+migrated database and records every statement they send. The EXPLAIN
+output of each statement must only use index or primary-key lookups, and
+every ON CONFLICT target must match a unique index, so upserts resolve
+conflicts with an index probe.
+"""
+
+import os
+import re
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from api.db import migrations
+from api.db.models import DeveloperAccount
+from api.models.reward import RewardRequest
+from api.services.account_service import (
+    get_balance,
+    get_deposit_address,
+    get_user_balances,
+)
+from api.services.history_service import list_events, list_rewards
+from api.services.metadata_service import metadata_breakdown, promote_key, promoted_key_cache
+from api.services.payout_service import claim_pending_rewards, reclaim_stale_rewards
+from api.services.reward_service import (
+    idempotency_cache,
+    process_reward,
+    purge_idempotency_keys,
+    record_rewards,
+    user_balance_cache,
+)
+from api.services.rollup_service import get_stats
+from api.utils.auth import developer_key_cache, resolve_developer_id
+
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+SINCE = datetime.utcnow() - timedelta(days=1)
+
+
+async def _history_pages(session, dev):
+    # A second page exercises the keyset cursor
+    page = await list_events(session, dev, limit=1, user_id="alice", since=SINCE)
+    await list_events(session, dev, limit=1, cursor=page.next_cursor, user_id="alice")
+    page = await list_rewards(session, dev, limit=1)
+    await list_rewards(session, dev, limit=1, cursor=page.next_cursor)
+
+
+async def _attribute_pages(session, dev):
+    page = await list_events(session, dev, limit=1, attributes={"campaign": "spring"})
+    await list_events(
+        session, dev, limit=1, cursor=page.next_cursor, attributes={"campaign": "spring"}
+    )
+
+
+# Hot path -> coroutine(session, developer_id) issuing its queries
+HOT_PATHS = {
+    "resolve_developer_id": lambda s, dev: resolve_developer_id("devkey", s),
+    "process_reward": lambda s, dev: process_reward(
+        s, "devkey", "e", "alice", 1.0, {"campaign": "spring"}, idempotency_key="new"
+    ),
+    "process_reward_replay": lambda s, dev: process_reward(
+        s, "devkey", "e", "alice", 1.0, {"campaign": "spring"}, idempotency_key="seed-0"
+    ),
+    "record_rewards": lambda s, dev: record_rewards(s, dev, [
+        RewardRequest(event="e", user_id=user, amount=1, idempotency_key=f"batch-{user}")
+        for user in ("alice", "bob", "carol")
+    ]),
+    "get_user_balances": lambda s, dev: get_user_balances(s, dev, ["alice", "bob"]),
+    "get_balance": lambda s, dev: get_balance(s, dev),
+    "get_deposit_address": lambda s, dev: get_deposit_address(s, dev),
+    "history_pages": _history_pages,
+    "attribute_pages": _attribute_pages,
+    "get_stats": lambda s, dev: get_stats(s, dev, "day", SINCE, datetime.utcnow()),
+    "metadata_breakdown": lambda s, dev: metadata_breakdown(s, dev, "campaign"),
+    "claim_pending_rewards": lambda s, dev: claim_pending_rewards(s, 100),
+    "reclaim_stale_rewards": lambda s, dev: reclaim_stale_rewards(s, 100, timeout=0),
+    "purge_idempotency_keys": lambda s, dev: purge_idempotency_keys(
+        s, datetime.utcnow() - timedelta(days=1)
+    ),
+}
+
+
+@pytest_asyncio.fixture(params=["sqlite", "postgresql"])
+async def migrated_engine(request, tmp_path):
+    if request.param == "sqlite":
+        url = f"sqlite+aiosqlite:///{tmp_path / 'plans.db'}"
+    elif TEST_POSTGRES_URL:
+        url = TEST_POSTGRES_URL
+    else:
+        pytest.skip("TEST_POSTGRES_URL not set")
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(migrations.upgrade)
+    yield engine
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def seeded_session(migrated_engine):
+    """
+    A session on the migrated database with a developer, a promoted key
+    and a few keyed rewards. Yields (session, developer id).
+    """
+    factory = sessionmaker(bind=migrated_engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as session:
+        dev = DeveloperAccount(api_key="devkey", wallet_id="wallet_plans")
+        session.add(dev)
+        await session.commit()
+        await promote_key(session, dev.id, "campaign", wait=0)
+        for i in range(3):
+            await process_reward(
+                session, "devkey", "e", "alice", 1.0, {"campaign": "spring"},
+                idempotency_key=f"seed-{i}",
+            )
+        yield session, dev.id
+
+
+def _statements(engine, captured):
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        if re.match(r"\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\b", statement, re.I):
+            if executemany and isinstance(parameters, list):
+                # EXPLAIN one row's parameters of an executemany()
+                parameters = parameters[0]
+            captured.append((statement, parameters))
+    event.listen(engine.sync_engine, "before_cursor_execute", before_execute)
+    return before_execute
+
+
+async def explain(conn, statement, parameters):
+    if conn.dialect.name == "sqlite":
+        rows = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        return [row[-1] for row in rows]
+    # Small test tables make seq scans look cheap; ask the planner for its
+    # best non-sequential plan and fail if none exists.
+    await conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+    rows = await conn.exec_driver_sql(f"EXPLAIN {statement}", parameters)
+    return [row[0] for row in rows]
+
+
+def _unique_keys(sync_conn, table):
+    inspector = inspect(sync_conn)
+    keys = [tuple(inspector.get_pk_constraint(table)["constrained_columns"])]
+    keys += [tuple(i["column_names"]) for i in inspector.get_indexes(table) if i["unique"]]
+    keys += [tuple(c["column_names"]) for c in inspector.get_unique_constraints(table)]
+    return {frozenset(key) for key in keys}
+
+
+FULL_SCAN = {
+    "sqlite": re.compile(r"^SCAN (?!\d* ?CONSTANT ROW)"),
+    "postgresql": re.compile(r"Seq Scan"),
+}
+
+CONFLICT_TARGET = re.compile(
+    r'INSERT INTO "?(\w+)"?.*ON CONFLICT \(([^)]*)\)', re.I | re.S
+)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("name", sorted(HOT_PATHS))
+async def test_hot_path_uses_indexes(migrated_engine, seeded_session, name):
+    session, developer_id = seeded_session
+    # Cold caches and identity map, so the path reaches the database
+    for cache in (developer_key_cache, idempotency_cache, user_balance_cache, promoted_key_cache):
+        cache.clear()
+    session.expunge_all()
+    captured = []
+    listener = _statements(migrated_engine, captured)
+    try:
+        await HOT_PATHS[name](session, developer_id)
+    finally:
+        event.remove(migrated_engine.sync_engine, "before_cursor_execute", listener)
+    assert captured, f"{name} issued no statements"
+
+    pattern = FULL_SCAN[migrated_engine.dialect.name]
+    async with migrated_engine.begin() as conn:
+        for statement, parameters in captured:
+            plan = await explain(conn, statement, parameters)
+            scans = [line for line in plan if pattern.search(line)]
+            assert not scans, (
+                f"{name} falls back to a full scan:\n{statement}\n" + "\n".join(plan)
+            )
+            upsert = CONFLICT_TARGET.search(statement)
+            if upsert:
+                table, target = upsert.groups()
+                columns = frozenset(c.strip().strip('"') for c in target.split(","))
+                unique = await conn.run_sync(_unique_keys, table)
+                assert columns in unique, (
+                    f"{name}: ON CONFLICT ({target}) on {table} matches no unique index"
+                )
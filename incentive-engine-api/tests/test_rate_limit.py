@@ -0,0 +1,169 @@
+# incentive-engine-api/tests/test_rate_limit.py
+
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api.db.models import DeveloperAccount
+from api.main import app
+from api.utils import rate_limit
+from api.utils.rate_limit import DAY, DatabaseCounterBackend, LocalCounterBackend, RateLimiter
+
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_limiter(clock, **kwargs):
+    return RateLimiter(clock=clock, wall_clock=lambda: 10 * DAY + clock.now, **kwargs)
+
+
+def test_token_bucket_allows_burst_then_refills():
+    clock = FakeClock()
+    limiter = make_limiter(clock, per_second=2, burst=3)
+    assert [limiter.check(1) for _ in range(3)] == [None] * 3
+    rejection = limiter.check(1)
+    assert rejection.reason == "rate"
+    assert rejection.retry_after == pytest.approx(0.5)
+    # Buckets are per developer
+    assert limiter.check(2) is None
+
+    clock.now += 0.5
+    assert limiter.check(1) is None
+    assert limiter.check(1) is not None
+    assert limiter.rejected["rate"] == 2
+
+
+def test_daily_quota_resets_at_midnight():
+    clock = FakeClock()
+    limiter = make_limiter(clock, daily_quota=2)
+    assert limiter.check(1) is None and limiter.check(1) is None
+    rejection = limiter.check(1)
+    assert rejection.reason == "quota"
+    assert rejection.retry_after == pytest.approx(DAY)
+
+    clock.now += DAY
+    assert limiter.check(1) is None
+
+
+def test_requests_are_charged_their_cost():
+    clock = FakeClock()
+    limiter = make_limiter(clock, per_second=10, burst=10, daily_quota=25)
+    assert limiter.check(1, cost=4) is None
+    assert limiter.check(1, cost=7).retry_after == pytest.approx(0.1)
+    # Larger than the burst: admitted on a full bucket, which it then overdraws
+    clock.now += 1.0
+    assert limiter.check(1, cost=15) is None
+    assert limiter.check(1).retry_after == pytest.approx(0.6)
+    clock.now += 2.0
+    # 19 of the 25 daily tokens are spent
+    assert limiter.check(1, cost=7).reason == "quota"
+    assert limiter.check(1, cost=6) is None
+
+
+def test_overrides_replace_defaults_per_developer():
+    clock = FakeClock()
+    limiter = make_limiter(clock, per_second=1, overrides={"7": {"per_second": 10}})
+    assert limiter.limits_for(7).burst == 10
+    assert limiter.limits_for(8).burst == 1
+    assert sum(limiter.check(7) is None for _ in range(20)) == 10
+
+
+@pytest.mark.asyncio
+async def test_shared_backend_holds_limits_across_workers():
+    clock = FakeClock()
+    backend = LocalCounterBackend(clock=clock)
+    workers = [make_limiter(clock, daily_quota=10, backend=backend) for _ in range(2)]
+
+    admitted = 0
+    for n in range(40):
+        clock.now += 0.3
+        if await workers[n % 2].acquire(1) is None:
+            admitted += 1
+    # Each worker learns of the other's usage within one sync interval
+    assert 10 <= admitted <= 12
+
+
+@pytest.mark.asyncio
+async def test_shared_backend_debits_tokens_used_elsewhere():
+    clock = FakeClock()
+    backend = LocalCounterBackend(clock=clock)
+    a, b = (make_limiter(clock, per_second=1, burst=5, backend=backend) for _ in range(2))
+    for _ in range(5):
+        assert await a.acquire(1) is None
+    clock.now += 1.0
+    await a.acquire(1)  # reports a's usage
+    # b syncs on its first request and finds the bucket already spent
+    await b.acquire(1)
+    assert b.check(1) is not None
+
+
+@pytest.mark.asyncio
+async def test_database_backend_shares_counters(session_factory):
+    a, b = DatabaseCounterBackend(session_factory), DatabaseCounterBackend(session_factory)
+    assert await a.incr("k", 3, 60) == 3
+    assert await b.incr("k", 2, 60) == 5
+    # An expired counter starts over
+    assert await a.incr("short", 1, -1) == 1
+    assert await b.incr("short", 4, 60) == 4
+
+
+@pytest.mark.asyncio
+async def test_worker_joining_later_is_charged_recent_usage_only():
+    clock = FakeClock()
+    backend = LocalCounterBackend(clock=clock)
+    # Buckets refill from empty in 10s
+    a = make_limiter(clock, per_second=10, burst=100, backend=backend)
+    for n in range(36000):
+        clock.now = n / 10
+        await a.acquire(1)
+    # A worker started after the last refill window begins with a full bucket
+    clock.now = 3620.0
+    b = make_limiter(clock, per_second=10, burst=100, backend=backend)
+    assert await b.acquire(1) is None
+    assert sum(b.check(1) is None for _ in range(120)) == 99
+
+    # Usage within the window is still shared
+    for _ in range(50):
+        await a.acquire(1)
+    clock.now = 3621.0
+    await a.acquire(1)  # reports a's 50
+    await b.acquire(1)  # b had refilled 10 tokens, and learns of a's usage
+    assert b.check(1) is not None
+
+
+def test_reward_route_returns_429_with_retry_after(app_db_session, monkeypatch):
+    key = f"limited-{uuid.uuid4().hex}"
+    dev = DeveloperAccount(api_key=key, wallet_id=f"wallet-{key}")
+    app_db_session.add(dev)
+    app_db_session.commit()
+    monkeypatch.setattr(rate_limit, "rate_limiter", RateLimiter(daily_quota=1))
+
+    client = TestClient(app)
+    body = {"event": "e", "user_id": "u", "amount": 1}
+    assert client.post("/reward/", json=body, headers={"X-API-KEY": key}).status_code == 200
+    response = client.post("/reward/", json=body, headers={"X-API-KEY": key})
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert 'incentive_rate_limited_total{reason="quota"} 1' in client.get("/metrics").text
+
+
+def test_batch_is_charged_per_item(app_db_session, monkeypatch):
+    key = f"limited-{uuid.uuid4().hex}"
+    dev = DeveloperAccount(api_key=key, wallet_id=f"wallet-{key}")
+    app_db_session.add(dev)
+    app_db_session.commit()
+    monkeypatch.setattr(rate_limit, "rate_limiter", RateLimiter(daily_quota=3))
+
+    client = TestClient(app)
+    items = [{"event": "e", "user_id": f"u{n}", "amount": 1} for n in range(2)]
+    headers = {"X-API-KEY": key}
+    assert client.post("/reward/batch", json={"items": items}, headers=headers).status_code == 200
+    # One token is left; two more items exceed the quota
+    assert client.post("/reward/batch", json={"items": items}, headers=headers).status_code == 429
+    assert client.post("/reward/batch", json={"items": items[:1]}, headers=headers).status_code == 200
@@ -0,0 +1,106 @@
+# incentive-engine-api/tests/test_replicas.py
+
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from api.db import migrations, replicas
+from api.db.database import SessionLocal
+from api.db.models import DeveloperAccount, DeveloperBalance
+from api.db.replicas import ReplicaSet
+from api.main import app
+
+
+def make_database(path, balances):
+    """
+    Migrated SQLite file holding developer accounts with the given
+    {account id: balance}. Returns its async URL.
+    """
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        migrations.upgrade(conn)
+    with Session(engine) as s:
+        for account_id, balance in balances.items():
+            s.add(DeveloperAccount(id=account_id, api_key=f"key{account_id}", wallet_id=f"w{account_id}"))
+            s.add(DeveloperBalance(developer_account_id=account_id, balance=balance))
+        s.commit()
+    engine.dispose()
+    return f"sqlite+aiosqlite:///{path}"
+
+
+async def read_balance(replica_set, fresh=False):
+    async with replica_set.session(fresh) as s:
+        return await s.scalar(select(DeveloperBalance.balance))
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.asyncio
+async def test_reads_rotate_over_replicas_and_fresh_reads_use_primary(session_factory, tmp_path):
+    async with session_factory() as s:
+        s.add(DeveloperBalance(developer_account_id=1, balance=100.0))
+        await s.commit()
+    urls = [make_database(tmp_path / f"replica{n}.db", {1: float(n)}) for n in (1, 2)]
+    replica_set = ReplicaSet(urls, session_factory)
+    try:
+        assert sorted([await read_balance(replica_set) for _ in range(4)]) == [1.0, 1.0, 2.0, 2.0]
+        assert replica_set.reads == [2, 2]
+        assert await read_balance(replica_set, fresh=True) == 100.0
+        assert replica_set.fallbacks == 0
+    finally:
+        for engine in replica_set.engines():
+            await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_unreachable_replicas_fall_back_and_are_retried(session_factory, tmp_path):
+    async with session_factory() as s:
+        s.add(DeveloperBalance(developer_account_id=1, balance=100.0))
+        await s.commit()
+    healthy = make_database(tmp_path / "replica.db", {1: 1.0})
+    # SQLite can't create a file in a directory that doesn't exist
+    broken = f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'replica.db'}"
+    clock = Clock()
+    replica_set = ReplicaSet([broken, healthy], session_factory, retry_interval=30, clock=clock)
+    try:
+        assert [await read_balance(replica_set) for _ in range(3)] == [1.0, 1.0, 1.0]
+        assert replica_set.reads == [0, 3]
+
+        # With every replica down, reads go to the primary
+        replica_set._down_until[1] = clock.now + 30
+        assert await read_balance(replica_set) == 100.0
+        assert replica_set.fallbacks == 1
+
+        # Benched replicas are tried again once the retry interval passes
+        clock.now += 31
+        assert await read_balance(replica_set) == 1.0
+    finally:
+        for engine in replica_set.engines():
+            await engine.dispose()
+
+
+def test_balance_route_reads_replica_unless_primary_requested(app_db_session, tmp_path, monkeypatch):
+    dev = DeveloperAccount(api_key=f"key-{uuid.uuid4()}", wallet_id="wallet_primary")
+    app_db_session.add(dev)
+    app_db_session.flush()
+    app_db_session.add(DeveloperBalance(developer_account_id=dev.id, balance=50.0))
+    app_db_session.commit()
+    # The replica lags behind: it has the account but not its latest balance
+    replica_url = make_database(tmp_path / "replica.db", {dev.id: 20.0})
+    monkeypatch.setattr(replicas, "replica_set", ReplicaSet([replica_url], SessionLocal))
+
+    client = TestClient(app)
+    url = f"/accounts/{dev.id}/balance"
+    assert client.get(url).json() == {"balance": 20.0}
+    assert client.get(url, headers={"X-Read-Consistency": "primary"}).json() == {"balance": 50.0}
+    assert client.get(url, headers={"X-Read-Consistency": "stale"}).status_code == 422
+    assert client.get(f"/accounts/{dev.id}/deposit_address").json() == {"deposit_address": f"w{dev.id}"}
@@ -0,0 +1,120 @@
+# incentive-engine-api/tests/test_reward_batch.py
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import select, func
+
+from api.main import app
+from api.routes.reward import api_key_auth
+from api.db.models import Event, Reward, UserBalance
+from api.services.reward_service import process_reward_batch
+
+client = TestClient(app)
+
+
+@pytest.mark.asyncio
+async def test_batch_records_all_items_and_groups_balances(session, developer):
+    """Every valid item gets a reward row and balances accumulate per user."""
+    items = [
+        {"event": "signup", "user_id": "alice", "amount": 1.0},
+        {"event": "post", "user_id": "bob", "amount": 2.0, "metadata": {"k": "v"}},
+        {"event": "post", "user_id": "alice", "amount": 3.0},
+    ]
+    results = await process_reward_batch(session, "devkey", items)
+
+    assert [r.index for r in results] == [0, 1, 2]
+    assert all(r.error is None and r.status == "pending" for r in results)
+    assert [r.balance for r in results] == [1.0, 2.0, 4.0]
+    assert len({r.reward_id for r in results}) == 3
+
+    assert await session.scalar(select(func.count(Event.id))) == 3
+    assert await session.scalar(select(func.count(Reward.id))) == 3
+    balances = dict(
+        (await session.execute(select(UserBalance.user_id, UserBalance.balance))).all()
+    )
+    assert balances == {"alice": 4.0, "bob": 2.0}
+
+
+@pytest.mark.asyncio
+async def test_batch_builds_on_existing_balance(session, developer):
+    """Balances already on record are incremented, not replaced."""
+    await process_reward_batch(session, "devkey", [
+        {"event": "e", "user_id": "alice", "amount": 5.0},
+    ])
+    results = await process_reward_batch(session, "devkey", [
+        {"event": "e", "user_id": "alice", "amount": 1.5},
+    ])
+    assert results[0].balance == 6.5
+
+
+@pytest.mark.asyncio
+async def test_batch_reports_invalid_items_individually(session, developer):
+    """Invalid items are rejected with an error while valid ones commit."""
+    items = [
+        {"event": "e", "user_id": "alice", "amount": -1},
+        {"event": "e", "user_id": "alice", "amount": 2.0},
+        "not-an-object",
+    ]
+    results = await process_reward_batch(session, "devkey", items)
+
+    assert results[0].status == "rejected" and "amount" in results[0].error
+    assert results[1].error is None and results[1].balance == 2.0
+    assert results[2].status == "rejected"
+    assert await session.scalar(select(func.count(Reward.id))) == 1
+
+
+@pytest.mark.asyncio
+async def test_batch_invalid_api_key(session, developer):
+    """An unknown developer key rejects the whole batch."""
+    with pytest.raises(HTTPException) as exc:
+        await process_reward_batch(
+            session, "nope", [{"event": "e", "user_id": "u", "amount": 1}]
+        )
+    assert exc.value.status_code == 401
+
+
+def test_batch_route_rejects_oversized_batch(monkeypatch):
+    """Batches above REWARD_BATCH_MAX_ITEMS return 413."""
+    monkeypatch.setattr("api.routes.reward.REWARD_BATCH_MAX_ITEMS", 2)
+    monkeypatch.setitem(app.dependency_overrides, api_key_auth, lambda: "devkey")
+    item = {"event": "e", "user_id": "u", "amount": 1}
+    response = client.post(
+        "/reward/batch",
+        json={"items": [item] * 3},
+        headers={"X-API-KEY": "devkey"},
+    )
+    assert response.status_code == 413
+
+
+@pytest.mark.asyncio
+async def test_batch_replays_idempotent_items(session, developer):
+    """Keyed items already recorded (or repeated in the batch) aren't re-applied."""
+    first = await process_reward_batch(session, "devkey", [
+        {"event": "e", "user_id": "alice", "amount": 1.0, "idempotency_key": "a"},
+    ])
+    results = await process_reward_batch(session, "devkey", [
+        {"event": "e", "user_id": "alice", "amount": 1.0, "idempotency_key": "a"},
+        {"event": "e", "user_id": "alice", "amount": 2.0, "idempotency_key": "b"},
+        {"event": "e", "user_id": "alice", "amount": 2.0, "idempotency_key": "b"},
+    ])
+    assert results[0].reward_id == first[0].reward_id
+    assert results[1].reward_id == results[2].reward_id
+    assert results[2].balance == 3.0
+    assert await session.scalar(select(func.count(Reward.id))) == 2
+
+
+@pytest.mark.asyncio
+async def test_batch_rejects_keys_reused_for_other_requests(session, developer):
+    """A key already used (in an earlier call or this batch) for a different item is rejected."""
+    await process_reward_batch(session, "devkey", [
+        {"event": "e", "user_id": "alice", "amount": 1.0, "idempotency_key": "a"},
+    ])
+    results = await process_reward_batch(session, "devkey", [
+        {"event": "e", "user_id": "alice", "amount": 5.0, "idempotency_key": "a"},
+        {"event": "e", "user_id": "bob", "amount": 2.0, "idempotency_key": "b"},
+        {"event": "e", "user_id": "carol", "amount": 2.0, "idempotency_key": "b"},
+    ])
+    assert [r.status for r in results] == ["rejected", "pending", "rejected"]
+    assert results[0].error == results[2].error != None
+    assert await session.scalar(select(func.count(Reward.id))) == 2
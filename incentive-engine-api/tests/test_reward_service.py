@@ -0,0 +1,126 @@
+# incentive-engine-api/tests/test_reward_service.py
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select, func
+
+from api.db.models import DeveloperAccount, Event, IdempotencyKey, Reward, UserBalance
+from api.services.reward_service import (
+    process_reward,
+    idempotency_cache,
+    purge_idempotency_keys,
+)
+
+
+@pytest.mark.asyncio
+async def test_process_reward_creates_then_increments_balance(session, developer):
+    """The first reward creates the balance row; later ones add to it."""
+    first = await process_reward(session, "devkey", "signup", "alice", 2.0, {"a": 1})
+    second = await process_reward(session, "devkey", "post", "alice", 0.5, {})
+
+    assert first.balance == 2.0 and second.balance == 2.5
+    assert second.status == "pending"
+    assert await session.scalar(select(func.count(Reward.id))) == 2
+    assert await session.scalar(select(func.count(UserBalance.id))) == 1
+
+
+@pytest.mark.asyncio
+async def test_parallel_rewards_to_one_user_are_exact(concurrent_factory):
+    """Concurrent credits to the same user never lose an update."""
+    async with concurrent_factory() as s:
+        s.add(DeveloperAccount(api_key="parallel-key", wallet_id="wallet_parallel"))
+        await s.commit()
+
+    async def reward_once():
+        async with concurrent_factory() as s:
+            return await process_reward(s, "parallel-key", "tick", "hot-user", 0.25, {})
+
+    responses = await asyncio.gather(*(reward_once() for _ in range(100)))
+
+    async with concurrent_factory() as s:
+        final = await s.scalar(
+            select(UserBalance.balance).where(UserBalance.user_id == "hot-user")
+        )
+    assert final == 25.0
+    # Each credit observed a distinct intermediate balance
+    assert sorted(r.balance for r in responses) == [0.25 * i for i in range(1, 101)]
+
+
+@pytest.mark.asyncio
+async def test_idempotent_replay_does_not_credit_twice(session, developer):
+    """Retrying with the same key returns the original response."""
+    first = await process_reward(session, "devkey", "e", "alice", 2.0, {}, idempotency_key="k1")
+    replay = await process_reward(session, "devkey", "e", "alice", 2.0, {}, idempotency_key="k1")
+    assert replay == first
+
+    # Also answered from the database once the in-memory cache is cold
+    idempotency_cache.clear()
+    replay = await process_reward(session, "devkey", "e", "alice", 2.0, {}, idempotency_key="k1")
+    assert replay == first
+
+    # Neither replay wrote (and rolled back) an event
+    assert await session.scalar(select(func.count(Event.id))) == 1
+    assert await session.scalar(select(func.count(Reward.id))) == 1
+    assert await session.scalar(select(UserBalance.balance)) == 2.0
+
+
+@pytest.mark.asyncio
+async def test_idempotency_keys_are_scoped_per_developer(session, developer):
+    """Two developers may use the same key independently."""
+    session.add(DeveloperAccount(api_key="otherkey", wallet_id="wallet_other"))
+    await session.commit()
+    a = await process_reward(session, "devkey", "e", "alice", 1.0, {}, idempotency_key="k")
+    b = await process_reward(session, "otherkey", "e", "alice", 1.0, {}, idempotency_key="k")
+    assert a.reward_id != b.reward_id
+
+
+@pytest.mark.asyncio
+async def test_racing_retries_credit_once(concurrent_factory):
+    """Concurrent requests sharing a key record a single reward."""
+    async with concurrent_factory() as s:
+        s.add(DeveloperAccount(api_key="race-key", wallet_id="wallet_race"))
+        await s.commit()
+
+    async def attempt():
+        async with concurrent_factory() as s:
+            return await process_reward(
+                s, "race-key", "e", "u", 1.0, {}, idempotency_key="same"
+            )
+
+    idempotency_cache.clear()
+    responses = await asyncio.gather(*(attempt() for _ in range(10)))
+    assert len({r.reward_id for r in responses}) == 1
+    async with concurrent_factory() as s:
+        assert await s.scalar(select(func.count(Reward.id))) == 1
+
+
+@pytest.mark.asyncio
+async def test_idempotency_key_reused_for_other_request_is_refused(session, developer):
+    """A key sent again with a different payload is a client error, not a replay."""
+    await process_reward(session, "devkey", "e", "alice", 2.0, {"a": 1}, idempotency_key="k")
+    for cold in (False, True):
+        if cold:
+            idempotency_cache.clear()
+        with pytest.raises(HTTPException) as exc:
+            await process_reward(session, "devkey", "e", "alice", 3.0, {"a": 1}, idempotency_key="k")
+        assert exc.value.status_code == 422
+    assert await session.scalar(select(UserBalance.balance)) == 2.0
+
+
+@pytest.mark.asyncio
+async def test_purge_idempotency_keys_deletes_expired_keys(session, developer):
+    """Keys past retention are deleted in chunks; recent ones are kept."""
+    for i in range(5):
+        await process_reward(session, "devkey", "e", "alice", 1.0, {}, idempotency_key=f"k{i}")
+    old = datetime.utcnow() - timedelta(days=10)
+    for key in (await session.execute(select(IdempotencyKey))).scalars():
+        if key.key != "k4":
+            key.created_at = old
+    await session.commit()
+
+    deleted = await purge_idempotency_keys(session, datetime.utcnow() - timedelta(days=1), chunk_size=2)
+    assert deleted == 4
+    assert (await session.execute(select(IdempotencyKey.key))).scalars().all() == ["k4"]
@@ -0,0 +1,115 @@
+# incentive-engine-api/tests/test_rollups.py
+
+import uuid
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from api.db.models import DeveloperAccount, RewardRollup
+from api.main import app
+from api.services.import_service import import_rewards
+from api.services.reward_service import process_reward, process_reward_batch
+from api.services.rollup_service import get_stats, rebuild_rollups
+
+
+async def rollups(session):
+    rows = (await session.execute(
+        select(
+            RewardRollup.granularity, RewardRollup.bucket_start, RewardRollup.event_name,
+            RewardRollup.reward_count, RewardRollup.amount_total,
+        ).order_by(RewardRollup.granularity, RewardRollup.bucket_start, RewardRollup.event_name)
+    )).all()
+    return [tuple(r) for r in rows]
+
+
+async def one_chunk(body: bytes):
+    yield body
+
+
+HISTORY = (
+    b"event,user_id,amount,timestamp\n"
+    b"signup,u1,1,2024-03-01T09:15:00\n"
+    b"signup,u2,2,2024-03-01T09:45:00\n"
+    b"purchase,u1,5,2024-03-01T10:05:00\n"
+    b"signup,u3,4,2024-03-02T08:00:00\n"
+)
+
+
+@pytest.mark.asyncio
+async def test_rewards_update_rollups_in_their_transaction(session, developer):
+    await process_reward(session, "devkey", "signup", "alice", 2.0, {})
+    await process_reward_batch(session, "devkey", [
+        {"event": "signup", "user_id": "bob", "amount": 1.0},
+        {"event": "purchase", "user_id": "bob", "amount": 3.0},
+    ])
+    # Sum across buckets in case the calls straddle an hour or day boundary
+    totals = {}
+    for granularity, _, event, count, amount in await rollups(session):
+        entry = totals.setdefault((granularity, event), [0, 0.0])
+        entry[0] += count
+        entry[1] += amount
+    assert totals == {
+        ("day", "signup"): [2, 3.0], ("day", "purchase"): [1, 3.0],
+        ("hour", "signup"): [2, 3.0], ("hour", "purchase"): [1, 3.0],
+    }
+
+
+@pytest.mark.asyncio
+async def test_stats_match_imported_history_and_rebuild(session, developer):
+    await import_rewards(session, developer.id, "h", one_chunk(HISTORY), "csv")
+
+    stats = await get_stats(
+        session, developer.id, "hour", datetime(2024, 3, 1), datetime(2024, 3, 2)
+    )
+    assert [(b.bucket.hour, b.event, b.rewards, b.amount) for b in stats.buckets] == [
+        (9, "signup", 2, 3.0), (10, "purchase", 1, 5.0),
+    ]
+    daily = await get_stats(
+        session, developer.id, "day", datetime(2024, 3, 1, 12), datetime(2024, 3, 3),
+        event="signup",
+    )
+    # `since` is rounded down to the start of its day
+    assert [(b.bucket.day, b.rewards) for b in daily.buckets] == [(1, 2), (2, 1)]
+    assert (daily.total_rewards, daily.total_amount) == (3, 7.0)
+
+    incremental = await rollups(session)
+    assert await rebuild_rollups(session, developer.id) == len(incremental)
+    assert await rollups(session) == incremental
+
+    # Rebuilt rows keep the same keys, so later rewards still merge into them
+    await import_rewards(
+        session, developer.id, "more",
+        one_chunk(b"event,user_id,amount,timestamp\nsignup,u4,1,2024-03-02T08:30:00\n"), "csv",
+    )
+    daily = await get_stats(
+        session, developer.id, "day", datetime(2024, 3, 2), datetime(2024, 3, 3)
+    )
+    assert [(b.event, b.rewards, b.amount) for b in daily.buckets] == [("signup", 2, 5.0)]
+
+
+def test_stats_route(app_db_session):
+    key = f"stats-{uuid.uuid4().hex}"
+    dev = DeveloperAccount(api_key=key, wallet_id=f"wallet-{key}")
+    app_db_session.add(dev)
+    app_db_session.flush()
+    app_db_session.add(RewardRollup(
+        developer_account_id=dev.id, granularity="day", bucket_start=datetime(2024, 3, 1),
+        event_name="signup", reward_count=3, amount_total=4.5,
+    ))
+    app_db_session.commit()
+
+    client = TestClient(app)
+    response = client.get(
+        f"/accounts/{dev.id}/stats?since=2024-02-01T00:00:00&until=2024-04-01T00:00:00",
+        headers={"X-API-KEY": key},
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total_rewards"] == 3
+    assert body["buckets"] == [
+        {"bucket": "2024-03-01T00:00:00", "event": "signup", "rewards": 3, "amount": 4.5},
+    ]
+    response = client.get(f"/accounts/{dev.id}/stats?granularity=week", headers={"X-API-KEY": key})
+    assert response.status_code == 422
@@ -0,0 +1,169 @@
+# incentive-engine-api/tests/test_sharding.py
+
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from sqlalchemy import func, select, update
+
+from api.db import migrations, sharding
+from api.db.models import (
+    DeveloperAccount, Event, IdempotencyKey, Reward, TenantShard, UserBalance, Withdrawal,
+)
+from api.db.sharding import ShardRouter
+from api.services import account_service
+from api.services.account_service import (
+    get_balance,
+    get_user_balances,
+    set_user_address,
+    withdraw,
+)
+from api.services.custody import FakeCustodyProvider
+from api.services.payout_service import run_payout_pass
+from api.services.reward_service import idempotency_cache, process_reward, user_balance_cache
+from api.services.shard_service import move_tenant
+
+
+@pytest_asyncio.fixture
+async def router(session_factory, tmp_path, monkeypatch):
+    """
+    Two shards: the test database as "default" plus an "east" SQLite file.
+    """
+    router = ShardRouter(
+        {"east": f"sqlite+aiosqlite:///{tmp_path / 'east.db'}"}, session_factory, cache_ttl=60
+    )
+    for engine in router.engines().values():
+        async with engine.begin() as conn:
+            await conn.run_sync(migrations.upgrade)
+    monkeypatch.setattr(sharding, "shard_router", router)
+    yield router
+    for engine in router.engines().values():
+        await engine.dispose()
+
+
+async def count(factory, model, developer_id):
+    async with factory() as s:
+        return await s.scalar(
+            select(func.count()).select_from(model).where(model.developer_account_id == developer_id)
+        )
+
+
+def forget_caches():
+    idempotency_cache.clear()
+    user_balance_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_move_tenant_and_route_writes_to_its_shard(router, session, developer):
+    default, east = router.session_factory("default"), router.session_factory("east")
+    for n in range(3):
+        await process_reward(session, "devkey", "e", f"user{n % 2}", 1.0 + n, {}, f"key{n}")
+
+    counts = await move_tenant(router, developer.id, "east", wait=0, chunk_size=2)
+    assert counts["events"] == counts["rewards"] == counts["idempotency_keys"] == 3
+    assert counts["user_balances"] == 2
+    assert await count(default, Event, developer.id) == 0
+    assert await count(east, Reward, developer.id) == 3
+    assert (await session.get(TenantShard, developer.id)).shard == "east"
+
+    # Moved idempotency keys still point at the moved rewards
+    async with east() as s:
+        keys = (await s.execute(
+            select(IdempotencyKey.key, Reward.amount).join(Reward, Reward.id == IdempotencyKey.reward_id)
+        )).all()
+    assert sorted(keys) == [("key0", 1.0), ("key1", 2.0), ("key2", 3.0)]
+
+    # New writes and reads for the tenant go to its shard
+    forget_caches()
+    replay = await process_reward(session, "devkey", "e", "user0", 1.0, {}, "key0")
+    assert replay.balance == 1.0
+    await process_reward(session, "devkey", "e", "user0", 5.0, {})
+    assert await count(east, Event, developer.id) == 4
+    assert await count(default, Event, developer.id) == 0
+    assert await get_balance(session, developer.id) == 11.0
+    assert await get_user_balances(session, developer.id, ["user0"]) == {"user0": 9.0}
+    assert await withdraw(session, developer.id, "0xabc", 1.0)
+    assert await get_balance(session, developer.id) == 10.0
+
+    # And back again
+    await move_tenant(router, developer.id, "default", wait=0)
+    assert await count(default, UserBalance, developer.id) == 2
+    assert await count(east, UserBalance, developer.id) == 0
+    assert await get_balance(session, developer.id) == 10.0
+
+
+@pytest.mark.asyncio
+async def test_tenant_being_moved_gets_503(router, session, developer):
+    session.add(TenantShard(developer_account_id=developer.id, shard="default", state="moving"))
+    await session.commit()
+    with pytest.raises(HTTPException) as exc:
+        await process_reward(session, "devkey", "e", "u", 1.0, {})
+    assert exc.value.status_code == 503
+    assert exc.value.headers["Retry-After"] == "60"
+
+
+@pytest.mark.asyncio
+async def test_move_waits_for_in_flight_payouts(router, session, developer, session_factory):
+    await set_user_address(session, developer.id, "alice", "0xalice")
+    await process_reward(session, "devkey", "e", "alice", 1.0, {})
+    await session.execute(update(Reward).values(status="processing"))
+    await session.commit()
+
+    with pytest.raises(ValueError, match="1 reward"):
+        await move_tenant(router, developer.id, "east", wait=0)
+    # Nothing moved and the tenant is served again
+    assert await count(session_factory, Reward, developer.id) == 1
+    assert await count(router.session_factory("east"), Reward, developer.id) == 0
+    assert await router.assignment(developer.id) == ("default", "active")
+
+    # Payout passes leave a tenant being moved alone
+    await session.execute(update(Reward).values(status="pending"))
+    await session.execute(update(TenantShard).values(state="moving"))
+    await session.commit()
+    summary = await run_payout_pass(session_factory, FakeCustodyProvider())
+    assert summary.claimed == 0
+
+
+@pytest.mark.asyncio
+async def test_rerun_removes_rows_left_on_the_source(router, session, developer):
+    await process_reward(session, "devkey", "e", "alice", 1.0, {})
+    await move_tenant(router, developer.id, "east", wait=0)
+    # As if step 4 had failed: an original is still on the default shard
+    default = router.session_factory("default")
+    async with default() as s:
+        s.add(Event(developer_account_id=developer.id, event_name="e", user_id="alice", meta={}))
+        await s.commit()
+
+    assert await move_tenant(router, developer.id, "east", wait=0) == {}
+    assert await count(default, Event, developer.id) == 0
+    assert await count(router.session_factory("east"), Event, developer.id) == 1
+
+
+@pytest.mark.asyncio
+async def test_transfer_references_are_unique_across_shards(router, session, developer, monkeypatch):
+    other = DeveloperAccount(api_key="otherkey", wallet_id="wallet_other")
+    session.add(other)
+    await session.commit()
+    developer_ids = [developer.id, other.id]
+    await move_tenant(router, other.id, "east", wait=0)
+    # Both shards number their rows from 1
+    for api_key, dev_id in zip(["devkey", "otherkey"], developer_ids):
+        await set_user_address(session, dev_id, "alice", "0xalice")
+        await process_reward(session, api_key, "e", "alice", 2.0, {})
+        # Without an address, so this stays on the balance to withdraw
+        await process_reward(session, api_key, "e", "bob", 1.0, {})
+
+    custodian = FakeCustodyProvider()
+    for shard in ("default", "east"):
+        summary = await run_payout_pass(router.session_factory(shard), custodian)
+        assert (summary.transfers, summary.paid) == (1, 1)
+    monkeypatch.setattr(account_service, "custody_provider", custodian)
+    hashes = {await withdraw(session, dev_id, "0xabc", 1.0) for dev_id in developer_ids}
+
+    # Every transfer was really sent, none answered from another's record
+    assert len(custodian.results) == 4
+    assert len(hashes) == 2
+    for shard, dev_id in zip(("default", "east"), developer_ids):
+        async with router.session_factory(shard)() as s:
+            assert await s.scalar(select(Withdrawal.id)) == 1
+            assert await s.scalar(select(Reward.status).where(Reward.id == 1)) == "paid"
+        assert await get_balance(session, dev_id) == 0.0
@@ -0,0 +1,89 @@
+# benchmarks/bench_pooling.py
+
+"""
+Compare per-call latency of IncentiveClient's pooled session against a fresh
+connection per call (module-level ``requests.post``), using a local stub API.
+
+Usage:
+    python benchmarks/bench_pooling.py [--calls 500]
+"""
+
+import argparse
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from incentive import IncentiveClient
+
+RESPONSE = json.dumps({"reward_id": 1, "balance": 1.0, "status": "pending"}).encode()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers every POST like /reward, keeping the connection alive."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(RESPONSE)))
+        self.end_headers()
+        self.wfile.write(RESPONSE)
+
+    def log_message(self, *args):
+        pass
+
+
+def measure(call, calls):
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def report(label, latencies):
+    ordered = sorted(latencies)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    print(
+        f"{label:<12} mean={statistics.mean(latencies) * 1e3:7.3f}ms "
+        f"p50={statistics.median(latencies) * 1e3:7.3f}ms "
+        f"p95={p95 * 1e3:7.3f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=500)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    payload = {"event": "bench", "user_id": "u1", "amount": 1.0, "metadata": {}}
+
+    def unpooled():
+        requests.post(f"{base_url}/reward", json=payload, timeout=10).json()
+
+    with IncentiveClient(api_key="bench-key", base_url=base_url) as client:
+        def pooled():
+            client.reward(event="bench", user_id="u1", amount=1.0)
+
+        # Warm up both paths before measuring
+        measure(unpooled, 10)
+        measure(pooled, 10)
+        report("unpooled", measure(unpooled, args.calls))
+        report("pooled", measure(pooled, args.calls))
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
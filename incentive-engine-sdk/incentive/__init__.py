@@ -1,3 +1,25 @@
-from .client import IncentiveClient
+# incentive/__init__.py
 
-__all__ = ["IncentiveClient"]
+# The clients are imported on first access: IncentiveClient pulls in
+# requests and AsyncIncentiveClient pulls in httpx, and an application
+# using one shouldn't pay to import the other.
+_LAZY = {
+    "IncentiveClient": ".client",
+    "AsyncIncentiveClient": ".async_client",
+}
+
+__all__ = ["IncentiveClient", "AsyncIncentiveClient"]
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
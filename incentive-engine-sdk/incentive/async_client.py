@@ -0,0 +1,260 @@
+# incentive/async_client.py
+
+import asyncio
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    Mapping,
+    Optional,
+    Tuple,
+    Union,
+)
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - exercised only without the extra
+    httpx = None
+
+from .config import (
+    API_BASE_URL,
+    CONNECT_TIMEOUT,
+    READ_TIMEOUT,
+    POOL_SIZE,
+    MAX_RETRIES,
+    BACKOFF_FACTOR,
+    BACKOFF_MAX,
+    RETRY_STATUSES,
+)
+from .exceptions import (
+    InvalidPayloadError,
+    InvalidTokenError,
+    InvalidResponseError,
+    IncentiveEngineError,
+)
+from .utils import build_reward_payload, backoff_delay, new_idempotency_key
+
+RewardSpec = Mapping[str, Any]
+
+
+async def _aiter(items: Union[Iterable[RewardSpec], AsyncIterable[RewardSpec]]):
+    """
+    Iterate a sync or async iterable uniformly.
+    """
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+class AsyncIncentiveClient:
+    """
+    asyncio-native SDK client for sending reward events to the Incentive Engine API.
+
+    Mirrors IncentiveClient.reward and raises the same exceptions. Requires the
+    `async` extra (`pip install incentive-sdk[async]`).
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: Optional[str] = None,
+        timeout: Union[float, Tuple[float, float], None] = None,
+        pool_size: int = POOL_SIZE,
+        max_retries: int = MAX_RETRIES,
+        backoff_factor: float = BACKOFF_FACTOR,
+        backoff_max: float = BACKOFF_MAX,
+        transport: Optional["httpx.AsyncBaseTransport"] = None,
+    ):
+        """
+        :param api_key: Your Incentive Engine API key.
+        :param base_url: Override the API endpoint (e.g., for testing).
+        :param timeout: Seconds, or a (connect, read) tuple, per request.
+        :param pool_size: Maximum concurrent connections to the API host.
+        :param max_retries: Retries for connection errors and transient 5xx.
+        :param backoff_factor: Base delay (seconds) of the exponential backoff.
+        :param backoff_max: Upper bound (seconds) on a single backoff delay.
+        :param transport: Optional httpx transport (e.g., httpx.MockTransport in tests).
+        """
+        if httpx is None:
+            raise ImportError(
+                "AsyncIncentiveClient requires httpx; install incentive-sdk[async]"
+            )
+        if not api_key or not isinstance(api_key, str):
+            raise InvalidTokenError("API key must be a non-empty string.")
+        self.api_key = api_key
+        self.base_url = (base_url or API_BASE_URL).rstrip("/")
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+
+        if timeout is None:
+            timeout = (CONNECT_TIMEOUT, READ_TIMEOUT)
+        if isinstance(timeout, tuple):
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json",
+            },
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=pool_size, max_keepalive_connections=pool_size
+            ),
+            transport=transport,
+        )
+
+    async def __aenter__(self) -> "AsyncIncentiveClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """
+        Close pooled connections. The client should not be used afterwards.
+        """
+        await self._client.aclose()
+
+    async def _post(
+        self,
+        path: str,
+        payload: Dict[str, Any],
+        headers: Optional[Dict[str, str]] = None,
+    ) -> "httpx.Response":
+        """
+        POST `payload` to `path`, retrying connection errors and transient 5xx.
+        Retries resend the same body and headers, including the idempotency key.
+        Returns the final response; raises httpx exceptions once retries run out.
+        """
+        attempt = 0
+        while True:
+            try:
+                response = await self._client.post(path, json=payload, headers=headers)
+            except httpx.TransportError:
+                if attempt >= self.max_retries:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+            await asyncio.sleep(backoff_delay(attempt, self.backoff_factor, self.backoff_max))
+            attempt += 1
+
+    async def reward(
+        self,
+        event: str,
+        user_id: str,
+        amount: float,
+        metadata: Optional[Dict[str, Any]] = None,
+        idempotency_key: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Send a reward event to the API.
+
+        :param event: Name of the event (e.g., "user_signed_up").
+        :param user_id: Unique identifier for the user.
+        :param amount: Positive number of USDC to reward.
+        :param metadata: Optional dict of extra data to attach.
+        :param idempotency_key: Key identifying this reward across retries;
+            generated automatically when omitted.
+
+        :returns: Parsed JSON response from the API.
+        :raises: InvalidPayloadError, InvalidTokenError, InvalidResponseError, IncentiveEngineError
+        """
+        try:
+            payload = build_reward_payload(event, user_id, amount, metadata)
+        except ValueError as ve:
+            raise InvalidPayloadError(str(ve))
+        idempotency_key = idempotency_key or new_idempotency_key()
+
+        try:
+            response = await self._post(
+                "/reward", payload, headers={"Idempotency-Key": idempotency_key}
+            )
+            if response.status_code == 401:
+                raise InvalidTokenError("Unauthorized: check your API key.")
+            response.raise_for_status()
+        except InvalidTokenError:
+            raise
+        except httpx.HTTPStatusError as he:
+            raise InvalidResponseError(f"HTTP error: {he.response.text}") from he
+        except httpx.HTTPError as re:
+            raise IncentiveEngineError(f"Network error: {str(re)}") from re
+
+        try:
+            return response.json()
+        except ValueError as ve:
+            raise InvalidResponseError("Invalid JSON in response.") from ve
+
+    async def reward_many(
+        self,
+        rewards: Union[Iterable[RewardSpec], AsyncIterable[RewardSpec]],
+        concurrency: Optional[int] = None,
+        ordered: bool = True,
+        return_exceptions: bool = False,
+    ) -> AsyncIterator[Tuple[int, Any]]:
+        """
+        Send many rewards with at most `concurrency` requests in flight.
+
+        `rewards` is a (sync or async) iterable of mappings with the keyword
+        arguments of `reward()`; it is consumed lazily, so it may be unbounded.
+        Yields `(index, result)` pairs: in input order when `ordered` is True,
+        otherwise as requests complete. In ordered mode at most `concurrency`
+        results are outstanding (in flight or waiting for an earlier item).
+
+        If a reward fails, its exception is raised (and in-flight requests are
+        cancelled) unless `return_exceptions` is True, in which case the
+        exception is yielded as that item's result.
+
+        :param concurrency: In-flight request limit; defaults to `pool_size`.
+        """
+        limit = concurrency or self.pool_size
+        if limit <= 0:
+            raise ValueError("concurrency must be positive")
+
+        source = _aiter(rewards)
+        pending: Dict[asyncio.Future, int] = {}
+        completed: Dict[int, Any] = {}
+        submitted = 0
+        next_index = 0
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and len(pending) < limit and (
+                    not ordered or submitted - next_index < limit
+                ):
+                    try:
+                        spec = await source.__anext__()
+                    except StopAsyncIteration:
+                        exhausted = True
+                        break
+                    pending[asyncio.ensure_future(self.reward(**spec))] = submitted
+                    submitted += 1
+
+                if not pending:
+                    break
+
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    index = pending.pop(task)
+                    error = task.exception()
+                    if error is not None and not return_exceptions:
+                        raise error
+                    result = error if error is not None else task.result()
+                    if ordered:
+                        completed[index] = result
+                    else:
+                        yield index, result
+
+                while next_index in completed:
+                    yield next_index, completed.pop(next_index)
+                    next_index += 1
+        finally:
+            for task in pending:
+                task.cancel()
@@ -0,0 +1,206 @@
+# incentive/buffer.py
+
+import atexit
+import logging
+import threading
+import time
+import weakref
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from .exceptions import BufferFullError
+
+logger = logging.getLogger(__name__)
+
+# What to do when reward() is called on a full queue
+OVERFLOW_POLICIES = ("block", "drop_newest", "drop_oldest", "raise")
+
+
+@dataclass
+class BufferStats:
+    """
+    Snapshot of a RewardBuffer's counters. Latencies are in seconds.
+    """
+    queued: int = 0
+    enqueued: int = 0
+    sent: int = 0
+    rejected: int = 0
+    failed: int = 0
+    dropped: int = 0
+    batches: int = 0
+    last_batch_size: int = 0
+    max_batch_size: int = 0
+    avg_batch_size: float = 0.0
+    last_flush_latency: float = 0.0
+    max_flush_latency: float = 0.0
+    avg_flush_latency: float = 0.0
+
+
+class RewardBuffer:
+    """
+    Bounded queue of reward payloads drained by a background thread.
+
+    A batch is sent when `batch_size` events are queued or the oldest queued
+    event has waited `flush_interval` seconds, whichever comes first.
+    `send_batch` receives the list of payloads and returns the per-item
+    results from POST /reward/batch; exceptions it raises count the whole
+    batch as failed.
+    """
+
+    def __init__(
+        self,
+        send_batch: Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]],
+        batch_size: int,
+        flush_interval: float,
+        max_queue_size: int,
+        overflow: str = "block",
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}")
+        if batch_size <= 0 or max_queue_size <= 0:
+            raise ValueError("batch_size and max_queue_size must be positive")
+        self._send_batch = send_batch
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue_size = max_queue_size
+        self.overflow = overflow
+
+        self._queue: deque = deque()  # (enqueued_at, payload)
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._flush_requested = False
+        self._closed = False
+        self._stats = BufferStats()
+        self._total_latency = 0.0
+
+        self._thread = threading.Thread(
+            target=self._run, name="incentive-reward-flusher", daemon=True
+        )
+        self._thread.start()
+        # Flush on interpreter exit without keeping the buffer alive
+        atexit.register(_close_at_exit, weakref.ref(self))
+
+    def put(self, payload: Dict[str, Any]) -> bool:
+        """
+        Enqueue a payload. Returns False if it was dropped by the overflow policy.
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("RewardBuffer is closed")
+            if len(self._queue) >= self.max_queue_size:
+                if self.overflow == "raise":
+                    raise BufferFullError("Reward buffer is full.")
+                if self.overflow == "drop_newest":
+                    self._stats.dropped += 1
+                    return False
+                if self.overflow == "drop_oldest":
+                    self._queue.popleft()
+                    self._stats.dropped += 1
+                else:
+                    self._cond.wait_for(
+                        lambda: len(self._queue) < self.max_queue_size or self._closed
+                    )
+                    if self._closed:
+                        raise RuntimeError("RewardBuffer is closed")
+            self._queue.append((time.monotonic(), payload))
+            self._stats.enqueued += 1
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify_all()
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Send everything queued so far and wait for it to be delivered.
+        Returns False if `timeout` elapsed first.
+        """
+        with self._cond:
+            self._flush_requested = True
+            self._cond.notify_all()
+            return self._cond.wait_for(
+                lambda: not self._queue and not self._in_flight, timeout
+            )
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """
+        Flush remaining events and stop the background thread.
+        """
+        if self._closed:
+            return
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    def stats(self) -> BufferStats:
+        """
+        Return a snapshot of queue depth, batch sizes, latencies and drop counts.
+        """
+        with self._cond:
+            snapshot = BufferStats(**vars(self._stats))
+            snapshot.queued = len(self._queue)
+            return snapshot
+
+    def _batch_ready(self) -> bool:
+        if self._closed or self._flush_requested:
+            return True
+        if len(self._queue) >= self.batch_size:
+            return True
+        return bool(self._queue) and (
+            time.monotonic() - self._queue[0][0] >= self.flush_interval
+        )
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._batch_ready():
+                    timeout = None
+                    if self._queue:
+                        timeout = self._queue[0][0] + self.flush_interval - time.monotonic()
+                    self._cond.wait(timeout)
+                if not self._queue:
+                    self._flush_requested = False
+                    self._cond.notify_all()
+                    if self._closed:
+                        return
+                    continue
+                count = min(self.batch_size, len(self._queue))
+                batch = [self._queue.popleft()[1] for _ in range(count)]
+                self._in_flight = count
+                # Room was freed for producers blocked on a full queue
+                self._cond.notify_all()
+
+            started = time.monotonic()
+            rejected = failed = 0
+            try:
+                results = self._send_batch(batch)
+                rejected = sum(1 for r in results if r.get("error"))
+            except Exception:
+                logger.exception("Failed to deliver %d buffered rewards", count)
+                failed = count
+            latency = time.monotonic() - started
+
+            with self._cond:
+                s = self._stats
+                s.batches += 1
+                s.sent += count - failed - rejected
+                s.rejected += rejected
+                s.failed += failed
+                s.last_batch_size = count
+                s.max_batch_size = max(s.max_batch_size, count)
+                s.avg_batch_size = (s.avg_batch_size * (s.batches - 1) + count) / s.batches
+                self._total_latency += latency
+                s.last_flush_latency = latency
+                s.max_flush_latency = max(s.max_flush_latency, latency)
+                s.avg_flush_latency = self._total_latency / s.batches
+                self._in_flight = 0
+                if not self._queue:
+                    self._flush_requested = False
+                self._cond.notify_all()
+
+
+def _close_at_exit(ref: "weakref.ReferenceType[RewardBuffer]") -> None:
+    buffer = ref()
+    if buffer is not None:
+        buffer.close()
@@ -1,30 +1,172 @@
 # incentive/client.py
 
+import time
 import requests
-from typing import Optional, Dict, Any
+from requests.adapters import HTTPAdapter
+from typing import Optional, Dict, Any, List, Tuple, Union
 
-from .config import API_BASE_URL
+from .config import (
+    API_BASE_URL,
+    CONNECT_TIMEOUT,
+    READ_TIMEOUT,
+    POOL_SIZE,
+    MAX_RETRIES,
+    BACKOFF_FACTOR,
+    BACKOFF_MAX,
+    RETRY_STATUSES,
+    BATCH_SIZE,
+    FLUSH_INTERVAL,
+    MAX_QUEUE_SIZE,
+)
+from .buffer import BufferStats, RewardBuffer
 from .exceptions import (
     InvalidPayloadError,
     InvalidTokenError,
     InvalidResponseError,
     IncentiveEngineError,
 )
-from .utils import validate_event_payload
+from .utils import build_reward_payload, backoff_delay, new_idempotency_key
 
 
 class IncentiveClient:
     """
     SDK client for sending reward events to the Incentive Engine API.
+
+    Requests go through a persistent, pooled HTTP session so connections are
+    reused across calls. Close the client (or use it as a context manager)
+    to release them.
+
+    With `buffered=True`, reward() only validates and enqueues the event; a
+    background thread sends queued events to POST /reward/batch.
     """
 
-    def __init__(self, api_key: str, base_url: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: str,
+        base_url: Optional[str] = None,
+        timeout: Union[float, Tuple[float, float], None] = None,
+        pool_size: int = POOL_SIZE,
+        max_retries: int = MAX_RETRIES,
+        backoff_factor: float = BACKOFF_FACTOR,
+        backoff_max: float = BACKOFF_MAX,
+        buffered: bool = False,
+        batch_size: int = BATCH_SIZE,
+        flush_interval: float = FLUSH_INTERVAL,
+        max_queue_size: int = MAX_QUEUE_SIZE,
+        overflow: str = "block",
+    ):
+        """
+        :param api_key: Your Incentive Engine API key.
+        :param base_url: Override the API endpoint (e.g., for testing).
+        :param timeout: Seconds, or a (connect, read) tuple, per request.
+        :param pool_size: Maximum keep-alive connections to the API host.
+        :param max_retries: Retries for connection errors and transient 5xx.
+        :param backoff_factor: Base delay (seconds) of the exponential backoff.
+        :param backoff_max: Upper bound (seconds) on a single backoff delay.
+        :param buffered: Queue rewards and send them in background batches.
+        :param batch_size: Buffered mode: send once this many events are queued.
+        :param flush_interval: Buffered mode: max seconds an event waits in the queue.
+        :param max_queue_size: Buffered mode: queue capacity.
+        :param overflow: Buffered mode: "block", "drop_newest", "drop_oldest" or
+            "raise" (BufferFullError) when the queue is full.
+        """
         # Validate API key
         if not api_key or not isinstance(api_key, str):
             raise InvalidTokenError("API key must be a non-empty string.")
         self.api_key = api_key
         # Allow overriding the endpoint (e.g., for testing)
-        self.base_url = base_url or API_BASE_URL.rstrip("/")
+        self.base_url = (base_url or API_BASE_URL).rstrip("/")
+        self.timeout = timeout if timeout is not None else (CONNECT_TIMEOUT, READ_TIMEOUT)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._session.headers.update({
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        })
+
+        self._buffer = None
+        if buffered:
+            self._buffer = RewardBuffer(
+                self._send_batch,
+                batch_size=batch_size,
+                flush_interval=flush_interval,
+                max_queue_size=max_queue_size,
+                overflow=overflow,
+            )
+
+    def __enter__(self) -> "IncentiveClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Flush buffered events (if any) and close pooled connections.
+        The client should not be used afterwards.
+        """
+        if self._buffer is not None:
+            self._buffer.close()
+        self._session.close()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Buffered mode: send all queued events and wait until they are delivered.
+        Returns False if `timeout` elapsed first. A no-op when not buffered.
+        """
+        if self._buffer is None:
+            return True
+        return self._buffer.flush(timeout)
+
+    def stats(self) -> BufferStats:
+        """
+        Buffered mode: queue depth, batch sizes, flush latency and drop counters.
+        """
+        if self._buffer is None:
+            raise RuntimeError("stats() is only available in buffered mode")
+        return self._buffer.stats()
+
+    def _send_batch(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Deliver a list of reward payloads via POST /reward/batch.
+        Returns the per-item results reported by the API.
+        """
+        response = self._post("/reward/batch", {"items": items})
+        response.raise_for_status()
+        return response.json()["results"]
+
+    def _post(
+        self,
+        path: str,
+        payload: Dict[str, Any],
+        headers: Optional[Dict[str, str]] = None,
+    ) -> requests.Response:
+        """
+        POST `payload` to `path`, retrying connection errors and transient 5xx.
+        Retries resend the same body and headers, including the idempotency key.
+        Returns the final response; raises requests exceptions once retries run out.
+        """
+        url = f"{self.base_url}{path}"
+        attempt = 0
+        while True:
+            try:
+                response = self._session.post(
+                    url, json=payload, headers=headers, timeout=self.timeout
+                )
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+            time.sleep(backoff_delay(attempt, self.backoff_factor, self.backoff_max))
+            attempt += 1
 
     def reward(
         self,
@@ -32,6 +174,7 @@ class IncentiveClient:
         user_id: str,
         amount: float,
         metadata: Optional[Dict[str, Any]] = None,
+        idempotency_key: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
         Send a reward event to the API.
@@ -40,30 +183,30 @@ class IncentiveClient:
         :param user_id: Unique identifier for the user.
         :param amount: Positive number of USDC to reward.
         :param metadata: Optional dict of extra data to attach.
+        :param idempotency_key: Key identifying this reward across retries;
+            generated automatically when omitted.
 
-        :returns: Parsed JSON response from the API.
-        :raises: InvalidPayloadError, InvalidTokenError, InvalidResponseError, IncentiveEngineError
+        :returns: Parsed JSON response from the API, or {"status": "queued"}
+            (or "dropped" if the overflow policy discarded it) in buffered mode.
+        :raises: InvalidPayloadError, InvalidTokenError, InvalidResponseError,
+            IncentiveEngineError, BufferFullError
         """
         # Validate inputs
         try:
-            validate_event_payload(event, user_id, amount)
+            payload = build_reward_payload(event, user_id, amount, metadata)
         except ValueError as ve:
             raise InvalidPayloadError(str(ve))
+        idempotency_key = idempotency_key or new_idempotency_key()
 
-        payload = {
-            "event": event,
-            "user_id": user_id,
-            "amount": amount,
-            "metadata": metadata or {},
-        }
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-        }
+        if self._buffer is not None:
+            payload["idempotency_key"] = idempotency_key
+            queued = self._buffer.put(payload)
+            return {"status": "queued" if queued else "dropped"}
 
-        url = f"{self.base_url}/reward"
         try:
-            response = requests.post(url, json=payload, headers=headers)
+            response = self._post(
+                "/reward", payload, headers={"Idempotency-Key": idempotency_key}
+            )
             if response.status_code == 401:
                 raise InvalidTokenError("Unauthorized: check your API key.")
             response.raise_for_status()
@@ -4,3 +4,25 @@ import os
 
 # Base URL for the Incentive Engine API. Override by setting the environment variable.
 API_BASE_URL = os.getenv("INCENTIVE_API_BASE_URL", "https://api.incentiveengine.io")
+
+# Connect and read timeouts (seconds) applied to every request.
+CONNECT_TIMEOUT = float(os.getenv("INCENTIVE_CONNECT_TIMEOUT", 3.05))
+READ_TIMEOUT = float(os.getenv("INCENTIVE_READ_TIMEOUT", 10))
+
+# Maximum number of keep-alive connections held open to the API host.
+POOL_SIZE = int(os.getenv("INCENTIVE_POOL_SIZE", 10))
+
+# Retries for connection errors and transient 5xx responses, with jittered
+# exponential backoff: sleep ~ uniform(0, min(BACKOFF_MAX, BACKOFF_FACTOR * 2**n)).
+MAX_RETRIES = int(os.getenv("INCENTIVE_MAX_RETRIES", 2))
+BACKOFF_FACTOR = float(os.getenv("INCENTIVE_BACKOFF_FACTOR", 0.2))
+BACKOFF_MAX = float(os.getenv("INCENTIVE_BACKOFF_MAX", 5))
+
+# HTTP statuses treated as transient and retried.
+RETRY_STATUSES = frozenset({500, 502, 503, 504})
+
+# Buffered mode: events are sent in batches of up to BATCH_SIZE, at least
+# every FLUSH_INTERVAL seconds, from a queue holding at most MAX_QUEUE_SIZE.
+BATCH_SIZE = int(os.getenv("INCENTIVE_BATCH_SIZE", 100))
+FLUSH_INTERVAL = float(os.getenv("INCENTIVE_FLUSH_INTERVAL", 1.0))
+MAX_QUEUE_SIZE = int(os.getenv("INCENTIVE_MAX_QUEUE_SIZE", 10000))
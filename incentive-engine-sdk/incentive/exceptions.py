@@ -15,3 +15,7 @@ class InvalidTokenError(IncentiveEngineError):
 class InvalidResponseError(IncentiveEngineError):
     """Raised when the server response is unexpected or malformed."""
     pass
+
+class BufferFullError(IncentiveEngineError):
+    """Raised in buffered mode when the queue is full and the overflow policy is "raise"."""
+    pass
@@ -1,5 +1,10 @@
 # utils.py
 
+import random
+import uuid
+from typing import Any, Dict, Optional
+
+
 def validate_event_payload(event: str, user_id: str, amount: float) -> None:
     if not event or not isinstance(event, str):
         raise ValueError("Invalid event name. Must be a non-empty string.")
@@ -9,3 +14,36 @@ def validate_event_payload(event: str, user_id: str, amount: float) -> None:
 
     if not isinstance(amount, (int, float)) or amount <= 0:
         raise ValueError("Amount must be a positive number.")
+
+
+def build_reward_payload(
+    event: str,
+    user_id: str,
+    amount: float,
+    metadata: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Validate a reward and return the JSON body for POST /reward.
+    Raises ValueError if the payload is invalid.
+    """
+    validate_event_payload(event, user_id, amount)
+    return {
+        "event": event,
+        "user_id": user_id,
+        "amount": amount,
+        "metadata": metadata or {},
+    }
+
+
+def backoff_delay(attempt: int, factor: float, maximum: float) -> float:
+    """
+    Full-jitter exponential backoff: uniform(0, min(maximum, factor * 2**attempt)).
+    """
+    return random.uniform(0, min(maximum, factor * (2 ** attempt)))
+
+
+def new_idempotency_key() -> str:
+    """
+    Generate a unique Idempotency-Key for one logical reward.
+    """
+    return uuid.uuid4().hex
@@ -0,0 +1,145 @@
+# tests/test_async_client.py
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from incentive import AsyncIncentiveClient
+from incentive.exceptions import (
+    InvalidPayloadError,
+    InvalidTokenError,
+    InvalidResponseError,
+    IncentiveEngineError,
+)
+
+
+def make_client(handler, **kwargs):
+    kwargs.setdefault("backoff_factor", 0)
+    return AsyncIncentiveClient(
+        api_key="test-key",
+        base_url="http://api.test",
+        transport=httpx.MockTransport(handler),
+        **kwargs,
+    )
+
+
+def echo_handler(request):
+    body = json.loads(request.content)
+    return httpx.Response(200, json={"user_id": body["user_id"], "balance": body["amount"]})
+
+
+def test_reward_success():
+    async def run():
+        async with make_client(echo_handler) as client:
+            return await client.reward(event="e", user_id="u1", amount=2.0)
+
+    assert asyncio.run(run()) == {"user_id": "u1", "balance": 2.0}
+
+
+@pytest.mark.parametrize(
+    "status, expected",
+    [(401, InvalidTokenError), (400, InvalidResponseError), (503, InvalidResponseError)],
+)
+def test_error_statuses_map_to_sdk_exceptions(status, expected):
+    async def run():
+        async with make_client(lambda r: httpx.Response(status, text="nope"), max_retries=1) as client:
+            await client.reward(event="e", user_id="u1", amount=1.0)
+
+    with pytest.raises(expected):
+        asyncio.run(run())
+
+
+def test_invalid_payload_and_network_errors():
+    def fail(request):
+        raise httpx.ConnectError("down", request=request)
+
+    async def run():
+        async with make_client(fail, max_retries=2) as client:
+            with pytest.raises(InvalidPayloadError):
+                await client.reward(event="", user_id="u1", amount=1.0)
+            with pytest.raises(IncentiveEngineError):
+                await client.reward(event="e", user_id="u1", amount=1.0)
+
+    asyncio.run(run())
+
+
+def test_transient_failures_are_retried():
+    calls = []
+
+    def flaky(request):
+        calls.append(request)
+        if len(calls) < 3:
+            return httpx.Response(502)
+        return echo_handler(request)
+
+    async def run():
+        async with make_client(flaky, max_retries=2) as client:
+            return await client.reward(event="e", user_id="u1", amount=1.0)
+
+    assert asyncio.run(run())["user_id"] == "u1"
+    assert len(calls) == 3
+
+
+class SlowTransport(httpx.AsyncBaseTransport):
+    """Delays each response by the requested amount and tracks concurrency."""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.peak = 0
+
+    async def handle_async_request(self, request):
+        body = json.loads(request.content)
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(body["metadata"]["delay"])
+        self.in_flight -= 1
+        return httpx.Response(200, json={"user_id": body["user_id"]})
+
+
+def specs(n):
+    # Later items finish first so completion order differs from input order
+    for i in range(n):
+        yield {"event": "e", "user_id": f"u{i}", "amount": 1, "metadata": {"delay": (n - i) * 0.002}}
+
+
+def test_reward_many_ordered_respects_concurrency():
+    transport = SlowTransport()
+
+    async def run():
+        client = AsyncIncentiveClient(api_key="k", base_url="http://api.test", transport=transport)
+        async with client:
+            return [pair async for pair in client.reward_many(specs(20), concurrency=4)]
+
+    results = asyncio.run(run())
+    assert [i for i, _ in results] == list(range(20))
+    assert [r["user_id"] for _, r in results] == [f"u{i}" for i in range(20)]
+    assert transport.peak <= 4
+
+
+def test_reward_many_unordered_yields_as_completed():
+    transport = SlowTransport()
+
+    async def run():
+        client = AsyncIncentiveClient(api_key="k", base_url="http://api.test", transport=transport)
+        async with client:
+            return [i async for i, _ in client.reward_many(specs(8), concurrency=8, ordered=False)]
+
+    order = asyncio.run(run())
+    assert sorted(order) == list(range(8))
+    assert order[0] == 7
+
+
+def test_reward_many_return_exceptions():
+    async def run():
+        async with make_client(echo_handler) as client:
+            items = [
+                {"event": "e", "user_id": "u1", "amount": 1},
+                {"event": "e", "user_id": "u2", "amount": -1},
+            ]
+            return [pair async for pair in client.reward_many(items, return_exceptions=True)]
+
+    results = asyncio.run(run())
+    assert results[0][1]["user_id"] == "u1"
+    assert isinstance(results[1][1], InvalidPayloadError)
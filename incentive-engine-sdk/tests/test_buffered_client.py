@@ -0,0 +1,130 @@
+# tests/test_buffered_client.py
+
+import threading
+import time
+from unittest.mock import patch, Mock
+
+import pytest
+
+from incentive import IncentiveClient
+from incentive.exceptions import BufferFullError
+
+
+class FakeBatchAPI:
+    """Stands in for Session.post, recording batch sizes."""
+
+    def __init__(self, delay=0.0, gate=None):
+        self.batches = []
+        self.delay = delay
+        self.gate = gate
+
+    def __call__(self, url, json, timeout, headers=None):
+        if self.gate is not None:
+            self.gate.wait()
+        time.sleep(self.delay)
+        items = json["items"]
+        self.batches.append(len(items))
+        resp = Mock(status_code=200)
+        resp.raise_for_status.return_value = None
+        resp.json.return_value = {
+            "results": [
+                {"index": i, "error": "bad" if item["user_id"] == "reject" else None}
+                for i, item in enumerate(items)
+            ]
+        }
+        return resp
+
+
+def test_reward_returns_immediately_and_flush_sends_batches():
+    api = FakeBatchAPI()
+    with patch("incentive.client.requests.Session.post", side_effect=api):
+        client = IncentiveClient(api_key="k", buffered=True, batch_size=10, flush_interval=60)
+        for i in range(25):
+            assert client.reward(event="e", user_id=f"u{i}", amount=1) == {"status": "queued"}
+        assert client.flush(timeout=5)
+        stats = client.stats()
+        client.close()
+
+    assert sum(api.batches) == 25
+    assert max(api.batches) == 10
+    assert stats.sent == 25 and stats.queued == 0
+    assert stats.batches == len(api.batches)
+    assert stats.max_batch_size == 10
+
+
+def test_flush_interval_triggers_partial_batch():
+    api = FakeBatchAPI()
+    with patch("incentive.client.requests.Session.post", side_effect=api):
+        client = IncentiveClient(api_key="k", buffered=True, batch_size=100, flush_interval=0.05)
+        client.reward(event="e", user_id="u1", amount=1)
+        deadline = time.monotonic() + 2
+        while not api.batches and time.monotonic() < deadline:
+            time.sleep(0.01)
+        client.close()
+
+    assert api.batches[0] == 1
+
+
+@pytest.mark.parametrize("policy", ["drop_newest", "drop_oldest", "raise"])
+def test_overflow_policies(policy):
+    gate = threading.Event()
+    api = FakeBatchAPI(gate=gate)
+    with patch("incentive.client.requests.Session.post", side_effect=api):
+        client = IncentiveClient(
+            api_key="k", buffered=True, batch_size=1, flush_interval=60,
+            max_queue_size=2, overflow=policy,
+        )
+        client.reward(event="e", user_id="in-flight", amount=1)
+        # Wait for the flusher to take the first event and block on the gate
+        deadline = time.monotonic() + 2
+        while client.stats().queued and time.monotonic() < deadline:
+            time.sleep(0.01)
+        client.reward(event="e", user_id="a", amount=1)
+        client.reward(event="e", user_id="b", amount=1)
+        if policy == "raise":
+            with pytest.raises(BufferFullError):
+                client.reward(event="e", user_id="c", amount=1)
+        else:
+            assert client.reward(event="e", user_id="c", amount=1)["status"] == (
+                "dropped" if policy == "drop_newest" else "queued"
+            )
+            assert client.stats().dropped == 1
+        gate.set()
+        client.close()
+
+
+def test_rejected_and_failed_batches_are_counted():
+    api = FakeBatchAPI()
+    with patch("incentive.client.requests.Session.post", side_effect=api):
+        client = IncentiveClient(api_key="k", buffered=True, batch_size=2, flush_interval=60)
+        client.reward(event="e", user_id="ok", amount=1)
+        client.reward(event="e", user_id="reject", amount=1)
+        client.flush(timeout=5)
+        assert client.stats().rejected == 1 and client.stats().sent == 1
+
+    with patch("incentive.client.requests.Session.post", side_effect=ConnectionError("x")):
+        client.reward(event="e", user_id="lost", amount=1)
+        client.flush(timeout=5)
+        assert client.stats().failed == 1
+        client.close()
+
+
+def test_stats_unavailable_when_not_buffered():
+    with pytest.raises(RuntimeError):
+        IncentiveClient(api_key="k").stats()
+
+
+def test_buffered_items_carry_idempotency_keys():
+    sent = []
+
+    def capture(url, json, timeout, headers=None):
+        sent.extend(json["items"])
+        return FakeBatchAPI()(url, json, timeout)
+
+    with patch("incentive.client.requests.Session.post", side_effect=capture):
+        client = IncentiveClient(api_key="k", buffered=True, batch_size=10, flush_interval=60)
+        client.reward(event="e", user_id="u1", amount=1)
+        client.reward(event="e", user_id="u2", amount=1, idempotency_key="fixed")
+        client.close()
+
+    assert sent[0]["idempotency_key"] and sent[1]["idempotency_key"] == "fixed"
@@ -1,5 +1,9 @@
 # tests/test_client.py
 
+import os
+import subprocess
+import sys
+
 import pytest
 import requests
 from unittest.mock import patch, Mock
@@ -18,7 +22,7 @@ def test_init_without_api_key_raises_invalid_token_error():
         IncentiveClient(api_key="")
 
 
-@patch("incentive.client.requests.post")
+@patch("incentive.client.requests.Session.post")
 def test_reward_success(mock_post):
     # Mock a successful HTTP response with JSON
     mock_resp = Mock(status_code=200)
@@ -35,14 +39,14 @@ def test_reward_success(mock_post):
     assert called_url.endswith("/reward")
 
 
-@patch("incentive.client.requests.post", side_effect=requests.RequestException("network fail"))
+@patch("incentive.client.requests.Session.post", side_effect=requests.RequestException("network fail"))
 def test_network_error_raises_incentive_engine_error(mock_post):
     client = IncentiveClient(api_key="test-key")
     with pytest.raises(IncentiveEngineError):
         client.reward(event="test_event", user_id="user123", amount=1.0)
 
 
-@patch("incentive.client.requests.post")
+@patch("incentive.client.requests.Session.post")
 def test_unauthorized_raises_invalid_token_error(mock_post):
     mock_resp = Mock(status_code=401, text="Unauthorized")
     mock_post.return_value = mock_resp
@@ -52,8 +56,9 @@ def test_unauthorized_raises_invalid_token_error(mock_post):
         client.reward(event="test_event", user_id="user123", amount=1.0)
 
 
-@patch("incentive.client.requests.post")
-def test_http_error_raises_invalid_response_error(mock_post):
+@patch("incentive.client.time.sleep")
+@patch("incentive.client.requests.Session.post")
+def test_http_error_raises_invalid_response_error(mock_post, mock_sleep):
     mock_resp = Mock(status_code=500, text="Server error")
     mock_resp.raise_for_status.side_effect = requests.HTTPError(response=mock_resp)
     mock_post.return_value = mock_resp
@@ -63,7 +68,7 @@ def test_http_error_raises_invalid_response_error(mock_post):
         client.reward(event="test_event", user_id="user123", amount=1.0)
 
 
-@patch("incentive.client.requests.post")
+@patch("incentive.client.requests.Session.post")
 def test_invalid_json_raises_invalid_response_error(mock_post):
     mock_resp = Mock(status_code=200)
     mock_resp.raise_for_status.return_value = None
@@ -83,3 +88,81 @@ def test_invalid_payload_raises_invalid_payload_error():
         client.reward(event="test_event", user_id="", amount=1.0)
     with pytest.raises(InvalidPayloadError):
         client.reward(event="test_event", user_id="user123", amount=0)
+
+
+@patch("incentive.client.time.sleep")
+@patch("incentive.client.requests.Session.post")
+def test_transient_errors_are_retried_with_backoff(mock_post, mock_sleep):
+    ok = Mock(status_code=200)
+    ok.raise_for_status.return_value = None
+    ok.json.return_value = {"status": "ok"}
+    mock_post.side_effect = [
+        requests.ConnectionError("reset"),
+        Mock(status_code=503, text="busy"),
+        ok,
+    ]
+
+    client = IncentiveClient(api_key="test-key", max_retries=2, backoff_max=1.0)
+    assert client.reward(event="test_event", user_id="user123", amount=1.0) == {"status": "ok"}
+    assert mock_post.call_count == 3
+    delays = [c.args[0] for c in mock_sleep.call_args_list]
+    assert len(delays) == 2 and all(0 <= d <= 1.0 for d in delays)
+
+
+@patch("incentive.client.time.sleep")
+@patch("incentive.client.requests.Session.post", side_effect=requests.ConnectionError("down"))
+def test_retries_are_bounded(mock_post, mock_sleep):
+    client = IncentiveClient(api_key="test-key", max_retries=3)
+    with pytest.raises(IncentiveEngineError):
+        client.reward(event="test_event", user_id="user123", amount=1.0)
+    assert mock_post.call_count == 4
+
+
+@patch("incentive.client.requests.Session.post")
+def test_client_errors_are_not_retried(mock_post):
+    mock_resp = Mock(status_code=400, text="Bad request")
+    mock_resp.raise_for_status.side_effect = requests.HTTPError(response=mock_resp)
+    mock_post.return_value = mock_resp
+
+    client = IncentiveClient(api_key="test-key", max_retries=3)
+    with pytest.raises(InvalidResponseError):
+        client.reward(event="test_event", user_id="user123", amount=1.0)
+    assert mock_post.call_count == 1
+
+
+def test_context_manager_closes_session():
+    with patch.object(requests.Session, "close") as mock_close:
+        with IncentiveClient(api_key="test-key"):
+            pass
+    mock_close.assert_called_once()
+
+
+@patch("incentive.client.time.sleep")
+@patch("incentive.client.requests.Session.post")
+def test_idempotency_key_is_generated_and_reused_across_retries(mock_post, mock_sleep):
+    ok = Mock(status_code=200)
+    ok.raise_for_status.return_value = None
+    ok.json.return_value = {"status": "ok"}
+    mock_post.side_effect = [Mock(status_code=503, text="busy"), ok, ok]
+
+    client = IncentiveClient(api_key="test-key", max_retries=1)
+    client.reward(event="test_event", user_id="user123", amount=1.0)
+    client.reward(event="test_event", user_id="user123", amount=1.0, idempotency_key="mine")
+
+    keys = [c.kwargs["headers"]["Idempotency-Key"] for c in mock_post.call_args_list]
+    assert keys[0] and keys[0] == keys[1]
+    assert keys[2] == "mine"
+
+
+def test_package_import_defers_http_libraries():
+    code = (
+        "import sys, incentive; "
+        "print('requests' in sys.modules, 'httpx' in sys.modules); "
+        "incentive.IncentiveClient; "
+        "print('requests' in sys.modules, 'httpx' in sys.modules)"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True
+    ).stdout.split("\n")
+    assert out[:2] == ["False False", "True False"]